@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CommentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "comments"
+
+    def ready(self):
+        from sessionminds import cache
+        from .models import Comment
+
+        cache.register(Comment, "comments", "updated_at")
@@ -31,5 +31,14 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Index for the comments of a tool, newest first
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["tool", "-created_at", "-id"],
+                name="comment_tool_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.text
@@ -1,14 +1,16 @@
 from rest_framework import serializers
 from comments.models import Comment
 from profiles.serializers import ProfileSerializer
+from sessionminds.serializers import DynamicFieldsMixin
 
 
 # Comment serializer
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Comment model
 
     Args:
+        DynamicFieldsMixin: Selects the fields of the response per request.
         serializers.ModelSerializer: The base serializer class.
     """
     profile = ProfileSerializer(source="user.profile", read_only=True)
@@ -16,3 +18,19 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ["id", "tool", "user", "profile", "text", "created_at"]
+
+        # Collapsed fields used for nested fields that are not expanded
+        expandable_fields = {
+            "profile": serializers.ReadOnlyField(source="user.profile.id"),
+        }
+
+    # Join the author's profile if the response uses it
+    def setup_eager_loading(self, queryset):
+        if "profile" in self.fields:
+            queryset = queryset.select_related("user__profile")
+            if isinstance(self.fields["profile"], ProfileSerializer):
+                queryset = queryset.defer(*[
+                    f"user__profile__{name}"
+                    for name in self.fields["profile"].get_deferred_fields()
+                ])
+        return queryset.defer(*self.get_deferred_fields())
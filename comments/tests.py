@@ -288,3 +288,67 @@ class CommentsTest2CommentDetails(APITestCase):
         )
         self.assertEqual(Comment.objects.count(), 1)
         print("Test passed \n")
+
+
+class CommentsTest3CommentCount(APITestCase):
+
+    def setUp(self):
+        # Create a user and a tool
+        self.user = User.objects.create_user(
+            username="count_user@example.com",
+            email="count_user@example.com",
+            password="CountUser123!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=self.user,
+            topic=self.topic
+        )
+
+    def test_8_comment_count_is_maintained(self):
+        print(
+            "\nComments Test 8: Comment count is maintained"
+        )
+        comment = Comment.objects.create(
+            tool=self.tool, user=self.user, text="First comment"
+        )
+        Comment.objects.create(
+            tool=self.tool, user=self.user, text="Second comment"
+        )
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.comment_count, 2)
+
+        comment.delete()
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.comment_count, 1)
+        print("Test passed \n")
+
+    def test_9_comments_cursor_pagination(self):
+        print(
+            "\nComments Test 9: Comments cursor pagination"
+        )
+        comments = [
+            Comment.objects.create(
+                tool=self.tool, user=self.user, text=f"Comment {i}"
+            )
+            for i in range(3)
+        ]
+        response = self.client.get(
+            f"/comments/tool/{self.tool.id}/?pagination=cursor&page_size=2",
+            format="json"
+        )
+        self.assertEqual(
+            [comment["id"] for comment in response.data["results"]],
+            [comments[2].id, comments[1].id]
+        )
+        response = self.client.get(response.data["next"], format="json")
+        self.assertEqual(
+            [comment["id"] for comment in response.data["results"]],
+            [comments[0].id]
+        )
+        self.assertIsNone(response.data["next"])
+        print("Test passed \n")
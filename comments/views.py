@@ -5,22 +5,28 @@ from comments.models import Comment
 from comments.serializers import CommentSerializer
 from tools.models import Tool
 from profiles.models import Profile
+from sessionminds.asyncviews import AsyncViewMixin
+from sessionminds.pagination import SelectablePaginationMixin
 from sessionminds.permissions import IsOwnerOrReadOnly
 from rest_framework.views import APIView
 
 
 # Get all comments for a tool or create a new comment
-class ToolComments(generics.ListCreateAPIView):
+class ToolComments(
+    AsyncViewMixin, SelectablePaginationMixin, generics.ListCreateAPIView
+):
     """
     Retrieve all comments for a tool or create a new comment.
 
     Args:
+        AsyncViewMixin: Dispatches requests asynchronously.
         generics (ListCreateAPIView): Inherits from ListCreateAPIView class.
 
     Returns:
         ToolComments: The tool comments view.
     """
     serializer_class = CommentSerializer
+    pagination_keyset = ("-created_at", "-id")
 
     def get_permissions(self):
         """
@@ -31,10 +37,19 @@ class ToolComments(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    # Page through the comments, in a thread off the event loop under ASGI
+    async def get(self, request, *args, **kwargs):
+        return await self.run_sync(self.list, request, *args, **kwargs)
+
     def get_queryset(self):
         tool_id = self.kwargs.get("id")
         tool = get_object_or_404(Tool, id=tool_id)
-        return Comment.objects.filter(tool=tool).order_by("-created_at")
+        comments = Comment.objects.filter(tool=tool).order_by(
+            "-created_at", "-id"
+            )
+        return CommentSerializer(
+            context=self.get_serializer_context()
+            ).setup_eager_loading(comments)
 
     def create(self, request, *args, **kwargs):
         """
@@ -7,3 +7,8 @@ class ProfilesConfig(AppConfig):
 
     def ready(self):
         import profiles.signals
+        from sessionminds import cache, trigram
+        from .models import Profile
+
+        trigram.register(Profile, ["first_name", "last_name"])
+        cache.register(Profile, "profiles")
@@ -1,24 +1,109 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework import exceptions
+from sessionminds.cache import get_versions
+from .models import ClaimsUser
 
+# Bumped whenever a user is saved or deleted, see profiles/signals.py
+USERS_NAMESPACE = "users"
 
-# Custom JWT authentication class
-class CustomJWTAuthentication(JWTAuthentication):
+
+# Per-worker cache of the active flag and username of users
+class UserStateCache:
+    """
+    Short-lived cache of the users that authenticated in this worker.
+
+    Every user is looked up at most once per USER_STATE_CACHE_SECONDS.
+    Saving or deleting a user bumps the "users" namespace in the default
+    cache, which drops the cached states of all workers sharing the
+    cache, so deactivated and deleted users are rejected right away.
+
+    Methods:
+        get(user_id): Returns (is_active, username) or None.
+        clear(): Drops all cached states.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.states = {}
+            self.version = None
+
+    def get(self, user_id):
+        """
+        Get the state of a user, from the cache if it is fresh.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            tuple: (is_active, username), None if the user is deleted.
+        """
+        version = get_versions([USERS_NAMESPACE])[0]
+        now = time.monotonic()
+        with self.lock:
+            if version != self.version:
+                self.states = {}
+                self.version = version
+            expires, state = self.states.get(user_id, (0.0, None))
+        if expires > now:
+            return state
+
+        state = User.objects.filter(pk=user_id).values_list(
+            "is_active", "username"
+        ).first()
+        timeout = getattr(settings, "USER_STATE_CACHE_SECONDS", 30.0)
+        with self.lock:
+            if version == self.version:
+                self.states[user_id] = (now + timeout, state)
+        return state
+
+
+user_states = UserStateCache()
+
+
+# JWT authentication that builds the user from the token claims
+class ClaimsJWTAuthentication(JWTAuthentication):
     """
-        A custom JWT authentication class.
+    JWT authentication without a User query per request.
+
+    The user is built from the user id and "username" claims of the
+    token as a ClaimsUser, which loads its row only when a view touches
+    other fields. Whether the user still exists and is active comes from
+    the per-worker user_states cache. Tokens issued without the claims
+    are authenticated by loading the user like before.
 
-    Args:
-        JWTAuthentication: Inherits from JWTAuthentication class.
+    Enabled with CLAIMS_USER_AUTHENTICATION.
     """
-    # Override the get_validated_token method
-    def get_validated_token(self, raw_token):
-        # Check if token is blacklisted
-        if isinstance(raw_token,
-                      str
-                      ) and BlacklistedToken.objects.filter(
-                          token=raw_token).exists():
-            raise exceptions.AuthenticationFailed("Token is blacklisted.")
-
-        # Give the token to the parent class
-        return super().get_validated_token(raw_token)
+
+    def get_user(self, validated_token):
+        if "username" not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        state = user_states.get(user_id)
+        if state is None:
+            raise exceptions.AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        is_active, username = state
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        # The cached username is newer than the claim after a rename
+        return ClaimsUser.from_claims(user_id, username)
@@ -0,0 +1,210 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError
+from datetime import timedelta
+from django.utils import timezone
+from sessionminds import metrics
+from .models import BlacklistedToken
+
+# Smallest filter, so a few new blacklisted tokens do not force a rebuild
+MIN_CAPACITY = 1024
+
+lookups = metrics.counter(
+    "blacklist_filter.lookups", "Possible blacklist hits checked in the db"
+)
+false_positives = metrics.counter(
+    "blacklist_filter.false_positives",
+    "Possible blacklist hits that were not blacklisted",
+)
+
+
+# Probabilistic set of strings without false negatives
+class BloomFilter:
+    """
+    A bloom filter over strings.
+
+    The bit array is sized for "capacity" items at the given false
+    positive rate. Items are never reported missing once added, but up
+    to "error_rate" of the items that were not added are reported as
+    present.
+
+    Args:
+        capacity (int): The number of items the filter is sized for.
+        error_rate (float): The false positive rate at capacity.
+
+    Methods:
+        add(item): Adds an item.
+        item in filter: Checks if an item may have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    # Get the bit positions of an item by double hashing one digest
+    def get_positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self.get_positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.get_positions(item)
+        )
+
+
+# Per-worker filter of blacklisted token ids
+class BlacklistFilter:
+    """
+    Bloom filter of the jtis of all blacklisted, unexpired tokens.
+
+    Tokens the filter has never seen are accepted without a query, only
+    possible hits are checked in the database. The filter is built on
+    the first check, or when the worker boots. Tokens blacklisted in
+    this worker are added right away. Tokens blacklisted by other
+    workers are fetched at most BLACKLIST_FILTER_SYNC_SECONDS after they
+    were committed.
+
+    A sync fetches the rows blacklisted since the previous one started,
+    minus BLACKLIST_FILTER_SYNC_OVERLAP_SECONDS. Ids and timestamps are
+    taken before the commit, so a row can commit after rows that were
+    blacklisted later. The overlap picks it up as long as its
+    transaction took less than the overlap.
+
+    The filter is rebuilt every BLACKLIST_FILTER_REBUILD_SECONDS to
+    forget expired tokens. It is also rebuilt when it holds more tokens
+    than it was sized for.
+
+    Methods:
+        build(): Loads all blacklisted, unexpired jtis.
+        warm_up(): Builds the filter if the database is reachable.
+        sync(): Adds the jtis blacklisted around the last sync.
+        add(jti): Adds a jti blacklisted in this worker.
+        is_blacklisted(jti): Checks if a token id is blacklisted.
+        clear(): Drops the filter.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.bloom = None
+            self.since = None
+            self.built = 0.0
+            self.synced = 0.0
+
+    # Get the start of the rows a sync fetches from a point in time
+    def get_since(self, start):
+        overlap = getattr(
+            settings, "BLACKLIST_FILTER_SYNC_OVERLAP_SECONDS", 60.0
+        )
+        return start - timedelta(seconds=overlap)
+
+    def build(self):
+        # Rows committed during the build are fetched by the next sync
+        start = timezone.now()
+        jtis = list(BlacklistedToken.objects.filter(
+            expires_at__gt=start
+        ).values_list("jti", flat=True))
+
+        bloom = BloomFilter(
+            max(len(jtis) * 2, MIN_CAPACITY),
+            getattr(settings, "BLACKLIST_FILTER_ERROR_RATE", 0.001),
+        )
+        for jti in jtis:
+            bloom.add(jti)
+        now = time.monotonic()
+        with self.lock:
+            self.bloom = bloom
+            self.since = self.get_since(start)
+            self.built = now
+            self.synced = now
+
+    def warm_up(self):
+        try:
+            self.build()
+        except DatabaseError:
+            # Build lazily on the first check instead
+            pass
+
+    def sync(self):
+        start = timezone.now()
+        jtis = BlacklistedToken.objects.filter(
+            blacklisted_at__gte=self.since
+        ).values_list("jti", flat=True)
+        with self.lock:
+            for jti in jtis:
+                # Rows of the overlap are fetched again
+                if jti not in self.bloom:
+                    self.bloom.add(jti)
+            self.since = self.get_since(start)
+            self.synced = time.monotonic()
+            full = self.bloom.count > self.bloom.capacity
+        if full:
+            self.build()
+
+    def add(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    # Bring the filter up to date if it is due
+    def refresh(self):
+        if self.bloom is None:
+            self.build()
+            return
+        now = time.monotonic()
+        rebuild = getattr(settings, "BLACKLIST_FILTER_REBUILD_SECONDS", 3600)
+        sync = getattr(settings, "BLACKLIST_FILTER_SYNC_SECONDS", 5.0)
+        if now - self.built < rebuild and now - self.synced < sync:
+            return
+        # One thread refreshes, the others keep using the current filter
+        if not self.sync_lock.acquire(blocking=False):
+            return
+        try:
+            if now - self.built >= rebuild:
+                self.build()
+            else:
+                self.sync()
+        finally:
+            self.sync_lock.release()
+
+    def is_blacklisted(self, jti):
+        """
+        Check if a token id is blacklisted.
+
+        Args:
+            jti (str): The "jti" claim of the token.
+
+        Returns:
+            bool: True if the token is blacklisted.
+        """
+        self.refresh()
+        if jti not in self.bloom:
+            return False
+        lookups.increment()
+        blacklisted = BlacklistedToken.objects.filter(jti=jti).exists()
+        if not blacklisted:
+            false_positives.increment()
+        return blacklisted
+
+
+blacklist_filter = BlacklistFilter()
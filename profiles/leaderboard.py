@@ -0,0 +1,222 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import F
+from votes.counters import profile_votes
+from .models import Leaderboard, LeaderboardEntry, LeaderboardScore, Profile
+
+# Counter column ranked by every board
+BOARDS = {"tools": "tool_count", "votes": "total_votes"}
+
+
+# Get the current scores of some profiles on a board
+def get_scores(board, profiles):
+    rows = list(profiles.values_list("id", "user_id", BOARDS[board]))
+    pending = {}
+    if board == "votes":
+        # Votes still held in counter shards count right away
+        pending = profile_votes.get_pending(
+            [user_id for _, user_id, _ in rows]
+        )
+    return {
+        profile_id: max(score + pending.get(user_id, 0), 0)
+        for profile_id, user_id, score in rows
+    }
+
+
+# Check if a board has been built
+def is_built(board):
+    return Leaderboard.objects.filter(name=board).exists()
+
+
+def rebuild(board):
+    """
+    Score and rank all profiles on a board from scratch.
+
+    Args:
+        board (str): The name of the board, "tools" or "votes".
+
+    Returns:
+        int: The number of scored profiles.
+    """
+    with transaction.atomic():
+        leaderboard, _ = Leaderboard.objects.get_or_create(name=board)
+        Leaderboard.objects.select_for_update().filter(name=board).exists()
+        scores = get_scores(board, Profile.objects.all())
+
+        # Entries are deleted without signals, the score rows are rebuilt
+        entries = LeaderboardEntry.objects.filter(leaderboard=leaderboard)
+        entries._raw_delete(entries.db)
+        LeaderboardScore.objects.filter(leaderboard=leaderboard).delete()
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(
+                leaderboard=leaderboard, profile_id=profile_id, score=score
+            )
+            for profile_id, score in scores.items()
+        ], batch_size=1000)
+
+        counts = Counter(scores.values())
+        rows, rank = [], 1
+        for score in sorted(counts, reverse=True):
+            rows.append(LeaderboardScore(
+                leaderboard=leaderboard,
+                score=score,
+                entries=counts[score],
+                rank=rank,
+            ))
+            rank += counts[score]
+        LeaderboardScore.objects.bulk_create(rows, batch_size=1000)
+        leaderboard.save()
+    return len(scores)
+
+
+# Add an entry to the row of its score, creating it below the next
+# higher score if it is the first entry with the score
+def add_to_score(board, score):
+    scores = LeaderboardScore.objects.filter(leaderboard_id=board)
+    if scores.filter(score=score).update(entries=F("entries") + 1):
+        return
+    above = scores.filter(score__gt=score).order_by("score").first()
+    LeaderboardScore.objects.create(
+        leaderboard_id=board,
+        score=score,
+        entries=1,
+        rank=above.rank + above.entries if above else 1,
+    )
+
+
+# Remove an entry from the row of its score, dropping the row once empty
+def remove_from_score(board, score):
+    scores = LeaderboardScore.objects.filter(leaderboard_id=board)
+    scores.filter(score=score).update(entries=F("entries") - 1)
+    scores.filter(score=score, entries=0).delete()
+
+
+def move(board, old, new):
+    """
+    Move an entry from one score to another and shift the passed ranks.
+
+    Only the rows of the scores between the old and the new one change,
+    one row per distinct score, however many profiles share them. The
+    caller holds the lock on the board.
+
+    Args:
+        board (str): The name of the board, "tools" or "votes".
+        old (int): The score the entry had, or None for a new entry.
+        new (int): The score the entry has now, or None for a deleted
+            entry.
+    """
+    scores = LeaderboardScore.objects.filter(leaderboard_id=board)
+    if new is not None:
+        add_to_score(board, new)
+    if old is not None:
+        remove_from_score(board, old)
+
+    # An entry is counted above every lower score
+    if old is None:
+        scores.filter(score__lt=new).update(rank=F("rank") + 1)
+    elif new is None:
+        scores.filter(score__lt=old).update(rank=F("rank") - 1)
+    elif new > old:
+        scores.filter(
+            score__gte=old, score__lt=new
+        ).update(rank=F("rank") + 1)
+    elif new < old:
+        scores.filter(
+            score__gte=new, score__lt=old
+        ).update(rank=F("rank") - 1)
+
+
+def refresh(board, profiles):
+    """
+    Store the current scores of some profiles on a board.
+
+    Every changed profile rewrites its entry and moves between the rows
+    of its old and new score, so a vote touches a few rows on any board
+    size. The board row is locked for these few statements only. Boards
+    that were never built are skipped, the rebuild scores every profile.
+
+    Args:
+        board (str): The name of the board, "tools" or "votes".
+        profiles (QuerySet): The profiles whose counters changed.
+    """
+    with transaction.atomic():
+        locked = Leaderboard.objects.select_for_update().filter(name=board)
+        if not locked.exists():
+            return
+        entries = LeaderboardEntry.objects.filter(leaderboard_id=board)
+        for profile_id, score in get_scores(board, profiles).items():
+            entry = entries.filter(profile_id=profile_id)
+            old = entry.values_list("score", flat=True).first()
+            if old == score:
+                continue
+            if old is None:
+                LeaderboardEntry.objects.create(
+                    leaderboard_id=board, profile_id=profile_id, score=score
+                )
+            else:
+                entry.update(score=score)
+            move(board, old, score)
+
+
+# Remove a deleted entry from the ranks of its board
+def remove(board, score):
+    with transaction.atomic():
+        locked = Leaderboard.objects.select_for_update().filter(name=board)
+        if locked.exists():
+            move(board, score, None)
+
+
+# Refresh a board for some profiles once the transaction commits
+def schedule_refresh(board, profiles):
+    """
+    Refresh the scores of some profiles after the current transaction.
+
+    Args:
+        board (str): The name of the board, "tools" or "votes".
+        profiles (QuerySet): The profiles whose counters changed,
+            evaluated after the commit.
+    """
+    transaction.on_commit(lambda: refresh(board, profiles))
+
+
+# Get the ranks of some scores on a board in one query
+def get_score_ranks(board, scores):
+    """
+    Get the rank of some scores on a board.
+
+    The rank of a score is one more than the number of entries with a
+    higher score, so tied profiles share a rank. The ranks are read by
+    their keys from the stored score rows.
+
+    Args:
+        board (str): The name of the board, "tools" or "votes".
+        scores (iterable): The scores to rank.
+
+    Returns:
+        dict: The ranks by score, scores without an entry are left out.
+    """
+    return dict(
+        LeaderboardScore.objects.filter(
+            leaderboard_id=board, score__in=set(scores)
+        ).values_list("score", "rank")
+    )
+
+
+# Get the ranks of some profiles on a board in two queries
+def get_ranks(board, profile_ids):
+    scores = dict(
+        LeaderboardEntry.objects.filter(
+            leaderboard_id=board, profile_id__in=profile_ids
+        ).values_list("profile_id", "score")
+    )
+    ranks = get_score_ranks(board, scores.values())
+    return {
+        profile_id: ranks[score]
+        for profile_id, score in scores.items()
+        if score in ranks
+    }
+
+
+# Get the rank of a profile on a board
+def get_rank(board, profile_id):
+    return get_ranks(board, [profile_id]).get(profile_id)
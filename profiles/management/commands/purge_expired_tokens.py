@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from profiles.tokens import purge_expired
+
+
+class Command(BaseCommand):
+    """
+    Delete the rows of expired refresh tokens.
+
+    Expired tokens are rejected by their "exp" claim, so their blacklist
+    and outstanding rows only grow the tables. The rows are deleted in
+    small batches, so the purge can run while the site is live, e.g.
+    from a daily scheduler job.
+    """
+    help = "Delete blacklisted and outstanding tokens that have expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows to delete per batch.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to wait between batches.",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_expired(options["batch_size"], options["pause"])
+        if options["verbosity"] > 1:
+            for table, rows in purged.items():
+                self.stdout.write(f"{table}: {rows}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {sum(purged.values())} expired token rows."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from profiles import leaderboard
+from sessionminds.cache import bump_version
+
+
+class Command(BaseCommand):
+    """
+    Score all profiles on every leaderboard from scratch.
+
+    Run it once to build the boards. Afterwards they are kept current
+    by the counter signals and only need a rebuild after bulk changes.
+    """
+    help = "Rebuild the profile leaderboards from the counter columns."
+
+    def handle(self, *args, **options):
+        for board in leaderboard.BOARDS:
+            count = leaderboard.rebuild(board)
+            self.stdout.write(self.style.SUCCESS(
+                f"Scored {count} profiles on the {board} leaderboard."
+            ))
+        bump_version("profiles")
@@ -0,0 +1,33 @@
+from profiles import leaderboard
+from profiles.models import Profile
+from sessionminds.reconcile import ReconcileCountersCommand, count_per
+from tools.models import Tool
+from votes.counters import profile_votes
+from votes.models import Vote
+
+
+class Command(ReconcileCountersCommand):
+    """
+    Rebuild the tool count and total votes of all profiles.
+
+    See ReconcileCountersCommand, drifted profiles are fixed by one
+    UPDATE, which skips Profile.save() and its slug check.
+    """
+    help = "Rebuild the tool_count and total_votes columns of all profiles."
+    model = Profile
+    label = "profiles"
+    sharded_counter = profile_votes
+    namespace = "profiles"
+
+    def get_counts(self):
+        return {
+            "tool_count": count_per(Tool.objects.all(), "user", "user"),
+            "total_votes": count_per(
+                Vote.objects.all(), "tool__user", "user"
+            ),
+        }
+
+    # Rank the corrected counters
+    def after_fix(self):
+        for board in leaderboard.BOARDS:
+            leaderboard.rebuild(board)
@@ -0,0 +1,181 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:25
+
+import django.contrib.auth.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("profiles", "0001_initial"),
+    ]
+
+    operations = [
+        # The old rows hold whole tokens without jti and expiry and were
+        # never matched, so the table is recreated instead of converted
+        migrations.DeleteModel(
+            name="BlacklistedToken",
+        ),
+        migrations.CreateModel(
+            name="BlacklistedToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("jti", models.CharField(max_length=64, unique=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                (
+                    "blacklisted_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="facebook",
+            field=models.URLField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="instagram",
+            field=models.URLField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="job_title",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="slug",
+            field=models.SlugField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="tool_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="total_votes",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="twitter",
+            field=models.URLField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(
+                fields=["-tool_count", "-id"], name="profile_tool_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(
+                fields=["-total_votes", "-id"], name="profile_total_votes_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="Leaderboard",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=20, primary_key=True, serialize=False
+                    ),
+                ),
+                ("refreshed", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.PositiveIntegerField(default=0)),
+                (
+                    "leaderboard",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="profiles.leaderboard",
+                    ),
+                ),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to="profiles.profile",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["leaderboard", "-score", "-profile"],
+                        name="leaderboard_score_idx",
+                    )
+                ],
+                "unique_together": {("leaderboard", "profile")},
+            },
+        ),
+        migrations.CreateModel(
+            name="LeaderboardScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.PositiveIntegerField()),
+                ("entries", models.PositiveIntegerField(default=0)),
+                ("rank", models.PositiveIntegerField()),
+                (
+                    "leaderboard",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scores",
+                        to="profiles.leaderboard",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("leaderboard", "score")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ClaimsUser",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("auth.user",),
+            managers=[
+                ("objects", django.contrib.auth.models.UserManager()),
+            ],
+        ),
+    ]
@@ -65,6 +65,19 @@ class Profile(models.Model):
     total_votes = models.PositiveIntegerField(default=0)
     slug = models.SlugField(unique=True, null=True, blank=True)
 
+    # Indexes for ordering the profile list
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-tool_count", "-id"],
+                name="profile_tool_count_idx",
+            ),
+            models.Index(
+                fields=["-total_votes", "-id"],
+                name="profile_total_votes_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.user.username
 
@@ -129,7 +142,11 @@ class Profile(models.Model):
 # Model for storing blacklisted tokens
 class BlacklistedToken(models.Model):
     """
-    Represents a blacklisted token.
+    Represents a blacklisted token by its id.
+
+    Only the "jti" claim and the expiry of the token are stored, so rows
+    stay small and the unique index is on a short string. Rows can be
+    purged once the token has expired, see purge_expired_tokens.
 
     Args:
         models (django.db.models.Model):
@@ -137,19 +154,137 @@ class BlacklistedToken(models.Model):
 
     Methods:
         __str__():
-            Returns the token.
+            Returns the jti of the token.
 
     Attributes:
-        token (django.db.models.TextField):
-            The token to be blacklisted.
+        jti (django.db.models.CharField):
+            The unique id of the blacklisted token.
+        expires_at (django.db.models.DateTimeField):
+            The date and time when the token expires.
         blacklisted_at (django.db.models.DateTimeField):
             The date and time when the token was blacklisted.
 
     Returns:
         BlacklistedToken: An instance of the BlacklistedToken class.
     """
-    token = models.TextField(max_length=500, unique=True)
-    blacklisted_at = models.DateTimeField(auto_now_add=True)
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    blacklisted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+# Model for a materialized profile ranking
+class Leaderboard(models.Model):
+    """
+    Represents a ranking of all profiles by one counter.
+
+    The row is locked while the board is rebuilt.
+
+    Attributes:
+        name (str): The name of the board, "tools" or "votes".
+        refreshed (datetime): When the board was last rebuilt.
+    """
+    name = models.CharField(max_length=20, primary_key=True)
+    refreshed = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+# Model for the rank of a profile on a leaderboard
+class LeaderboardEntry(models.Model):
+    """
+    Represents the score of a profile on a leaderboard.
+
+    The rank of the entry is stored once per score in LeaderboardScore,
+    so tied profiles share it and a changed score rewrites one entry.
+
+    Attributes:
+        leaderboard (ForeignKey): The board of the entry.
+        profile (ForeignKey): The ranked profile.
+        score (int): The counter the profile is ranked by.
+    """
+    leaderboard = models.ForeignKey(
+        Leaderboard, related_name="entries", on_delete=models.CASCADE
+        )
+    profile = models.ForeignKey(
+        Profile, related_name="leaderboard_entries", on_delete=models.CASCADE
+        )
+    score = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ["leaderboard", "profile"]
+        indexes = [
+            models.Index(
+                fields=["leaderboard", "-score", "-profile"],
+                name="leaderboard_score_idx",
+            ),
+        ]
 
     def __str__(self):
-        return self.token
+        return f"{self.leaderboard_id}: {self.profile_id} ({self.score})"
+
+
+# Model for the rank of a score on a leaderboard
+class LeaderboardScore(models.Model):
+    """
+    Represents the rank shared by all profiles with a score on a board.
+
+    The rank is one more than the number of entries with a higher score.
+    There is one row per distinct score, so a changed score only shifts
+    the ranks of the scores it passed and a rank is read by its key.
+
+    Attributes:
+        leaderboard (ForeignKey): The board of the score.
+        score (int): The score of the ranked entries.
+        entries (int): The number of entries with the score.
+        rank (int): The rank of the entries with the score.
+    """
+    leaderboard = models.ForeignKey(
+        Leaderboard, related_name="scores", on_delete=models.CASCADE
+        )
+    score = models.PositiveIntegerField()
+    entries = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ["leaderboard", "score"]
+
+    def __str__(self):
+        return f"{self.leaderboard_id}: {self.score} (#{self.rank})"
+
+
+# User built from token claims that loads its row on demand
+class ClaimsUser(User):
+    """
+    Represents an authenticated user built from the claims of a token.
+
+    Only the id, username and active flag are set, all other fields are
+    deferred. Touching one of them loads the whole row with one query,
+    instead of one query per field. As a proxy of User it can be
+    compared to users and assigned to and filtered by user foreign keys
+    without loading the row.
+
+    Methods:
+        from_claims(user_id, username):
+            Builds a user without a query.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, username):
+        return cls.from_db(
+            "default", ["id", "username", "is_active"],
+            [user_id, username, True],
+        )
+
+    # Load all deferred fields when the first one is touched
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = deferred
+        super().refresh_from_db(using, fields)
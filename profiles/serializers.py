@@ -3,16 +3,37 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.validators import UniqueValidator
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+    TokenVerifySerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
 from PIL import Image
+from sessionminds.serializers import (
+    DynamicFieldsMixin,
+    FragmentCacheMixin,
+    FragmentListSerializer,
+)
+from votes.counters import profile_votes
+from . import leaderboard
+from .blacklist import blacklist_filter
 from .models import Profile
+from .tokens import CompactRefreshToken, is_legacy_blacklisted
 
 
 # Profile serializer
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(
+    FragmentCacheMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for the Profile model.
 
     Args:
+        FragmentCacheMixin: Caches the serialized columns of every profile.
+        DynamicFieldsMixin: Selects the fields of the response per request.
         serializers.ModelSerializer: The base serializer class.
 
     Raises:
@@ -24,6 +45,7 @@ class ProfileSerializer(serializers.ModelSerializer):
     """
     user = serializers.ReadOnlyField(source="user.username")
     is_owner = serializers.SerializerMethodField()
+    rank = serializers.SerializerMethodField()
 
     def get_is_owner(self, obj):
         """
@@ -36,7 +58,39 @@ class ProfileSerializer(serializers.ModelSerializer):
             bool: True if the authenticated user is the owner, False otherwise.
         """
         request = self.context["request"]
-        return request.user == obj.user
+        return request.user.id == obj.user_id
+
+    # Join the user if the response uses the username
+    def setup_eager_loading(self, queryset):
+        if "user" in self.fields:
+            queryset = queryset.select_related("user")
+        return queryset.defer(*self.get_deferred_fields())
+
+    # Add votes still held in counter shards and the leaderboard ranks
+    # for a whole page at once
+    def render_fragments(self, instances):
+        if "rank" in self.fields:
+            board = self.context.get("leaderboard", "votes")
+            if all(hasattr(obj, "leaderboard_score") for obj in instances):
+                ranks = leaderboard.get_score_ranks(
+                    board, [obj.leaderboard_score for obj in instances]
+                )
+                self.ranks = {
+                    obj.pk: ranks.get(obj.leaderboard_score)
+                    for obj in instances
+                }
+            else:
+                self.ranks = leaderboard.get_ranks(
+                    board, [obj.pk for obj in instances]
+                )
+        data = super().render_fragments(instances)
+        if "total_votes" in self.fields:
+            profile_votes.apply_pending(instances, data)
+        return data
+
+    # Rank of the profile on the leaderboard of the response
+    def get_rank(self, obj):
+        return self.ranks.get(obj.pk)
 
     # Custom validation for the image field
     def validate_image(self, value):
@@ -92,7 +146,15 @@ class ProfileSerializer(serializers.ModelSerializer):
             "created",
             "updated",
             "is_owner",
+            "rank",
             ]
+        list_serializer_class = FragmentListSerializer
+
+        # Only rendered when requested, e.g. "?fields=id,slug,rank"
+        optional_fields = ["rank"]
+
+        # Counters are updated without a save and never cached
+        live_fields = ["tool_count", "total_votes"]
 
     # Access the annotated value in the queryset for tool count
     def get_tool_count(self, obj):
@@ -246,3 +308,58 @@ class LoginSerializer(serializers.Serializer):
 
         data["user"] = user
         return data
+
+
+# Token obtain serializer that issues compact refresh tokens
+class CompactTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Obtain a token pair without an OutstandingToken row, like LoginView.
+
+    Args:
+        TokenObtainPairSerializer: The base token obtain serializer.
+    """
+    token_class = CompactRefreshToken
+
+
+# Token refresh serializer with the compact blacklist
+class CompactTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rotate refresh tokens and blacklist the old one by its jti.
+
+    Args:
+        TokenRefreshSerializer: The base token refresh serializer.
+    """
+    token_class = CompactRefreshToken
+
+
+# Token blacklist serializer with the compact blacklist
+class CompactTokenBlacklistSerializer(TokenBlacklistSerializer):
+    """
+    Blacklist a refresh token by its jti.
+
+    Args:
+        TokenBlacklistSerializer: The base token blacklist serializer.
+    """
+    token_class = CompactRefreshToken
+
+
+# Token verify serializer that also rejects blacklisted tokens
+class CompactTokenVerifySerializer(TokenVerifySerializer):
+    """
+    Verify a token and check the compact blacklist, and the tables of the
+    blacklist app only for tokens issued before LEGACY_BLACKLIST_CUTOFF.
+
+    Args:
+        TokenVerifySerializer: The base token verify serializer.
+
+    Raises:
+        serializers.ValidationError: If the token is blacklisted.
+    """
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+        if blacklist_filter.is_blacklisted(
+            token[api_settings.JTI_CLAIM]
+        ) or is_legacy_blacklisted(token.payload):
+            raise serializers.ValidationError("Token is blacklisted")
+        return {}
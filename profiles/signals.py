@@ -1,64 +1,186 @@
-from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import User
+from django.db.models import F, Subquery
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from tools.models import Tool
+from votes.counters import profile_votes
+from sessionminds.cache import invalidate
 from votes.models import Vote
+from . import leaderboard
+from .authentication import USERS_NAMESPACE
+from .blacklist import blacklist_filter
+from .models import BlacklistedToken, ClaimsUser, LeaderboardEntry, Profile
 
 
-# Signal receiver to update the total votes for a user profile
-def update_profile_total_votes(profile):
+# Add a delta to a counter column of user profiles
+def adjust_profile_counter(profiles, field, delta):
     """
-    Update the total votes for a user profile.
+    Add a delta to a counter column of user profiles in a single UPDATE.
+
+    The counter is changed with an F() expression, so Profile.save() and
+    its slug check are skipped and concurrent updates never overwrite each
+    other. Counters never drop below zero.
 
     Args:
-        profile (Profile): The user profile to update.
+        profiles (QuerySet): The profiles to update.
+        field (str): The name of the counter column.
+        delta (int): The value to add to the counter.
     """
-    profile.total_votes = Vote.objects.filter(
-        tool__user=profile.user
-        ).count() or 0
-    profile.save(update_fields=["total_votes"])
+    if delta < 0:
+        profiles = profiles.filter(**{f"{field}__gte": -delta})
+    profiles.update(**{field: F(field) + delta})
 
 
-# Signal receiver to update the tool count for a user profile
-def update_profile_tool_count(profile):
+# Get the profile of the author of a tool without loading the tool
+def tool_author_profile(tool_id):
     """
-    Update the tool count for a user profile.
+    Get the profile of the author of a tool as a lazy queryset.
 
     Args:
-        profile (Profile): The user profile to update.
+        tool_id (int): The primary key of the tool.
+
+    Returns:
+        QuerySet: The profile, matched through a subquery on the tool.
     """
-    profile.tool_count = Tool.objects.filter(
-        user=profile.user
-        ).count() or 0
-    profile.save(update_fields=["tool_count"])
+    return Profile.objects.filter(user_id=Subquery(
+        Tool.objects.filter(pk=tool_id).values("user_id")[:1]
+    ))
 
 
-# Signal receivers to update the total votes and tool count for a user profile
+# Signal receivers to update the total votes for a user profile
 @receiver(post_save, sender=Vote)
 @receiver(post_delete, sender=Vote)
-def update_total_votes(sender, instance, **kwargs):
+def update_total_votes(sender, instance, created=False, **kwargs):
     """
-    Update the total votes for a user profile.
+    Update the total votes for the profile of the tool's author.
 
     Args:
         sender: The sender of the signal.
         instance: The instance of the sender.
+        created: Whether the instance was just created.
         kwargs: Additional keyword arguments.
     """
-    profile = instance.tool.user.profile
-    update_profile_total_votes(profile)
+    if kwargs["signal"] is post_delete:
+        delta = -1
+    elif created:
+        delta = 1
+    else:
+        return
+    if profile_votes.shards > 0:
+        # Shards are keyed by the author, look them up once
+        author_id = Tool.objects.filter(pk=instance.tool_id).values_list(
+            "user_id", flat=True
+            ).first()
+        if author_id is not None:
+            profile_votes.add(author_id, delta)
+    else:
+        adjust_profile_counter(
+            tool_author_profile(instance.tool_id), "total_votes", delta
+        )
+    leaderboard.schedule_refresh(
+        "votes", tool_author_profile(instance.tool_id)
+    )
 
 
-# Signal receivers to update the total votes and tool count for a user profile
+# Signal receivers to update the tool count for a user profile
 @receiver(post_save, sender=Tool)
 @receiver(post_delete, sender=Tool)
-def update_tool_count(sender, instance, **kwargs):
+def update_tool_count(sender, instance, created=False, **kwargs):
+    """
+    Update the tool count for the profile of the tool's author.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        created: Whether the instance was just created.
+        kwargs: Additional keyword arguments.
+    """
+    if kwargs["signal"] is post_delete:
+        delta = -1
+    elif created:
+        delta = 1
+    else:
+        return
+    profiles = Profile.objects.filter(user_id=instance.user_id)
+    adjust_profile_counter(profiles, "tool_count", delta)
+    leaderboard.schedule_refresh("tools", profiles)
+    if delta < 0:
+        # The votes of a deleted tool are gone before the refresh runs
+        leaderboard.schedule_refresh("votes", profiles)
+
+
+# Signal receiver to rank a new profile on every leaderboard
+@receiver(post_save, sender=Profile)
+def rank_new_profile(sender, instance, created, **kwargs):
     """
-    Update the tool count for a user profile.
+    Add a new profile to every leaderboard.
 
     Args:
         sender: The sender of the signal.
         instance: The instance of the sender.
+        created: Whether the instance was just created.
         kwargs: Additional keyword arguments.
     """
-    profile = instance.user.profile
-    update_profile_tool_count(profile)
+    if created:
+        for board in leaderboard.BOARDS:
+            leaderboard.schedule_refresh(
+                board, Profile.objects.filter(pk=instance.pk)
+            )
+
+
+# Signal receiver to close the rank gap of a deleted leaderboard entry
+@receiver(post_delete, sender=LeaderboardEntry)
+def unrank_deleted_entry(sender, instance, **kwargs):
+    leaderboard.remove(instance.leaderboard_id, instance.score)
+
+
+# Signal receiver to add a blacklisted token to the filter of this worker
+@receiver(post_save, sender=BlacklistedToken)
+def filter_blacklisted_token(sender, instance, created, **kwargs):
+    if created:
+        blacklist_filter.add(instance.jti)
+
+
+# Fields of a user that are kept in the cached user states
+USER_STATE_FIELDS = ("is_active", "username")
+
+
+# Signal receiver to note whether a save changes the state of a user
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=ClaimsUser)
+def check_user_state(sender, instance, update_fields=None, **kwargs):
+    """
+    Note on the user whether the save changes its cached state.
+
+    Saves that do not touch the state fields, like the last_login update
+    of every login, are skipped without a query. Other saves compare the
+    fields with the stored row.
+
+    Args:
+        sender: The model class that sent the signal.
+        instance: The user being saved.
+        update_fields: The fields being saved, or None for all.
+        kwargs: Additional keyword arguments.
+    """
+    if update_fields is not None and not (
+        set(update_fields) & set(USER_STATE_FIELDS)
+    ):
+        instance._state_changed = False
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list(
+        *USER_STATE_FIELDS
+    ).first() if instance.pk else None
+    instance._state_changed = stored is not None and stored != tuple(
+        getattr(instance, field) for field in USER_STATE_FIELDS
+    )
+
+
+# Drop the cached states of a user that was changed or deleted, e.g.
+# deactivated or renamed
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def invalidate_user_states(sender, instance, **kwargs):
+    if getattr(instance, "_state_changed", True):
+        invalidate(USERS_NAMESPACE)
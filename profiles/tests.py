@@ -1,7 +1,27 @@
+from io import StringIO
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils import timezone
 from datetime import timedelta
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
 from freezegun import freeze_time
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist import models as legacy
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+from tools.models import Tool
+from topics.models import Topic
+from votes.models import Vote
+from . import leaderboard
+from .authentication import ClaimsJWTAuthentication, user_states
+from .blacklist import BloomFilter, blacklist_filter
+from .models import BlacklistedToken, Profile
+from .serializers import CompactTokenVerifySerializer
+from .tokens import CompactRefreshToken
 
 
 class JWTTokenTest(APITestCase):
@@ -168,3 +188,423 @@ class JWTTokenTest(APITestCase):
                 )
             self.assertEqual(response.status_code, 401)
             print("Test passed \n")
+
+
+class ProfileCountersTest(APITestCase):
+    def setUp(self):
+        # Create an author with a tool and a few voters
+        self.author = User.objects.create_user(
+            username="author@example.com", password="testpass555515665161"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=self.author,
+            topic=self.topic
+        )
+        self.voters = [
+            User.objects.create_user(
+                username=f"voter{i}@example.com",
+                password="testpass555515665161"
+            )
+            for i in range(12)
+        ]
+
+    # Count the queries of a vote, including the leaderboard refresh
+    def vote_queries(self, voter):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                Vote.objects.create(user=voter, tool=self.tool)
+        return len(queries)
+
+    # Test that a vote costs a constant number of queries
+    def test_7_vote_queries_are_constant(self):
+        print("\nProfile Test 7: Vote queries are constant")
+        call_command("rebuild_leaderboards", stdout=StringIO())
+
+        # The author passes all other profiles with the first vote
+        first = self.vote_queries(self.voters[0])
+        for voter in self.voters[1:-1]:
+            Vote.objects.create(user=voter, tool=self.tool)
+        last = self.vote_queries(self.voters[-1])
+        self.assertEqual(first, last)
+        self.assertLessEqual(last, 15)
+        self.assertEqual(
+            leaderboard.get_rank("votes", self.author.profile.pk), 1
+        )
+
+        profile = Profile.objects.get(user=self.author)
+        self.assertEqual(profile.total_votes, 12)
+        self.assertEqual(profile.tool_count, 1)
+
+        Vote.objects.filter(user=self.voters[0]).delete()
+        self.tool.delete()
+        profile.refresh_from_db()
+        self.assertEqual(profile.total_votes, 0)
+        self.assertEqual(profile.tool_count, 0)
+        print("Test passed \n")
+
+    # Test that the reconcile command fixes drifted counters
+    def test_8_reconcile_profile_counters(self):
+        print("\nProfile Test 8: Reconcile profile counters")
+        Vote.objects.create(user=self.voters[0], tool=self.tool)
+        Profile.objects.filter(user=self.author).update(
+            tool_count=3, total_votes=0
+        )
+
+        out = StringIO()
+        call_command("reconcile_profile_counters", stdout=out)
+        self.assertIn("Fixed 1 drifted", out.getvalue())
+        profile = Profile.objects.get(user=self.author)
+        self.assertEqual(profile.tool_count, 1)
+        self.assertEqual(profile.total_votes, 1)
+        print("Test passed \n")
+
+
+class ProfileLeaderboardTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, their profiles and a topic
+        self.users = [
+            User.objects.create_user(
+                username=f"rankuser{i}@example.com",
+                password="RankUser1234!!"
+            )
+            for i in range(4)
+        ]
+        self.topic = Topic.objects.create(title="Rank Topic")
+        call_command("rebuild_leaderboards", stdout=StringIO())
+
+    def create_tool(self, user, title):
+        return Tool.objects.create(
+            title=title,
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=user,
+            topic=self.topic
+        )
+
+    # Get the ranks of all profiles on a board from scratch
+    def get_expected(self, board):
+        scores = dict(Profile.objects.values_list(
+            "id", leaderboard.BOARDS[board]
+        ))
+        return {
+            pk: 1 + sum(other > score for other in scores.values())
+            for pk, score in scores.items()
+        }
+
+    def get_ranked(self, board):
+        return leaderboard.get_ranks(
+            board, Profile.objects.values_list("id", flat=True)
+        )
+
+    # Test ranks counted from the refreshed scores
+    def test_9_leaderboard(self):
+        print("\nProfiles Test 9: Leaderboard")
+        with self.captureOnCommitCallbacks(execute=True):
+            tool = self.create_tool(self.users[1], "Rank Tool 1")
+            self.create_tool(self.users[2], "Rank Tool 2")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tool(self.users[2], "Rank Tool 3")
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users[2:]:
+                Vote.objects.create(user=user, tool=tool)
+
+        # The ranks match a full sort, tied profiles share a rank
+        for board in leaderboard.BOARDS:
+            self.assertEqual(
+                self.get_ranked(board), self.get_expected(board)
+            )
+        self.assertEqual(
+            sorted(self.get_ranked("tools").values()), [1, 2, 3, 3]
+        )
+
+        # Ranks are read from the stored score rows, not counted
+        with self.assertNumQueries(2):
+            self.get_ranked("votes")
+
+        # The list is served by score with the rank of every profile
+        expected = self.get_expected("votes")
+        response = self.client.get("/profiles/?ordering=votes")
+        results = response.data["results"]
+        self.assertEqual(results[0]["id"], self.users[1].profile.id)
+        self.assertEqual(
+            [profile["rank"] for profile in results],
+            [expected[profile["id"]] for profile in results]
+        )
+        response = self.client.get("/profiles/?ordering=tools&cursor=")
+        self.assertEqual(
+            response.data["results"][0]["id"], self.users[2].profile.id
+        )
+        self.assertEqual(response.data["results"][0]["rank"], 1)
+
+        # The ranks of one profile
+        profile = self.users[1].profile
+        response = self.client.get(f"/profiles/{profile.slug}/rank/")
+        self.assertEqual(response.data["votes"], 1)
+        self.assertEqual(response.data["tools"], 2)
+
+        # Deleted users leave no gap
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[3].delete()
+        for board in leaderboard.BOARDS:
+            self.assertEqual(
+                self.get_ranked(board), self.get_expected(board)
+            )
+        print("Test passed \n")
+
+
+class BlacklistFilterTest(APITestCase):
+    def setUp(self):
+        blacklist_filter.clear()
+        self.user = User.objects.create_user(
+            username="blacklist@example.com",
+            password="Blacklist1234!!"
+        )
+        self.access = AccessToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Bearer " + str(self.access)
+        )
+
+    # Blacklist a token without sending signals, like another worker
+    def blacklist(self, token):
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(
+                jti=token["jti"],
+                expires_at=timezone.now() + timedelta(minutes=15),
+            )
+        ])
+
+    # Refresh with a token and count the queries of the blacklist check
+    def count_blacklist_queries(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/token/refresh/", {"refresh": str(token)}
+            )
+        return response.status_code, sum(
+            "profiles_blacklistedtoken" in query["sql"]
+            and "SELECT" in query["sql"]
+            for query in queries
+        )
+
+    # Test that only possible hits of the filter query the database
+    def test_10_blacklist_filter(self):
+        print("\nProfiles Test 10: Blacklist filter")
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"added-{i}")
+        self.assertTrue(all(f"added-{i}" in bloom for i in range(1000)))
+        self.assertLess(
+            sum(f"missing-{i}" in bloom for i in range(1000)), 30
+        )
+
+        # The first refresh builds the filter, later ones skip the check
+        # and only blacklist the rotated token
+        self.assertEqual(
+            self.count_blacklist_queries(
+                CompactRefreshToken.for_user(self.user)
+            ),
+            (200, 2),
+        )
+        self.assertEqual(
+            self.count_blacklist_queries(
+                CompactRefreshToken.for_user(self.user)
+            ),
+            (200, 1),
+        )
+
+        # Tokens blacklisted elsewhere are picked up by the next sync
+        refresh = CompactRefreshToken.for_user(self.user)
+        self.blacklist(refresh)
+        with override_settings(BLACKLIST_FILTER_SYNC_SECONDS=0):
+            self.assertEqual(self.count_blacklist_queries(refresh), (401, 2))
+
+        # Access tokens are only bounded by their lifetime
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/protected/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(
+            "blacklistedtoken" in query["sql"] for query in queries
+        ))
+
+        # Rows committed after rows with a higher id and a later
+        # timestamp are still synced
+        late = AccessToken.for_user(self.user)
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(
+                id=0,
+                jti=late["jti"],
+                expires_at=timezone.now() + timedelta(minutes=15),
+            )
+        ])
+        BlacklistedToken.objects.filter(jti=late["jti"]).update(
+            blacklisted_at=timezone.now() - timedelta(seconds=30)
+        )
+        with override_settings(BLACKLIST_FILTER_SYNC_SECONDS=0):
+            blacklist_filter.refresh()
+        self.assertIn(late["jti"], blacklist_filter.bloom)
+
+        # Tokens blacklisted in this worker are rejected right away
+        refresh = CompactRefreshToken.for_user(self.user)
+        refresh.blacklist()
+        self.assertTrue(blacklist_filter.is_blacklisted(refresh["jti"]))
+        print("Test passed \n")
+
+    # Test that rotation stores compact rows and purges expired ones
+    def test_11_purge_expired_tokens(self):
+        print("\nProfiles Test 11: Purge expired tokens")
+        refresh = CompactRefreshToken.for_user(self.user)
+        response = self.client.post(
+            "/api/token/refresh/", {"refresh": str(refresh)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(legacy.OutstandingToken.objects.exists())
+        self.assertTrue(
+            BlacklistedToken.objects.filter(jti=refresh["jti"]).exists()
+        )
+
+        # Token pairs obtained from simplejwt views are compact too
+        request = APIRequestFactory().post("/", {
+            "username": "blacklist@example.com",
+            "password": "Blacklist1234!!",
+        })
+        response = TokenObtainPairView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(legacy.OutstandingToken.objects.exists())
+
+        # The rotated token is rejected
+        response = self.client.post(
+            "/api/token/refresh/", {"refresh": str(refresh)}
+        )
+        self.assertEqual(response.status_code, 401)
+
+        # Rows of expired tokens are purged from all token tables
+        expired = timezone.now() - timedelta(days=1)
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(jti=f"expired-{i}", expires_at=expired)
+            for i in range(5)
+        ])
+        outstanding = legacy.OutstandingToken.objects.create(
+            user=self.user, jti="legacy", token="legacy", expires_at=expired
+        )
+        legacy.BlacklistedToken.objects.create(token=outstanding)
+
+        out = StringIO()
+        call_command("purge_expired_tokens", "--batch-size=2", stdout=out)
+        self.assertIn("Purged 7 expired token rows.", out.getvalue())
+        self.assertEqual(
+            list(BlacklistedToken.objects.values_list("jti", flat=True)),
+            [refresh["jti"]],
+        )
+        self.assertFalse(legacy.OutstandingToken.objects.exists())
+        self.assertEqual(
+            cache.get("metrics:tokens.blacklisted_rows"), 1
+        )
+        print("Test passed \n")
+
+    # Test that only tokens from before the cutoff check the old tables
+    def test_13_legacy_blacklist_cutoff(self):
+        print("\nProfiles Test 13: Legacy blacklist cutoff")
+        blacklist_filter.build()
+        now = timezone.now()
+        with freeze_time(now - timedelta(minutes=2)):
+            old = CompactRefreshToken.for_user(self.user)
+        outstanding = legacy.OutstandingToken.objects.create(
+            user=self.user, jti=old["jti"], token=str(old),
+            expires_at=now + timedelta(days=1)
+        )
+        legacy.BlacklistedToken.objects.create(token=outstanding)
+        refresh = CompactRefreshToken.for_user(self.user)
+
+        # Tokens that are not blacklisted cost no query
+        with self.assertNumQueries(0):
+            CompactRefreshToken(str(refresh))
+            CompactTokenVerifySerializer(
+                data={"token": str(refresh)}
+            ).is_valid(raise_exception=True)
+            CompactRefreshToken(str(old))
+
+        # Tokens issued before the cutoff are checked in the old tables
+        cutoff = (now - timedelta(minutes=1)).isoformat()
+        with override_settings(LEGACY_BLACKLIST_CUTOFF=cutoff):
+            with self.assertRaises(TokenError):
+                CompactRefreshToken(str(old))
+            self.assertFalse(CompactTokenVerifySerializer(
+                data={"token": str(old)}
+            ).is_valid())
+            with self.assertNumQueries(0):
+                CompactRefreshToken(str(refresh))
+
+        # Once those tokens have expired the old tables are skipped
+        cutoff = (now - timedelta(days=2)).isoformat()
+        with override_settings(LEGACY_BLACKLIST_CUTOFF=cutoff):
+            with self.assertNumQueries(0):
+                CompactRefreshToken(str(old))
+        print("Test passed \n")
+
+
+class ClaimsAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.clear()
+        user_states.clear()
+        self.user = User.objects.create_user(
+            username="claims@example.com",
+            email="claims@example.com",
+            password="Claims1234!!"
+        )
+        self.access = CompactRefreshToken.for_user(self.user).access_token
+        self.authentication = ClaimsJWTAuthentication()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION="Bearer " + str(token)
+        )
+        return self.authentication.authenticate(request)[0]
+
+    # Test that users are built from claims and invalidated on change
+    def test_12_claims_authentication(self):
+        print("\nProfiles Test 12: Claims authentication")
+        blacklist_filter.build()
+        with self.assertNumQueries(1):
+            user = self.authenticate(self.access)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(self.access), self.user)
+            self.assertEqual(user.username, "claims@example.com")
+
+        # Other fields are loaded together on first use
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "claims@example.com")
+            self.assertFalse(user.is_staff)
+
+        # Logins and saves that keep the state keep the cached states
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+            self.user.first_name = "Claims"
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.authenticate(self.access)
+
+        # Deactivated and deleted users are rejected right away
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.access)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.access)
+
+        # Tokens without the claims load the user
+        other = User.objects.create_user(
+            username="other@example.com", password="Other1234!!"
+        )
+        self.assertEqual(
+            type(self.authenticate(AccessToken.for_user(other))), User
+        )
+        print("Test passed \n")
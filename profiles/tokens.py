@@ -0,0 +1,177 @@
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist import models as legacy
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from sessionminds import metrics
+from sessionminds.pagination import estimate_count
+from .blacklist import blacklist_filter
+from .models import BlacklistedToken
+
+purged_rows = metrics.counter(
+    "tokens.purged", "Expired token rows deleted by all purges"
+)
+last_purge_ms = metrics.gauge(
+    "tokens.last_purge_ms", "Duration of the last purge in ms"
+)
+last_purge_rate = metrics.gauge(
+    "tokens.last_purge_rows_per_second", "Rows deleted per second"
+)
+table_sizes = {
+    "blacklisted": metrics.gauge(
+        "tokens.blacklisted_rows", "Rows in the compact blacklist"
+    ),
+    "legacy_blacklisted": metrics.gauge(
+        "tokens.legacy_blacklisted_rows", "Rows in the old blacklist table"
+    ),
+    "legacy_outstanding": metrics.gauge(
+        "tokens.legacy_outstanding_rows", "Rows in the outstanding table"
+    ),
+}
+
+
+# Check if a token may be blacklisted in the tables of the blacklist app
+def in_legacy_blacklist(payload):
+    """
+    Check if a token was issued while the blacklist app was still used.
+
+    Only tokens issued before LEGACY_BLACKLIST_CUTOFF can be in the old
+    tables. Once the cutoff is older than REFRESH_TOKEN_LIFETIME, all of
+    those tokens have expired and the tables are not checked at all.
+
+    Args:
+        payload (dict): The payload of the token.
+
+    Returns:
+        bool: True if the old tables have to be checked for the token.
+    """
+    cutoff = getattr(settings, "LEGACY_BLACKLIST_CUTOFF", None)
+    if not cutoff:
+        return False
+    cutoff = parse_datetime(cutoff)
+    if cutoff + api_settings.REFRESH_TOKEN_LIFETIME < timezone.now():
+        return False
+    issued = payload.get("iat")
+    return issued is None or issued < cutoff.timestamp()
+
+
+# Check if a token is blacklisted in the tables of the blacklist app
+def is_legacy_blacklisted(payload):
+    if not in_legacy_blacklist(payload):
+        return False
+    return legacy.BlacklistedToken.objects.filter(
+        token__jti=payload[api_settings.JTI_CLAIM]
+    ).exists()
+
+
+# Refresh token blacklisted by jti in the compact table
+class CompactRefreshToken(RefreshToken):
+    """
+    A refresh token that is blacklisted in profiles.BlacklistedToken.
+
+    Unlike RefreshToken it writes no OutstandingToken row with the whole
+    token for every login, and blacklisting stores only the jti and the
+    expiry of the token.
+
+    The token and its access tokens carry a "username" claim, so
+    ClaimsJWTAuthentication can build the user without a query.
+
+    Methods:
+        for_user(user): Creates a token with the user claims.
+        check_blacklist(): Raises TokenError if the token is blacklisted.
+        blacklist(): Adds the token to the compact blacklist.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip the OutstandingToken row of the blacklist app
+        token = super(BlacklistMixin, cls).for_user(user)
+        token["username"] = user.username
+        return token
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.is_blacklisted(jti) or is_legacy_blacklisted(
+            self.payload
+        ):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        return BlacklistedToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={"expires_at": datetime_from_epoch(self.payload["exp"])},
+        )
+
+
+# Get the querysets of expired rows of all token tables
+def get_expired():
+    now = timezone.now()
+    return {
+        "blacklisted": BlacklistedToken.objects.filter(expires_at__lt=now),
+        # Before the outstanding rows they point to
+        "legacy_blacklisted": legacy.BlacklistedToken.objects.filter(
+            token__expires_at__lt=now
+        ),
+        "legacy_outstanding": legacy.OutstandingToken.objects.filter(
+            expires_at__lt=now
+        ),
+    }
+
+
+# Count the rows of a table, estimated where the planner can
+def count_rows(model):
+    queryset = model.objects.all()
+    estimate = estimate_count(queryset)
+    return queryset.count() if estimate is None else estimate
+
+
+def purge_expired(batch_size=1000, pause=0.0):
+    """
+    Delete the rows of expired tokens from all token tables.
+
+    Rows are deleted in batches of ids, every batch in its own short
+    transaction, so the tables are never locked for the whole purge and
+    logins and refreshes keep writing in between. "pause" seconds are
+    waited between batches to spread the load on busy databases.
+
+    The number of purged rows, the duration and the rate of the purge
+    and the sizes of the tables afterwards are reported as metrics.
+
+    Args:
+        batch_size (int): The number of rows to delete per batch.
+        pause (float): Seconds to wait between batches.
+
+    Returns:
+        dict: The number of purged rows by table.
+    """
+    start = time.perf_counter()
+    purged = {}
+    expired = get_expired()
+    for table, queryset in expired.items():
+        purged[table] = 0
+        while True:
+            ids = list(
+                queryset.order_by("pk").values_list("pk", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not ids:
+                break
+            queryset.model.objects.filter(pk__in=ids).delete()
+            purged[table] += len(ids)
+            if pause:
+                time.sleep(pause)
+
+    elapsed = time.perf_counter() - start
+    total = sum(purged.values())
+    purged_rows.increment(total)
+    last_purge_ms.set(round(elapsed * 1000, 3))
+    last_purge_rate.set(round(total / elapsed, 1) if elapsed else 0)
+    for table, queryset in expired.items():
+        table_sizes[table].set(count_rows(queryset.model))
+    return purged
@@ -17,6 +17,7 @@ urlpatterns = [
     path("profiles/", views.ProfileList.as_view()),
     path("profiles/<int:id>/", views.ProfileDetail.as_view()),
     path("profiles/<slug:slug>/", views.UserProfileViewSlug.as_view()),
+    path("profiles/<slug:slug>/rank/", views.ProfileRank.as_view()),
     path("register/", views.RegistrationView.as_view(), name="register"),
     path("login/", views.LoginView.as_view(), name="login"),
     path("logout/", views.LogoutView.as_view(), name="logout"),
@@ -5,10 +5,17 @@ from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.parsers import MultiPartParser, FormParser
-from sessionminds.pagination import CustomPageNumberPagination
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from sessionminds.asyncviews import AsyncAPIView
+from sessionminds.cache import (
+    cache_anonymous_response,
+    conditional_response,
+)
+from sessionminds.pagination import get_paginator
 from django.db import IntegrityError
+from django.db.models import F
+from . import leaderboard
 from .models import Profile
 from .serializers import (
     ProfileSerializer,
@@ -16,16 +23,17 @@ from .serializers import (
     RegistrationSerializer,
     LoginSerializer
 )
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .tokens import CompactRefreshToken
 from sessionminds.permissions import IsOwnerOrReadOnly
+from votes.counters import profile_votes
 
 
 # Get all profiles
-class ProfileList(APIView):
+class ProfileList(AsyncAPIView):
     """
     A view for retrieving a list of profiles.
 
-    Inherits from APIView class.
+    Inherits from AsyncAPIView class.
 
     Methods:
         get(request): Retrieves all profiles and returns serialized data.
@@ -34,21 +42,32 @@ class ProfileList(APIView):
     serializer_class = ProfileSerializer
 
     # Get all profiles
-    def get(self, request):
+    @conditional_response("profiles", "tools", "votes")
+    @cache_anonymous_response("profiles", "tools", "votes")
+    async def get(self, request):
         ordering = self.request.query_params.get("ordering", "tools")
-
-        if ordering == "tools":
-            profiles = Profile.objects.all().order_by("-tool_count")
+        board = "tools" if ordering == "tools" else "votes"
+
+        # Page through the leaderboard scores once it has been built
+        if await self.run_sync(leaderboard.is_built, board):
+            profiles = Profile.objects.filter(
+                leaderboard_entries__leaderboard_id=board
+            ).annotate(leaderboard_score=F("leaderboard_entries__score"))
+            keyset = ("-leaderboard_score", "-id")
         else:
-            profiles = Profile.objects.all().order_by("-total_votes")
-
-        paginator = CustomPageNumberPagination()
-        paginated_profiles = paginator.paginate_queryset(profiles, request)
-
-        serializer = ProfileSerializer(
-            paginated_profiles, many=True, context={"request": request}
+            profiles = Profile.objects.all()
+            keyset = ("-" + leaderboard.BOARDS[board], "-id")
+
+        context = {"request": request, "leaderboard": board}
+        profiles = ProfileSerializer(
+            context=context
+            ).setup_eager_loading(profiles).order_by(*keyset)
+
+        paginator = get_paginator(request, keyset)
+        return await self.paginate(
+            paginator, profiles, ProfileSerializer,
+            context=context, include=["rank"],
             )
-        return paginator.get_paginated_response(serializer.data)
 
 
 # Get single profile by profile id
@@ -187,16 +206,31 @@ class UserProfileView(APIView):
 
 
 # Get single profile by user slug
-class UserProfileViewSlug(APIView):
+class UserProfileViewSlug(AsyncAPIView):
     """
     A view to retrieve a specific profile by user slug.
 
     Args:
-        APIView: Inherits from APIView class.
+        AsyncAPIView: Inherits from AsyncAPIView class.
     """
 
+    # Get the columns a profile response depends on for conditional GETs
+    def get_profile_state(self, slug):
+        state = Profile.objects.filter(slug=slug).values_list(
+            "updated", "tool_count", "total_votes", "user_id"
+            ).first()
+        if state is None:
+            return None
+        # Votes still held in counter shards do not change the columns
+        return state + (
+            profile_votes.get_pending([state[-1]]).get(state[-1], 0),
+        )
+
     # Get profile by user slug
-    def get(self, request, slug):
+    @conditional_response(
+        state="get_profile_state", modified_by=("tools", "votes")
+        )
+    async def get(self, request, slug):
         """
         Retrieve a specific profile by user slug.
 
@@ -207,9 +241,42 @@ class UserProfileViewSlug(APIView):
         Returns:
             Response: The serialized profile data.
         """
-        profile = get_object_or_404(Profile, slug=slug)
+        profile = await self.run_sync(
+            Profile.objects.filter(slug=slug).first
+            )
+        if profile is None:
+            raise Http404
         serializer = ProfileSerializer(profile, context={"request": request})
-        return Response(serializer.data)
+        return Response(await self.serialize(serializer))
+
+
+# Get the leaderboard ranks of a profile
+class ProfileRank(APIView):
+    """
+    A view to retrieve the ranks of a profile on every leaderboard.
+
+    Args:
+        APIView: Inherits from APIView class.
+    """
+    permission_classes = [AllowAny]
+
+    # Read the stored ranks of the profile on every board
+    def get(self, request, slug):
+        profile_id = Profile.objects.filter(slug=slug).values_list(
+            "id", flat=True
+            ).first()
+        if profile_id is None:
+            raise Http404
+        return Response({
+            "profile": profile_id,
+            "slug": slug,
+            **{
+                board: leaderboard.get_ranks(board, [profile_id]).get(
+                    profile_id
+                )
+                for board in leaderboard.BOARDS
+            },
+        })
 
 
 # Get a list of all users
@@ -405,7 +472,7 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data["user"]
 
         # Create JWT Tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = CompactRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
@@ -445,7 +512,7 @@ class LogoutView(APIView):
         refresh_token = request.data.get("refreshToken")
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
+                token = CompactRefreshToken(refresh_token)
                 token.blacklist()
             except Exception as e:
                 return Response(
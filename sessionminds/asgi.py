@@ -12,5 +12,26 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sessionminds.settings")
+os.environ.setdefault("ASYNC_VIEWS", "True")
 
 application = get_asgi_application()
+
+# Open the pooled database connections before the first request
+from sessionminds.pool import warm_up_pools  # noqa: E402
+
+warm_up_pools()
+
+# Build the in-process autocomplete index before the first request
+from tools.autocomplete import index  # noqa: E402
+
+index.warm_up()
+
+# Load the blacklisted tokens before the first authenticated request
+from profiles.blacklist import blacklist_filter  # noqa: E402
+
+blacklist_filter.warm_up()
+
+# Return the connection of the warm-ups to the pool
+from django.db import connections  # noqa: E402
+
+connections.close_all()
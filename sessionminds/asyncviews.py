@@ -0,0 +1,204 @@
+import types
+from urllib.parse import urlsplit
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.urls import path, resolve
+from rest_framework.views import APIView
+
+
+# Awaitable of a value that is already computed
+class Completed:
+    """
+    Awaitable that returns a value without suspending.
+
+    Handlers awaiting only these run to the end on the first send(), so
+    sync dispatch can drive them without an event loop.
+
+    Attributes:
+        value: The result of the await.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self.value
+        yield
+
+
+# Run a handler coroutine that never suspends and return its result
+def run_to_completion(coroutine):
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError(
+        "Sync views can only await run_sync(), serialize() and paginate()."
+    )
+
+
+# Mixin to run a DRF view as a sync or an async Django view
+class AsyncViewMixin:
+    """
+    View mixin that dispatches requests asynchronously under ASGI.
+
+    Handlers are coroutines that await their database and serializer work
+    through run_sync(), serialize() and paginate(). Under ASGI, when
+    ASYNC_VIEWS is set, that work runs in a thread through sync_to_async,
+    so a request does not hold a worker while it waits for the database.
+    Authentication, permission checks, throttling and sync handlers run
+    in a thread too, so views can mix async reads with sync writes.
+
+    Under WSGI the same handlers run synchronously, the helpers return
+    their results right away and the handler is driven without an event
+    loop. So sync workers pay no thread hops.
+
+    Attributes:
+        asynchronous (bool): Whether the view is async, ASYNC_VIEWS if
+            not passed to as_view().
+
+    Methods:
+        dispatch(request, *args, **kwargs):
+            Runs the DRF request cycle around the handler.
+        run_sync(function, *args, **kwargs):
+            Awaits sync code, e.g. queries, from a handler.
+        serialize(serializer):
+            Awaits the data of a serializer.
+        paginate(paginator, queryset, serializer_class, **kwargs):
+            Awaits the paginated response of a queryset.
+    """
+    asynchronous = None
+    # Handlers are mixed, as_view() marks async views itself
+    view_is_async = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if initkwargs.get("asynchronous") is None:
+            initkwargs["asynchronous"] = getattr(
+                settings, "ASYNC_VIEWS", False
+            )
+        view = super().as_view(**initkwargs)
+        if initkwargs["asynchronous"]:
+            # csrf_exempt wraps the view in a sync function, mark it again
+            markcoroutinefunction(view)
+        return view
+
+    def run_sync(self, function, *args, **kwargs):
+        if self.asynchronous:
+            return sync_to_async(function)(*args, **kwargs)
+        return Completed(function(*args, **kwargs))
+
+    # Serializers load related objects lazily, render them with the
+    # queries
+    def serialize(self, serializer):
+        return self.run_sync(lambda: serializer.data)
+
+    # Page through a queryset and serialize the page
+    def paginate(self, paginator, queryset, serializer_class, **kwargs):
+        def get_response():
+            page = paginator.paginate_queryset(queryset, self.request)
+            serializer = serializer_class(
+                page, many=True, **kwargs
+                )
+            return paginator.get_paginated_response(serializer.data)
+        return self.run_sync(get_response)
+
+    # Get the handler of the method of a request
+    def get_handler(self, request):
+        if request.method.lower() in self.http_method_names:
+            return getattr(
+                self, request.method.lower(), self.http_method_not_allowed
+            )
+        return self.http_method_not_allowed
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.asynchronous:
+            return self.adispatch(request, *args, **kwargs)
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            handler = self.get_handler(request)
+            response = handler(request, *args, **kwargs)
+            if iscoroutinefunction(handler):
+                response = run_to_completion(response)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.run_sync(self.initial, request, *args, **kwargs)
+            handler = self.get_handler(request)
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await self.run_sync(
+                    handler, request, *args, **kwargs
+                )
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+# Build a URLconf that serves the views of some URLs sync or async
+def get_urlconf(urls, asynchronous):
+    """
+    Build a URLconf that serves the views of some URLs in one mode.
+
+    Every URL is resolved with ROOT_URLCONF and its AsyncViewMixin view
+    is served sync or async whatever ASYNC_VIEWS says, e.g. to compare
+    both modes in one process. Other views are served as they are.
+
+    Args:
+        urls (list): The URLs whose views are served.
+        asynchronous (bool): Whether the AsyncViewMixin views are async.
+
+    Returns:
+        module: The URLconf, e.g. for the ROOT_URLCONF setting.
+    """
+    urlconf = types.ModuleType("urlconf")
+    urlconf.urlpatterns = []
+    for url in urls:
+        match = resolve(urlsplit(url).path)
+        view = match.func
+        view_class = getattr(view, "cls", None)
+        if view_class and issubclass(view_class, AsyncViewMixin):
+            view = view_class.as_view(**{
+                **view.initkwargs, "asynchronous": asynchronous
+            })
+        urlconf.urlpatterns.append(path(match.route, view))
+    return urlconf
+
+
+class AsyncAPIView(AsyncViewMixin, APIView):
+    """
+    APIView with async handlers.
+
+    Args:
+        AsyncViewMixin: Dispatches requests asynchronously.
+        APIView: The base APIView class.
+    """
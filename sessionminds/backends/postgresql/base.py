@@ -0,0 +1,21 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from sessionminds.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    PostgreSQL backend with pooled connections.
+
+    Every connection is opened with the same settings, so a reused
+    connection already has the isolation level from OPTIONS.
+    """
+
+    def get_new_connection(self, conn_params):
+        # The parent only sets the isolation level on new connections
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return super().get_new_connection(conn_params)
@@ -0,0 +1,11 @@
+from django.db.backends.sqlite3 import base
+from sessionminds.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    SQLite backend with pooled connections, e.g. for local testing.
+
+    In-memory databases are never closed by Django, so they keep their
+    one connection and the pool stays idle.
+    """
@@ -0,0 +1,403 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlencode
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+from . import metrics
+from .routers import use_replicas
+
+KEY_PREFIX = "response-cache:"
+VERSION_PREFIX = "response-cache:version:"
+MODIFIED_PREFIX = "response-cache:modified:"
+
+# Namespaces a serialized tool with its nested objects depends on
+TOOL_NAMESPACES = ("tools", "topics", "profiles", "votes", "comments")
+
+# Models and their modification time field by namespace
+_models = {}
+
+hits = metrics.counter(
+    "response_cache.hits", "Anonymous responses served from the cache"
+)
+misses = metrics.counter(
+    "response_cache.misses", "Anonymous responses computed and cached"
+)
+
+
+# Get the current versions of some namespaces
+def get_versions(namespaces):
+    keys = [VERSION_PREFIX + namespace for namespace in namespaces]
+    values = cache.get_many(keys)
+    return [values.get(key, 0) for key in keys]
+
+
+# Get the time of the last change of some namespaces
+def get_modified(namespaces):
+    keys = [MODIFIED_PREFIX + namespace for namespace in namespaces]
+    values = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in values:
+            # Unknown changes are assumed to have happened just now
+            cache.add(key, now, None)
+            values[key] = now
+    return [values[key] for key in keys]
+
+
+# Invalidate all cached responses that depend on a namespace
+def bump_version(namespace):
+    """
+    Move a namespace to a new version.
+
+    Cached responses include the versions of the namespaces they depend
+    on in their key, so they are never read again and expire on their own.
+    The time of the change is kept for Last-Modified headers.
+
+    Args:
+        namespace (str): The namespace that changed, e.g. "tools".
+    """
+    cache.set(MODIFIED_PREFIX + namespace, time.time(), None)
+    key = VERSION_PREFIX + namespace
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key was evicted between add and incr
+        cache.set(key, 1, None)
+
+
+# Bump a namespace now and again when the transaction commits
+def invalidate(namespace):
+    """
+    Invalidate a namespace for a change made in the current transaction.
+
+    The namespace is bumped right away and again after the transaction
+    commits, so a response computed by another request before the commit
+    is not kept.
+
+    Args:
+        namespace (str): The namespace to bump.
+    """
+    bump_version(namespace)
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+# Bump a namespace whenever a model is saved or deleted
+def register(model, namespace, modified_field="updated"):
+    """
+    Invalidate a namespace on every save and delete of a model.
+
+    Args:
+        model (Model): The model to watch.
+        namespace (str): The namespace to bump.
+        modified_field (str): The field holding the time of the last
+            save, part of the ETags of lists in the namespace.
+    """
+    _models.setdefault(namespace, []).append((model, modified_field))
+
+    def receiver(sender, **kwargs):
+        invalidate(namespace)
+
+    uid = f"response-cache-{model._meta.label}"
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(
+        receiver, sender=model, weak=False, dispatch_uid=uid
+    )
+
+
+# Get the host, path and sorted query parameters of a request
+def normalize_request(request):
+    params = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    return f"{request.get_host()}{request.path}?{params}"
+
+
+# Build the cache key of a request
+def get_cache_key(request, namespaces):
+    versions = ",".join(
+        f"{namespace}={version}"
+        for namespace, version in zip(
+            namespaces, get_versions(namespaces)
+        )
+    )
+    raw = f"{normalize_request(request)}#{versions}"
+    return KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+# Get the cache key and the cached response of a request
+def lookup_response(request, namespaces):
+    if (
+        not getattr(settings, "RESPONSE_CACHE_ENABLED", True)
+        or request.user.is_authenticated
+    ):
+        return None, None
+
+    key = get_cache_key(request, namespaces)
+    cached = cache.get(key)
+    if cached is None:
+        misses.increment()
+        return key, None
+
+    hits.increment()
+    data, status = cached
+    return key, Response(data, status=status, headers={"X-Cache": "HIT"})
+
+
+# Cache a successful response under the key of its request
+def store_response(key, response):
+    if key is not None and response.status_code == 200:
+        cache.set(
+            key,
+            (response.data, response.status_code),
+            getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300),
+        )
+        response["X-Cache"] = "MISS"
+    return response
+
+
+# Check if a namespace changed within the time the replicas may lag
+def replicas_may_lag(namespaces):
+    """
+    Check if the replicas may not have the last change of some
+    namespaces yet.
+
+    A response computed from a lagging replica would be cached under the
+    new versions and served stale until it expires. Within
+    REPLICA_STICKY_SECONDS of a change, the window in which the writing
+    client also reads from the primary, responses that fill the cache
+    are read from the primary.
+
+    Args:
+        namespaces (tuple): The namespaces the response depends on.
+
+    Returns:
+        bool: True if the request may read from replicas and one of the
+            namespaces changed within the window.
+    """
+    if not use_replicas.get() or not namespaces:
+        return False
+    window = getattr(settings, "REPLICA_STICKY_SECONDS", 5.0)
+    return time.time() - max(get_modified(namespaces)) < window
+
+
+# Send the reads of a block to the primary if enabled
+@contextmanager
+def read_primary(enabled):
+    token = use_replicas.set(False) if enabled else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            use_replicas.reset(token)
+
+
+# Add the namespaces that only some requests depend on
+def get_request_namespaces(request, namespaces, namespaces_for):
+    if namespaces_for is None:
+        return namespaces
+    return namespaces + tuple(namespaces_for(request))
+
+
+# Decorator to cache the responses of a view method for anonymous users
+def cache_anonymous_response(*namespaces, namespaces_for=None):
+    """
+    Cache successful responses of a view method for anonymous users.
+
+    Responses are keyed on the host, path, sorted query parameters and
+    the versions of the given namespaces. Authenticated users always get
+    a fresh response because it can hold per-user fields. Responses that
+    fill the cache right after a change are read from the primary, see
+    replicas_may_lag(). Works for sync view methods and the async ones
+    of AsyncViewMixin views, whose run_sync() runs the cache lookups.
+
+    Args:
+        namespaces (str): The namespaces the response depends on.
+        namespaces_for (function): Returns more namespaces for a request,
+            e.g. for one ordering of a list.
+
+    Returns:
+        function: The decorator for the view method.
+    """
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                request_namespaces = get_request_namespaces(
+                    request, namespaces, namespaces_for
+                )
+                key, cached = await view.run_sync(
+                    lookup_response, request, request_namespaces
+                )
+                if cached is not None:
+                    return cached
+                lagging = key is not None and await view.run_sync(
+                    replicas_may_lag, request_namespaces
+                )
+                with read_primary(lagging):
+                    response = await method(view, request, *args, **kwargs)
+                return await view.run_sync(store_response, key, response)
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            request_namespaces = get_request_namespaces(
+                request, namespaces, namespaces_for
+            )
+            key, cached = lookup_response(request, request_namespaces)
+            if cached is not None:
+                return cached
+            lagging = key is not None and replicas_may_lag(
+                request_namespaces
+            )
+            with read_primary(lagging):
+                response = method(view, request, *args, **kwargs)
+            return store_response(key, response)
+        return wrapper
+    return decorator
+
+
+# Get the latest change and row count of the models of some namespaces
+def get_table_state(namespaces):
+    """
+    Read the state of the tables behind some namespaces.
+
+    Lists have no single object to take a state from. Without a shared
+    cache a worker never sees the version bumps of other workers and
+    commands, so with LIST_ETAG_TABLE_STATE their ETags include the
+    latest modification time and the row count of every model
+    registered for their namespaces, one aggregate per model.
+
+    Args:
+        namespaces (tuple): The namespaces of the list.
+
+    Returns:
+        list: (latest modification, row count) per model.
+    """
+    return [
+        tuple(model._base_manager.aggregate(
+            modified=Max(field), count=Count("pk")
+        ).values())
+        for namespace in namespaces
+        for model, field in _models.get(namespace, [])
+    ]
+
+
+# Get the ETag and Last-Modified time of a request
+def get_validators(
+    view, request, args, kwargs, namespaces, state, modified_by
+):
+    parts = [
+        normalize_request(request),
+        request.user.id,
+        get_versions(namespaces),
+    ]
+    modified = get_modified(namespaces + tuple(modified_by))
+
+    if state is not None:
+        values = getattr(view, state)(*args, **kwargs)
+        if values is None:
+            return None, None
+        parts.append([str(value) for value in values])
+        modified.append(values[0].timestamp())
+    elif getattr(settings, "LIST_ETAG_TABLE_STATE", False):
+        tables = get_table_state(namespaces)
+        parts.append([str(value) for table in tables for value in table])
+        modified.extend(
+            latest.timestamp() for latest, _ in tables if latest
+        )
+
+    etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+    last_modified = int(max(modified)) if modified else None
+    return etag, last_modified
+
+
+# Add the validators to a full or 304 response
+def set_validators(response, etag, last_modified):
+    if etag is not None and response.status_code in (200, 304):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+# Decorator for ETag and Last-Modified headers and 304 responses
+def conditional_response(
+    *namespaces, state=None, modified_by=(), namespaces_for=None
+):
+    """
+    Answer conditional GETs of a view method without running it.
+
+    The ETag is a hash of the normalized request, the user and the
+    versions of the namespaces. Detail views name a view method in
+    "state" that returns the "updated" timestamp of the object followed
+    by any columns that change without a save, e.g. counters, or None if
+    the object does not exist. Lists without a state add the state of
+    the tables of their namespaces if LIST_ETAG_TABLE_STATE is set.
+
+    Last-Modified is the latest change of the namespaces, the
+    "modified_by" namespaces and the object. If-None-Match and
+    If-Modified-Since are answered with 304 Not Modified. Works for sync
+    view methods and the async ones of AsyncViewMixin views, the state
+    method is always sync.
+
+    Args:
+        namespaces (str): The namespaces the response depends on.
+        state (str): The name of the view method returning the state.
+        modified_by (tuple): Namespaces that only move Last-Modified,
+            because their changes are already part of the state.
+        namespaces_for (function): Returns more namespaces for a request,
+            e.g. for one ordering of a list.
+
+    Returns:
+        function: The decorator for the view method.
+    """
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                etag, last_modified = await view.run_sync(
+                    get_validators, view, request, args, kwargs,
+                    get_request_namespaces(
+                        request, namespaces, namespaces_for
+                    ),
+                    state, modified_by,
+                )
+                response = None
+                if etag is not None:
+                    response = get_conditional_response(
+                        request, etag=etag, last_modified=last_modified
+                    )
+                if response is None:
+                    response = await method(view, request, *args, **kwargs)
+                return set_validators(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = get_validators(
+                view, request, args, kwargs,
+                get_request_namespaces(request, namespaces, namespaces_for),
+                state, modified_by,
+            )
+            response = None
+            if etag is not None:
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+from django.core.cache import cache
+
+KEY_PREFIX = "metrics:"
+
+_counters = {}
+
+
+# Counter shared by all workers through the cache
+class Counter:
+    """
+    A named counter stored in the cache.
+
+    Counters live in the default cache, so every worker adds to the same
+    value when the cache is shared (e.g. Redis). With the local memory
+    cache every process counts on its own.
+
+    Args:
+        name (str): The dotted name of the counter.
+        description (str): What the counter counts.
+
+    Methods:
+        increment(amount=1): Adds to the counter.
+        get(): Returns the current value.
+        reset(): Sets the counter back to zero.
+    """
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self.key = KEY_PREFIX + name
+
+    def increment(self, amount=1):
+        cache.add(self.key, 0, None)
+        try:
+            cache.incr(self.key, amount)
+        except ValueError:
+            # The key was evicted between add and incr
+            cache.set(self.key, amount, None)
+
+    def get(self):
+        return cache.get(self.key, 0)
+
+    def reset(self):
+        cache.set(self.key, 0, None)
+
+
+# Gauge shared by all workers through the cache
+class Gauge(Counter):
+    """
+    A named value stored in the cache that is set instead of added to,
+    e.g. the duration of the last run of a job.
+
+    Methods:
+        set(value): Sets the gauge to a value.
+        get(): Returns the current value.
+        reset(): Sets the gauge back to zero.
+    """
+
+    def set(self, value):
+        cache.set(self.key, value, None)
+
+
+# Get or create a registered counter
+def counter(name, description=""):
+    """
+    Get the counter with a name, registering it on first use.
+
+    Args:
+        name (str): The dotted name of the counter.
+        description (str): What the counter counts.
+
+    Returns:
+        Counter: The registered counter.
+    """
+    if name not in _counters:
+        _counters[name] = Counter(name, description)
+    return _counters[name]
+
+
+# Get or create a registered gauge
+def gauge(name, description=""):
+    """
+    Get the gauge with a name, registering it on first use.
+
+    Args:
+        name (str): The dotted name of the gauge.
+        description (str): What the gauge measures.
+
+    Returns:
+        Gauge: The registered gauge.
+    """
+    if name not in _counters:
+        _counters[name] = Gauge(name, description)
+    return _counters[name]
+
+
+# Get the values of all registered counters
+def get_metrics():
+    """
+    Get the current values of all registered counters and gauges.
+
+    Returns:
+        dict: The counter values by name, read in one cache call.
+    """
+    values = cache.get_many([c.key for c in _counters.values()])
+    return {
+        name: values.get(c.key, 0)
+        for name, c in sorted(_counters.items())
+    }
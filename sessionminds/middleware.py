@@ -0,0 +1,87 @@
+import hashlib
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from .routers import get_replicas, use_replicas
+
+STICKY_KEY_PREFIX = "replicas:sticky:"
+READ_METHODS = ("GET", "HEAD")
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+# Middleware that lets reads of safe requests go to replicas
+class ReplicaMiddleware:
+    """
+    Allow ReplicaRouter to read from replicas during GET and HEAD
+    requests.
+
+    After a successful POST, PUT, PATCH or DELETE the client sticks to
+    the primary for REPLICA_STICKY_SECONDS, so it reads its own writes
+    while the replicas catch up. Clients are told apart by their
+    Authorization header, or by their address if they send none. The
+    sticky flags live in the default cache, so they hold across workers
+    when the cache is shared. Anonymous clients behind one proxy share
+    an address, so cached responses do not rely on the flags, see
+    cache.replicas_may_lag().
+
+    Works in sync and async middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    # Identify the client by its token or its address
+    def get_sticky_key(self, request):
+        client = request.META.get(
+            "HTTP_AUTHORIZATION", request.META.get("REMOTE_ADDR", "")
+        )
+        return STICKY_KEY_PREFIX + hashlib.md5(client.encode()).hexdigest()
+
+    # Check if the request may read from replicas
+    def may_use_replicas(self, request):
+        return (
+            request.method in READ_METHODS
+            and bool(get_replicas())
+            and not cache.get(self.get_sticky_key(request))
+        )
+
+    # Keep the client on the primary after a successful write
+    def process_response(self, request, response):
+        if (
+            request.method in WRITE_METHODS
+            and response.status_code < 400
+            and get_replicas()
+        ):
+            cache.set(
+                self.get_sticky_key(request),
+                True,
+                getattr(settings, "REPLICA_STICKY_SECONDS", 5.0),
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = use_replicas.set(self.may_use_replicas(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        allowed = await sync_to_async(self.may_use_replicas)(request)
+        token = use_replicas.set(allowed)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        return await sync_to_async(self.process_response)(request, response)
@@ -1,8 +1,393 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_TYPES = ("auto", "exact", "estimate", "none")
+
+
+# Get the planner's row estimate for a queryset on PostgreSQL
+def estimate_count(queryset):
+    """
+    Get the query planner's row estimate for a queryset.
+
+    Args:
+        queryset (QuerySet): The queryset to estimate.
+
+    Returns:
+        int: The estimated number of rows or None if the database has no
+        planner estimates.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# Get the exact count of a queryset from the cache
+def cached_count(queryset):
+    """
+    Get the exact count of a queryset, cached for a short time.
+
+    Args:
+        queryset (QuerySet): The queryset to count.
+
+    Returns:
+        int: The number of rows, possibly up to the cache timeout old.
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = "pagination-count:" + hashlib.md5(
+        f"{queryset.db}:{sql}:{params}".encode()
+    ).hexdigest()
+    return cache.get_or_set(
+        key,
+        queryset.count,
+        getattr(settings, "PAGINATION_COUNT_CACHE_TIMEOUT", 60),
+    )
+
+
+# Page that knows if there is a next page without a count
+class CountStrategyPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+# Django paginator with exact, estimated, cached or no counts
+class CountStrategyPaginator(Paginator):
+    """
+    Paginator that chooses how to count the rows of a queryset.
+
+    Count types:
+        auto: Exact counts up to PAGINATION_EXACT_COUNT_THRESHOLD rows,
+            a planner estimate or cached count above.
+        exact: Always an exact COUNT(*).
+        estimate: A planner estimate, or a cached count if the database
+            has no estimates.
+        none: No count at all, only whether there is a next page.
+
+    Every page fetches one extra row to know if there is a next page, so
+    the next link is right even if the count is not.
+
+    Attributes:
+        count_type (str): The kind of count returned by count, one of
+            "exact", "estimate", "cached" or "none".
+    """
+
+    def __init__(self, object_list, per_page, count_type="auto", **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.requested_count_type = count_type
+        self.count_type = None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        requested = self.requested_count_type
+
+        if requested == "none":
+            self.count_type = "none"
+            return None
+
+        if requested == "auto":
+            # Counting a limited subquery stops at the threshold
+            threshold = getattr(
+                settings, "PAGINATION_EXACT_COUNT_THRESHOLD", 1000
+            )
+            count = queryset[:threshold + 1].count()
+            if count <= threshold:
+                self.count_type = "exact"
+                return count
+
+        if requested in ("auto", "estimate"):
+            count = estimate_count(queryset)
+            if count is not None:
+                self.count_type = "estimate"
+                return count
+            self.count_type = "cached"
+            return cached_count(queryset)
+
+        self.count_type = "exact"
+        return queryset.count()
+
+    # Without a count the number of pages is unknown
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return 0
+        return super().num_pages
+
+    def validate_number(self, number):
+        # Only exact counts can tell that a page is out of range upfront
+        if self.count is not None and self.count_type == "exact":
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage("That page contains no results")
+        return CountStrategyPage(
+            rows[:self.per_page], number, self, len(rows) > self.per_page
+        )
 
 
 # Custom pagination class with page size set to 10
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination with a selectable count strategy.
+
+    The count type is taken from the "count" query parameter or the
+    PAGINATION_COUNT_STRATEGY setting, see CountStrategyPaginator.
+    The response says which kind of count it holds in "count_type".
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "count"
+
+    def get_count_type(self, request):
+        count_type = request.query_params.get(self.count_query_param)
+        if count_type in COUNT_TYPES:
+            return count_type
+        return getattr(settings, "PAGINATION_COUNT_STRATEGY", "auto")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = functools.partial(
+            CountStrategyPaginator, count_type=self.get_count_type(request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response({
+            "count": paginator.count,
+            "count_type": paginator.count_type,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"]["nullable"] = True
+        response_schema["properties"]["count_type"] = {
+            "type": "string",
+            "enum": ["exact", "estimate", "cached", "none"],
+        }
+        return response_schema
+
+
+# Cursor pagination on a stable composite key
+class KeysetPagination(BasePagination):
+    """
+    Pagination class that pages through a queryset by a composite key.
+
+    Instead of OFFSET/LIMIT and a COUNT(*), every page continues after the
+    key of the last row of the previous page, e.g. ("-created", "-id"),
+    so deep pages cost the same as the first one. The position is handed
+    to the client as an opaque cursor in the next and previous links.
+
+    Args:
+        keyset (tuple): The model fields to order and page by, prefixed
+            with "-" for descending order. The last one must be unique.
+
+    Methods:
+        is_requested(request):
+            Check if the request asks for cursor pagination.
+        paginate_queryset(queryset, request, view=None):
+            Returns the rows of the requested page.
+        get_paginated_response(data):
+            Returns the page with its next and previous links.
+    """
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, keyset):
+        self.keyset = keyset
+
+    # Check if the request asks for cursor pagination
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return (
+            cls.cursor_query_param in params
+            or params.get("pagination") == "cursor"
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    # Encode a position and direction as an opaque cursor
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({"p": position, "r": reverse}, default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    # Decode the cursor of the request or raise NotFound
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = data["p"], bool(data["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(
+            self.keyset
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    # Build the filter for all rows after a position in the given order
+    def get_position_filter(self, ordering, position):
+        condition = Q()
+        equal = Q()
+        for key, value in zip(ordering, position):
+            name = key.lstrip("-")
+            lookup = "lt" if key.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    # Get the key values of a row
+    def get_position(self, obj):
+        return [getattr(obj, key.lstrip("-")) for key in self.keyset]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        # Walk backwards by flipping the order for previous pages
+        ordering = self.keyset
+        if reverse:
+            ordering = [
+                key[1:] if key.startswith("-") else f"-{key}"
+                for key in ordering
+            ]
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+
+        # Fetch one extra row to know if there is another page
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more or reverse
+        self.has_previous = position is not None and (has_more or not reverse)
+        self.page = results
+        return results
+
+    def get_link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(position, reverse),
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_link(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+
+# Get the paginator a request asks for
+def get_paginator(request, keyset):
+    """
+    Get cursor pagination if the request asks for it, page numbers if not.
+
+    Args:
+        request (Request): The request to paginate.
+        keyset (tuple): The composite key used for cursor pagination.
+
+    Returns:
+        BasePagination: The paginator instance for the request.
+    """
+    if KeysetPagination.is_requested(request):
+        return KeysetPagination(keyset)
+    return CustomPageNumberPagination()
+
+
+# Mixin for generic views to let the request select the pagination
+class SelectablePaginationMixin:
+    """
+    Mixin for generic views to offer cursor pagination per request.
+
+    Attributes:
+        pagination_keyset (tuple): The composite key for cursor pagination.
+    """
+    pagination_keyset = ("-created", "-id")
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            self._paginator = get_paginator(
+                self.request, self.pagination_keyset
+            )
+        return self._paginator
@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+from collections import deque
+from django.db import DatabaseError, OperationalError, connections
+
+STATS = (
+    "checkouts", "created", "closed", "waits", "timeouts", "failed_checks"
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Raised when no connection is free within the timeout
+class PoolTimeout(OperationalError):
+    pass
+
+
+# Per-process pool of open database connections
+class ConnectionPool:
+    """
+    A thread safe pool of open DB-API connections.
+
+    Connections are opened on demand up to "max_size" and handed out
+    last in, first out, so the busiest connections stay warm. When all
+    of them are checked out, a checkout waits up to "timeout" seconds
+    for a release and then raises PoolTimeout.
+
+    Before an idle connection is handed out it is checked with
+    "SELECT 1" if it has been idle for longer than "check_interval"
+    seconds, 0 checks on every checkout. Connections that fail the
+    check or are older than "max_lifetime" seconds are closed and
+    replaced.
+
+    Args:
+        min_size (int): Connections opened by warm_up().
+        max_size (int): The most connections open at a time.
+        timeout (float): Seconds to wait for a free connection.
+        check_interval (float): Seconds a connection may be idle
+            without being checked on checkout.
+        max_lifetime (float): Seconds after which a connection is
+            replaced, None to keep them open.
+
+    Methods:
+        acquire(connect): Checks out a connection.
+        release(connection, broken=False): Returns a connection.
+        warm_up(connect): Opens connections up to "min_size".
+        close_all(): Closes all idle connections.
+        get_stats(): Returns the sizes and counters of the pool.
+    """
+
+    def __init__(
+        self, min_size=1, max_size=10, timeout=10.0, check_interval=0.0,
+        max_lifetime=3600.0,
+    ):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.opened = {}
+        self.size = 0
+        self.stats = dict.fromkeys(STATS, 0)
+
+    # Take an idle connection or reserve a slot for a new one
+    def take(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            self.stats["checkouts"] += 1
+            while True:
+                if self.idle:
+                    return self.idle.pop()
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection was free within "
+                        f"{self.timeout} seconds, all {self.max_size} are "
+                        f"in use."
+                    )
+                self.stats["waits"] += 1
+                self.condition.wait(remaining)
+
+    # Open a connection in a reserved slot
+    def open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened[id(connection)] = time.monotonic()
+            self.stats["created"] += 1
+        return connection
+
+    # Check if an idle connection can be handed out
+    def is_usable(self, connection, released):
+        now = time.monotonic()
+        opened = self.opened.get(id(connection), now)
+        if self.max_lifetime is not None and now - opened > self.max_lifetime:
+            return False
+        if now - released < self.check_interval:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            with self.condition:
+                self.stats["failed_checks"] += 1
+            return False
+        return True
+
+    # Close a connection and free its slot
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.opened.pop(id(connection), None)
+            self.size -= 1
+            self.stats["closed"] += 1
+            self.condition.notify()
+
+    def acquire(self, connect):
+        """
+        Check out a connection, opening a new one if none is idle.
+
+        Args:
+            connect (callable): Opens a new DB-API connection.
+
+        Raises:
+            PoolTimeout: If no connection was free within the timeout.
+
+        Returns:
+            The checked out DB-API connection.
+        """
+        while True:
+            entry = self.take()
+            if entry is None:
+                return self.open(connect)
+            # Check outside the lock, it is a round trip to the database
+            connection, released = entry
+            if self.is_usable(connection, released):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection, broken=False):
+        """
+        Return a checked out connection to the pool.
+
+        Args:
+            connection: The DB-API connection from acquire().
+            broken (bool): Close the connection instead of keeping it.
+        """
+        if broken:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    # Open connections up to the minimum size, e.g. when a worker boots
+    def warm_up(self, connect):
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            self.release(self.open(connect))
+
+    # Close the idle connections, checked out ones close on release
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self.stats,
+            }
+
+
+# Get the pool of a database, creating it on first use
+def get_pool(alias, options):
+    """
+    Get the connection pool of a database in this process.
+
+    Pools are keyed by process id, so a worker forked from a master
+    that already connected starts with an empty pool instead of
+    sharing the sockets of its parent.
+
+    Args:
+        alias (str): The alias of the database, e.g. "default".
+        options (dict): The "POOL" options of the database settings.
+
+    Returns:
+        ConnectionPool: The pool of the database.
+    """
+    key = (os.getpid(), alias)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    min_size=options.get("MIN_SIZE", 1),
+                    max_size=options.get("MAX_SIZE", 10),
+                    timeout=options.get("TIMEOUT", 10.0),
+                    check_interval=options.get("CHECK_INTERVAL", 0.0),
+                    max_lifetime=options.get("MAX_LIFETIME", 3600.0),
+                )
+                _pools[key] = pool
+    return pool
+
+
+# Database wrapper that checks connections out of a pool
+class PooledDatabaseWrapperMixin:
+    """
+    Mixin for a DatabaseWrapper that reuses connections from a pool.
+
+    Django opens a connection for every request and closes it at the
+    end when CONN_MAX_AGE is 0. Here opening checks a connection out of
+    the pool of the process and closing rolls back any open transaction
+    and returns it, so requests skip the connect and SSL handshake.
+
+    Methods:
+        get_pool(): Returns the pool of the database.
+        warm_up_pool(): Opens the minimum number of connections.
+    """
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get("POOL", {}))
+
+    # Open a new connection with the parent backend
+    def connect_new(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool().acquire(
+            lambda: self.connect_new(conn_params)
+        )
+
+    def warm_up_pool(self):
+        conn_params = self.get_connection_params()
+        self.get_pool().warm_up(lambda: self.connect_new(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        broken = self.errors_occurred and not self.is_usable()
+        if not broken:
+            try:
+                # The next request must not inherit a transaction
+                self.connection.rollback()
+            except Exception:
+                broken = True
+        self.get_pool().release(self.connection, broken=broken)
+
+
+# Open the minimum number of connections of every pooled database
+def warm_up_pools():
+    for connection in connections.all():
+        if isinstance(connection, PooledDatabaseWrapperMixin):
+            try:
+                with connection.wrap_database_errors:
+                    connection.warm_up_pool()
+            except DatabaseError:
+                # Connect on demand if the database is not reachable yet
+                pass
+
+
+# Get the statistics of the pools of this process
+def get_pool_stats():
+    """
+    Get the sizes and counters of the pools of this process.
+
+    Returns:
+        dict: The values by dotted name, e.g. "db_pool.default.idle".
+    """
+    pid = os.getpid()
+    return {
+        f"db_pool.{alias}.{name}": value
+        for (key_pid, alias), pool in sorted(_pools.items())
+        if key_pid == pid
+        for name, value in pool.get_stats().items()
+    }
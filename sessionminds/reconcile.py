@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count, F, OuterRef, Q, Subquery, Value,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+from .cache import bump_version
+
+
+# Count the rows of a queryset per object as a correlated subquery
+def count_per(queryset, field, outer="pk"):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+# Base command to rebuild counter columns from the rows they count
+class ReconcileCountersCommand(BaseCommand):
+    """
+    Rebuild counter columns that drifted from the rows they count.
+
+    All drifted rows are fixed by one UPDATE that sets every column to a
+    correlated COUNT subquery. Votes that land while the command runs
+    are either counted by the statement or wait for its row locks and
+    add to the new value, so none are lost. The shards of the sharded
+    counter are folded in the same transaction first. A dry run only
+    counts the drifted rows and writes nothing, it compares the columns
+    plus their pending shards.
+
+    Attributes:
+        model (Model): The model with the counter columns.
+        label (str): The plural name of the rows in the output.
+        sharded_counter (ShardedCounter): Counter whose shards are
+            folded first, or None.
+        namespace (str): The namespace bumped after a fix.
+
+    Methods:
+        get_counts(): Returns the count expression of every column.
+        describe(obj): Returns the line of a drifted row in the output.
+        after_fix(): Runs after drifted rows were fixed.
+    """
+    model = None
+    label = ""
+    sharded_counter = None
+    namespace = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted counters without fixing them.",
+        )
+
+    def get_counts(self):
+        raise NotImplementedError
+
+    def describe(self, obj):
+        return f"{self.model.__name__} {obj.pk}: " + ", ".join(
+            f"{field} {getattr(obj, field)} -> "
+            f"{getattr(obj, 'actual_' + field)}"
+            for field in self.get_counts()
+        )
+
+    def after_fix(self):
+        pass
+
+    # Get the drifted rows, the stored values plus their pending shards
+    # if they were not folded
+    def get_drifted(self, folded):
+        counts = self.get_counts()
+        drifted = Q()
+        for field, count in counts.items():
+            stored = F(field)
+            counter = self.sharded_counter
+            if not folded and counter and counter.field == field:
+                stored = stored + counter.get_pending_expression()
+            drifted |= ~Q(Exact(stored, count))
+        return self.model.objects.filter(drifted)
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        with transaction.atomic():
+            if self.sharded_counter and not dry_run:
+                self.sharded_counter.fold()
+            drifted = self.get_drifted(folded=not dry_run)
+            if options["verbosity"] > 1:
+                for obj in drifted.annotate(**{
+                    f"actual_{field}": count
+                    for field, count in self.get_counts().items()
+                }).order_by("pk"):
+                    self.stdout.write(self.describe(obj))
+            if dry_run:
+                fixed = drifted.count()
+            else:
+                fixed = drifted.update(**self.get_counts())
+
+        if fixed and not dry_run:
+            # update() sends no signals, invalidate cached lists here
+            bump_version(self.namespace)
+            self.after_fix()
+
+        action = "Found" if dry_run else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {self.model.objects.count()} {self.label}. "
+            f"{action} {fixed} drifted."
+        ))
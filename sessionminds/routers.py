@@ -0,0 +1,97 @@
+import contextvars
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set by ReplicaMiddleware for requests that may read from replicas
+use_replicas = contextvars.ContextVar("use_replicas", default=False)
+
+# Seconds since the replica last replayed a transaction, 0 when the
+# replica has replayed everything it received from the primary
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+# Get the aliases of the read replicas
+def get_replicas():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+# Database router that sends reads of safe requests to replicas
+class ReplicaRouter:
+    """
+    Route reads to read replicas and everything else to the primary.
+
+    Reads go to a random healthy replica only while ReplicaMiddleware
+    allows it for the current request, i.e. for GET and HEAD requests
+    of clients that did not write recently. Reads inside a transaction
+    on the primary stay on the primary, so they see its writes.
+
+    A replica is healthy if it is less than REPLICA_MAX_LAG seconds
+    behind the primary. The lag is checked at most every
+    REPLICA_LAG_CHECK_INTERVAL seconds per replica and process, a
+    failing check counts as unhealthy. Without healthy replicas reads
+    fall back to the primary.
+
+    Methods:
+        db_for_read(model, **hints): Returns a replica or the primary.
+        db_for_write(model, **hints): Returns the primary.
+        is_healthy(alias): Checks the lag of a replica.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checks = {}
+
+    # Get the replication lag of a replica in seconds
+    def get_lag(self, alias):
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_QUERY)
+            return float(cursor.fetchone()[0] or 0)
+
+    def is_healthy(self, alias):
+        max_lag = getattr(settings, "REPLICA_MAX_LAG", 2.0)
+        if max_lag is None:
+            return True
+        interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 1.0)
+        now = time.monotonic()
+        checked, healthy = self.checks.get(alias, (None, False))
+        if checked is not None and now - checked < interval:
+            return healthy
+        try:
+            healthy = self.get_lag(alias) <= max_lag
+        except Exception:
+            healthy = False
+        with self.lock:
+            self.checks[alias] = (now, healthy)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        if not use_replicas.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in get_replicas() if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    # Replicas hold copies of the same tables
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # Replicas get their schema from the primary
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
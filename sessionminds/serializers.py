@@ -0,0 +1,306 @@
+import copy
+import hashlib
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils.functional import cached_property
+from rest_framework import permissions, serializers
+from rest_framework.fields import SkipField, empty
+from rest_framework.relations import PKOnlyObject
+from . import metrics
+
+fragment_hits = metrics.counter(
+    "fragment_cache.hits", "Objects rendered from cached fragments"
+)
+fragment_misses = metrics.counter(
+    "fragment_cache.misses", "Objects serialized and cached as fragments"
+)
+
+
+# Parse a comma separated list of dotted field names into a nested dict
+def parse_field_list(value):
+    """
+    Parse a comma separated list of dotted field names into a nested dict.
+
+    Args:
+        value (str): The list of field names, e.g. "id,profile.slug".
+
+    Returns:
+        dict: The nested field names, e.g. {"id": {}, "profile": {"slug": {}}}
+        or None if the list is empty.
+    """
+    tree = {}
+    for name in value.split(","):
+        node = tree
+        for part in name.strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree or None
+
+
+# Serializer mixin for sparse fieldsets and expansion control
+class DynamicFieldsMixin:
+    """
+    Serializer mixin to select the fields of the response per request.
+
+    The top level serializer reads the "fields", "omit" and "expand" query
+    parameters of safe requests and hands the dotted parts on to its nested
+    serializers, e.g. "?fields=id,title,profile.slug".
+
+    Query parameters:
+        fields: Comma separated list of the fields to include.
+        omit: Comma separated list of the fields to leave out.
+        expand: Comma separated list of the nested fields to render as
+            objects. Fields in Meta.expandable_fields that are not listed
+            are rendered by their collapsed field instead, usually the
+            primary key. Without the parameter all fields are expanded.
+
+    Fields in Meta.optional_fields are only rendered when "fields" names
+    them or the view passes them in the "include" argument.
+
+    Methods:
+        get_fieldset():
+            Returns the fields, omit and expand trees for this serializer.
+        get_deferred_fields():
+            Returns the model columns the response does not use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.fieldset = kwargs.pop("fieldset", None)
+        self.include = kwargs.pop("include", ())
+        super().__init__(*args, **kwargs)
+
+    # Get the fieldset from the parent serializer or the request
+    def get_fieldset(self):
+        if self.fieldset is not None:
+            return self.fieldset
+
+        # Only the top level serializer reads the query parameters
+        root = self.root
+        if root is not self and getattr(root, "child", None) is not self:
+            return None, {}, None
+
+        request = self.context.get("request")
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return None, {}, None
+
+        params = getattr(request, "query_params", request.GET)
+        expand = params.get("expand")
+        return (
+            parse_field_list(params.get("fields", "")),
+            parse_field_list(params.get("omit", "")) or {},
+            None if expand is None else parse_field_list(expand) or {},
+        )
+
+    # Remove, collapse or restrict fields according to the fieldset
+    def get_fields(self):
+        fields = super().get_fields()
+        only, omit, expand = self.get_fieldset()
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        optional = getattr(self.Meta, "optional_fields", ())
+
+        for name, field in list(fields.items()):
+            # Fields only used for input are never filtered
+            if field.write_only:
+                continue
+
+            if (only is not None and name not in only) or omit.get(name) == {}:
+                del fields[name]
+                continue
+            if name in optional and only is None and name not in self.include:
+                del fields[name]
+                continue
+
+            collapsed = expand is not None and name not in expand
+            if name in expandable and collapsed:
+                fields[name] = copy.deepcopy(expandable[name])
+                continue
+
+            # Hand the nested parts of the fieldset on to nested serializers
+            nested = getattr(field, "child", field)
+            if isinstance(nested, DynamicFieldsMixin):
+                nested.fieldset = (
+                    only.get(name) or None if only is not None else None,
+                    omit.get(name, {}),
+                    expand.get(name) or None if expand is not None else None,
+                )
+
+        return fields
+
+    # Get the columns of fields that were removed from the response
+    def get_deferred_fields(self):
+        model = self.Meta.model
+        columns = {
+            field.name: field
+            for field in model._meta.concrete_fields
+            if not field.primary_key and not field.is_relation
+        }
+        declared = self.Meta.fields
+        if declared == "__all__":
+            declared = list(columns)
+
+        return [
+            name for name in declared
+            if name in columns and name not in self.fields
+        ]
+
+
+# List serializer that renders a page from cached fragments in one batch
+class FragmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        return self.child.render_fragments(list(iterable))
+
+
+# Serializer mixin for a per-object cache of serialized fields
+class FragmentCacheMixin:
+    """
+    Serializer mixin that caches the serialized columns of every object.
+
+    Fragments are keyed by model, primary key, the "updated" timestamp and
+    the selected fields, so every save makes a new key and nothing has to
+    be invalidated. A list fetches the fragments of a whole page in one
+    cache call and only serializes the missing objects.
+
+    Only plain columns of the object itself are cached. These fields are
+    rendered on every request and overlaid on the fragment:
+        - fields with a source on a related object, e.g. "user.username"
+        - nested serializers, which use their own fragments if they can
+        - method fields, e.g. per-user fields like "is_owner"
+        - Meta.live_fields, e.g. counters changed without a save
+
+    Set Meta.list_serializer_class to FragmentListSerializer to fetch the
+    fragments of a list in one batch.
+
+    Methods:
+        render_fragments(instances):
+            Returns the representations of a list of objects.
+    """
+    fragment_timestamp_field = "updated"
+
+    # Check if a field is cached in the fragment or rendered live
+    def is_live_field(self, field):
+        return (
+            field.field_name in getattr(self.Meta, "live_fields", ())
+            or "." in field.source
+            or field.source == "*"
+            or isinstance(field, (
+                serializers.BaseSerializer,
+                serializers.RelatedField,
+                serializers.ManyRelatedField,
+                serializers.SerializerMethodField,
+            ))
+        )
+
+    @cached_property
+    def fragment_fields(self):
+        cached, live = [], []
+        for field in self._readable_fields:
+            (live if self.is_live_field(field) else cached).append(field)
+        return cached, live
+
+    def get_fragment_key(self, instance):
+        cached, _ = self.fragment_fields
+        names = ",".join(field.field_name for field in cached)
+        timestamp = getattr(instance, self.fragment_timestamp_field)
+        return "fragment:{}:{}:{}:{}".format(
+            instance._meta.label,
+            instance.pk,
+            timestamp.isoformat() if timestamp else "",
+            hashlib.md5(names.encode()).hexdigest(),
+        )
+
+    # Never defer the column the fragment key is built from
+    def get_deferred_fields(self):
+        return [
+            name for name in super().get_deferred_fields()
+            if name != self.fragment_timestamp_field
+        ]
+
+    def to_representation(self, instance):
+        return self.render_fragments([instance])[0]
+
+    def render_fragments(self, instances):
+        if not instances:
+            return []
+        cached_fields, live_fields = self.fragment_fields
+
+        # Read all fragments at once and serialize only the missing ones
+        keys = [self.get_fragment_key(instance) for instance in instances]
+        fragments = cache.get_many(keys)
+        missing = {}
+        for instance, key in zip(instances, keys):
+            if key not in fragments:
+                missing[key] = fragments[key] = self.render_fields(
+                    instance, cached_fields
+                )
+        if missing:
+            cache.set_many(
+                missing, getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 3600)
+            )
+        fragment_hits.increment(len(keys) - len(missing))
+        fragment_misses.increment(len(missing))
+
+        # Render live fields, nested fragments in one batch per field
+        live = [OrderedDict() for _ in instances]
+        for field in live_fields:
+            if isinstance(field, FragmentCacheMixin):
+                values = self.render_nested(field, instances)
+            else:
+                values = [
+                    self.render_fields(instance, [field]).get(
+                        field.field_name, empty
+                    )
+                    for instance in instances
+                ]
+            for data, value in zip(live, values):
+                if value is not empty:
+                    data[field.field_name] = value
+
+        # Keep the declared field order
+        results = []
+        for key, data in zip(keys, live):
+            data.update(fragments[key])
+            results.append(OrderedDict(
+                (field.field_name, data[field.field_name])
+                for field in self._readable_fields
+                if field.field_name in data
+            ))
+        return results
+
+    # Render some fields of an object like Serializer.to_representation
+    def render_fields(self, instance, fields):
+        data = OrderedDict()
+        for field in fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check = (
+                attribute.pk if isinstance(attribute, PKOnlyObject)
+                else attribute
+            )
+            data[field.field_name] = (
+                None if check is None else field.to_representation(attribute)
+            )
+        return data
+
+    # Render a nested fragment serializer for all objects in one batch
+    def render_nested(self, field, instances):
+        attributes = []
+        for instance in instances:
+            try:
+                attributes.append(field.get_attribute(instance))
+            except SkipField:
+                attributes.append(empty)
+        present = [
+            attribute for attribute in attributes
+            if attribute is not empty and attribute is not None
+        ]
+        rendered = iter(field.render_fragments(present))
+        return [
+            attribute if attribute is empty or attribute is None
+            else next(rendered)
+            for attribute in attributes
+        ]
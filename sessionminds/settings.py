@@ -23,8 +23,8 @@ SECRET_KEY = env("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-# Test environment variable
-TEST = False
+# Test environment variable, set TEST=True to use the sqlite3 databases
+TEST = env.bool("TEST", default=False)
 
 # Allowed hosts
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS")
@@ -66,6 +66,7 @@ SITE_ID = 1
 
 # Middleware settings
 MIDDLEWARE = [
+    "sessionminds.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -100,6 +101,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "sessionminds.wsgi.application"
 
+# Dispatch the async views asynchronously, turned on by asgi.py. Under
+# WSGI they run synchronously without an event loop
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", default=False)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = env.list("CORS_ALLOWED_ORIGINS")
 
@@ -133,14 +138,35 @@ CORS_ALLOWED_HEADERS = [
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 
-# If test environment is set to 1, use sqlite3 database
-# If set to 0, use the postgresql database
+# Check connections out of a per-process pool instead of connecting on
+# every request, see sessionminds/pool.py
+DB_POOL = env.bool("DB_POOL", default=True)
+POOLED_ENGINES = {
+    "django.db.backends.postgresql": "sessionminds.backends.postgresql",
+    "django.db.backends.sqlite3": "sessionminds.backends.sqlite3",
+}
+DB_POOL_OPTIONS = {
+    "MIN_SIZE": env.int("DB_POOL_MIN_SIZE", default=2),
+    "MAX_SIZE": env.int("DB_POOL_MAX_SIZE", default=10),
+    "TIMEOUT": env.float("DB_POOL_TIMEOUT", default=10.0),
+    "CHECK_INTERVAL": env.float("DB_POOL_CHECK_INTERVAL", default=0.0),
+    "MAX_LIFETIME": env.float("DB_POOL_MAX_LIFETIME", default=3600.0),
+}
+
+# If the test environment is set, use the sqlite3 databases
+# If not, use the postgresql database
 if TEST is True:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "test_db.sqlite3",
-        }
+        },
+        # Second alias on the same file to exercise the replica router
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "test_db.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        },
     }
 else:
     DATABASES = {
@@ -157,6 +183,34 @@ else:
         }
     }
 
+# Read replicas of the default database, e.g. "replica1.host,replica2.host"
+for number, host in enumerate(env.list("DB_REPLICA_HOSTS", default=[]), 1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+if DB_POOL:
+    for database in DATABASES.values():
+        engine = database["ENGINE"]
+        database["ENGINE"] = POOLED_ENGINES.get(engine, engine)
+        database["POOL"] = DB_POOL_OPTIONS
+
+# Send reads of GET and HEAD requests to the replicas, see
+# sessionminds/routers.py
+DATABASE_ROUTERS = ["sessionminds.routers.ReplicaRouter"]
+# The "replica" alias of the test databases is only used by the tests
+# that route to it
+REPLICA_DATABASES = [
+    alias for alias in DATABASES if alias.startswith("replica_")
+]
+REPLICA_STICKY_SECONDS = env.float("REPLICA_STICKY_SECONDS", default=5.0)
+REPLICA_MAX_LAG = env.float("REPLICA_MAX_LAG", default=2.0)
+REPLICA_LAG_CHECK_INTERVAL = env.float(
+    "REPLICA_LAG_CHECK_INTERVAL", default=1.0
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -217,9 +271,21 @@ CLOUDINARY_STORAGE = {
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Rest framework settings
+# Build request.user from the token claims instead of a query per
+# request, see profiles/authentication.py
+CLAIMS_USER_AUTHENTICATION = env.bool(
+    "CLAIMS_USER_AUTHENTICATION", default=False
+)
+# Seconds a worker trusts that a user still exists and is active
+USER_STATE_CACHE_SECONDS = env.float("USER_STATE_CACHE_SECONDS", default=30)
+
+# Only refresh tokens are checked against the blacklist, access tokens
+# stay valid until ACCESS_TOKEN_LIFETIME
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "profiles.authentication.ClaimsJWTAuthentication"
+        if CLAIMS_USER_AUTHENTICATION
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -230,6 +296,67 @@ REST_FRAMEWORK = {
     "DATETIME_FORMAT": "%d/%b/%Y",
 }
 
+# Pagination count settings
+# Results up to the threshold are counted exactly, larger results get a
+# planner estimate (PostgreSQL) or a cached count
+PAGINATION_COUNT_STRATEGY = env("PAGINATION_COUNT_STRATEGY", default="auto")
+PAGINATION_EXACT_COUNT_THRESHOLD = env.int(
+    "PAGINATION_EXACT_COUNT_THRESHOLD", default=1000
+)
+PAGINATION_COUNT_CACHE_TIMEOUT = env.int(
+    "PAGINATION_COUNT_CACHE_TIMEOUT", default=60
+)
+
+# Cache settings
+# Local memory by default, set CACHE_URL (e.g. redis://...) to share the
+# cache between workers
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Version bumps only reach other workers and management commands
+# through a shared cache
+CACHE_SHARED = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Anonymous response cache settings
+# Cached responses are invalidated by version bumps, the timeout only
+# removes responses of old versions. Off by default without a shared
+# cache, where a worker would keep serving responses that other workers
+# or commands invalidated.
+RESPONSE_CACHE_ENABLED = env.bool(
+    "RESPONSE_CACHE_ENABLED", default=CACHE_SHARED
+)
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=300)
+# Add the latest change and row count of their tables to the ETags of
+# lists, needed when workers cannot see each other's version bumps
+LIST_ETAG_TABLE_STATE = env.bool(
+    "LIST_ETAG_TABLE_STATE", default=not CACHE_SHARED
+)
+
+# Timeout of cached serialized objects, a save always makes a new key
+FRAGMENT_CACHE_TIMEOUT = env.int("FRAGMENT_CACHE_TIMEOUT", default=3600)
+
+# Number of shard rows per vote counter, 0 updates the counters directly
+# Shards are folded into the counters by the fold_counters command
+COUNTER_SHARDS = env.int("COUNTER_SHARDS", default=0)
+
+# Tool views are buffered per worker and written in one UPDATE every
+# few seconds or after a number of views, whichever comes first
+VIEW_COUNT_FLUSH_INTERVAL = env.float(
+    "VIEW_COUNT_FLUSH_INTERVAL", default=5.0
+)
+VIEW_COUNT_FLUSH_EVENTS = env.int("VIEW_COUNT_FLUSH_EVENTS", default=100)
+
+# Hours after which a vote counts half as much for the trending ordering
+TRENDING_HALF_LIFE_HOURS = env.float("TRENDING_HALF_LIFE_HOURS", default=24)
+
+# Fuzzy search settings
+# Minimum trigram similarity of a match and maximum number of matches
+FUZZY_SEARCH_THRESHOLD = env.float("FUZZY_SEARCH_THRESHOLD", default=0.3)
+FUZZY_SEARCH_LIMIT = env.int("FUZZY_SEARCH_LIMIT", default=20)
+
 # Simple JWT settings
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
@@ -242,8 +369,37 @@ SIMPLE_JWT = {
     "VERIFYING_KEY": None,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
+    # Issue refresh tokens without outstanding rows and blacklist
+    # rotated and revoked ones by jti only
+    "TOKEN_OBTAIN_SERIALIZER":
+        "profiles.serializers.CompactTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER":
+        "profiles.serializers.CompactTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER":
+        "profiles.serializers.CompactTokenBlacklistSerializer",
+    "TOKEN_VERIFY_SERIALIZER":
+        "profiles.serializers.CompactTokenVerifySerializer",
 }
 
+# Blacklisted token filter, see profiles/blacklist.py
+# Other workers notice a blacklisted token after at most SYNC seconds
+BLACKLIST_FILTER_SYNC_SECONDS = env.float(
+    "BLACKLIST_FILTER_SYNC_SECONDS", default=5.0
+)
+BLACKLIST_FILTER_REBUILD_SECONDS = env.float(
+    "BLACKLIST_FILTER_REBUILD_SECONDS", default=3600
+)
+BLACKLIST_FILTER_ERROR_RATE = env.float(
+    "BLACKLIST_FILTER_ERROR_RATE", default=0.001
+)
+# Tokens issued before this time, e.g. "2026-10-18T00:00+00:00", are also
+# checked in the tables of the blacklist app until they have expired
+LEGACY_BLACKLIST_CUTOFF = env.str("LEGACY_BLACKLIST_CUTOFF", default="")
+# Seconds a blacklisting transaction may take to still be synced
+BLACKLIST_FILTER_SYNC_OVERLAP_SECONDS = env.float(
+    "BLACKLIST_FILTER_SYNC_OVERLAP_SECONDS", default=60
+)
+
 # Django REST Auth settings
 REST_AUTH_SERIALIZERS = {
     "USER_DETAILS_SERIALIZER": "sessionminds.serializers.CurrenUserSerializer"
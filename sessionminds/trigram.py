@@ -0,0 +1,311 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+# Most ranked matches checked against a queryset in one query
+MAX_CHUNK_SIZE = 500
+
+
+# Split a text into the padded trigrams pg_trgm uses
+def trigrams(text):
+    """
+    Get the trigrams of a text the way PostgreSQL's pg_trgm does.
+
+    Every word is lowercased and padded with two spaces in front and one
+    behind, e.g. "Retro" has the trigrams "  r", " re", "ret", "etr",
+    "tro" and "ro ".
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        set: The trigrams of the text.
+    """
+    result = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        result.update(
+            padded[i:i + 3] for i in range(len(padded) - 2)
+        )
+    return result
+
+
+# In-process inverted trigram index for databases without pg_trgm
+class TrigramIndex:
+    """
+    Inverted index from trigrams to primary keys of one model.
+
+    Similarity is the share of trigrams two texts have in common, the same
+    measure as similarity() of pg_trgm. The index is built from the
+    database on first use and kept up to date by model signals.
+
+    Args:
+        model (Model): The model to index.
+        fields (list): The text fields of the model to index.
+
+    Methods:
+        search(query, threshold, limit):
+            Returns the primary keys of the most similar rows, all
+            matches if the limit is None.
+        update(instance):
+            Adds or replaces a row in the index.
+        remove(pk):
+            Removes a row from the index.
+        clear():
+            Empties the index so it is rebuilt on the next search.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.postings = defaultdict(set)
+            self.documents = {}
+            self.built = False
+
+    # Get the text of a row from its field values
+    def get_text(self, values):
+        return " ".join(value or "" for value in values)
+
+    def build(self):
+        rows = self.model._default_manager.values_list("pk", *self.fields)
+        with self.lock:
+            for pk, *values in rows.iterator():
+                self.add(pk, trigrams(self.get_text(values)))
+            self.built = True
+
+    def add(self, pk, grams):
+        self.documents[pk] = grams
+        for gram in grams:
+            self.postings[gram].add(pk)
+
+    def discard(self, pk):
+        for gram in self.documents.pop(pk, ()):
+            self.postings[gram].discard(pk)
+
+    def update(self, instance):
+        if not self.built:
+            return
+        values = [getattr(instance, field) for field in self.fields]
+        with self.lock:
+            self.discard(instance.pk)
+            self.add(instance.pk, trigrams(self.get_text(values)))
+
+    def remove(self, pk):
+        if not self.built:
+            return
+        with self.lock:
+            self.discard(pk)
+
+    def search(self, query, threshold, limit):
+        if not self.built:
+            self.build()
+
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        # A match shares at least threshold * len(grams) trigrams with
+        # the query, so it is in one of the shortest posting lists
+        required = max(1, math.ceil(threshold * len(grams)))
+        with self.lock:
+            postings = sorted(
+                (self.postings.get(gram, set()) for gram in grams), key=len
+            )
+            candidates = set().union(*postings[:len(grams) - required + 1])
+
+            results = []
+            for pk in candidates:
+                document = self.documents[pk]
+                shared = len(grams & document)
+                score = shared / (len(grams) + len(document) - shared)
+                if score >= threshold:
+                    results.append((score, pk))
+
+        results.sort(key=lambda result: (-result[0], -result[1]))
+        return [(pk, score) for score, pk in results[:limit]]
+
+
+_indexes = {}
+
+
+# Register the text fields of a model for fuzzy search
+def register(model, fields):
+    """
+    Register the text fields of a model for fuzzy search.
+
+    Connects the signals that keep the in-process index up to date and
+    the post_migrate handler that creates the trigram indexes on
+    PostgreSQL.
+
+    Args:
+        model (Model): The model to search.
+        fields (list): The text fields to match against.
+    """
+    index = TrigramIndex(model, fields)
+    _indexes[model] = index
+    uid = f"trigram-{model._meta.label}"
+
+    def update_index(sender, instance, **kwargs):
+        index.update(instance)
+
+    def remove_from_index(sender, instance, **kwargs):
+        index.remove(instance.pk)
+
+    def install_indexes(sender, using="default", **kwargs):
+        install_trigram_indexes(model, using)
+
+    post_save.connect(
+        update_index, sender=model, weak=False, dispatch_uid=uid
+    )
+    post_delete.connect(
+        remove_from_index, sender=model, weak=False, dispatch_uid=uid
+    )
+    post_migrate.connect(
+        install_indexes,
+        sender=model._meta.app_config,
+        weak=False,
+        dispatch_uid=uid,
+    )
+
+
+# Empty all in-process indexes
+def reset_indexes():
+    for index in _indexes.values():
+        index.clear()
+
+
+# Create the pg_trgm extension and GIN indexes for a model
+def install_trigram_indexes(model, using="default"):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in _indexes[model].fields:
+            column = model._meta.get_field(field).column
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS "
+                f"{qn(f'{table}_{column}_trgm')} "
+                f"ON {qn(table)} USING gin ({qn(column)} gin_trgm_ops)"
+            )
+
+
+# Match rows with the trigram operator of pg_trgm
+def postgres_similar(queryset, fields, query):
+    model = queryset.model
+    qn = connections[queryset.db].ops.quote_name
+    table = qn(model._meta.db_table)
+
+    condition = Q()
+    similarity = []
+    for field in fields:
+        column = f"{table}.{qn(model._meta.get_field(field).column)}"
+        # The % operator can use the GIN index, similarity() ranks
+        condition |= Q(RawSQL(
+            f"{column} %% %s", [query], output_field=BooleanField()
+        ))
+        similarity.append(RawSQL(
+            f"similarity({column}, %s)", [query], output_field=FloatField()
+        ))
+
+    if len(similarity) > 1:
+        similarity = Greatest(*similarity, output_field=FloatField())
+    else:
+        similarity = similarity[0]
+    return queryset.filter(condition).annotate(similarity=similarity)
+
+
+# Get the best ranked matches of the index that are in a queryset
+def filter_matches(queryset, results, limit):
+    """
+    Keep the best ranked matches that are rows of a queryset.
+
+    The matches are checked against the queryset in chunks, starting
+    with one of the size of the limit and doubling until the limit is
+    filled. So filters of the queryset, e.g. by topic or author, are
+    applied before the top matches are taken.
+
+    Args:
+        queryset (QuerySet): The rows to search.
+        results (list): The matches as (pk, score), best first.
+        limit (int): The maximum number of matches to keep.
+
+    Returns:
+        list: The best matches in the queryset as (pk, score).
+    """
+    matches = []
+    start, size = 0, min(max(limit, 1), MAX_CHUNK_SIZE)
+    while len(matches) < limit and start < len(results):
+        chunk = results[start:start + size]
+        found = set(queryset.filter(
+            pk__in=[pk for pk, _ in chunk]
+        ).order_by().values_list("pk", flat=True))
+        matches.extend(result for result in chunk if result[0] in found)
+        start += size
+        size = min(size * 2, MAX_CHUNK_SIZE)
+    return matches[:limit]
+
+
+# Search a queryset for rows similar to a possibly misspelled query
+def fuzzy_search(queryset, query, threshold=None, limit=None):
+    """
+    Filter a queryset to the rows most similar to a query.
+
+    Uses pg_trgm on PostgreSQL and the in-process TrigramIndex of the
+    model everywhere else. The model must be registered first.
+
+    On PostgreSQL the % operator also applies pg_trgm.similarity_threshold
+    (0.3 by default), so lower thresholds need that setting lowered too.
+
+    Args:
+        queryset (QuerySet): The rows to search.
+        query (str): The search query, typos allowed.
+        threshold (float): The minimum similarity between 0 and 1,
+            defaults to the FUZZY_SEARCH_THRESHOLD setting.
+        limit (int): The maximum number of results, defaults to the
+            FUZZY_SEARCH_LIMIT setting.
+
+    Returns:
+        QuerySet: The matching rows annotated with "similarity".
+    """
+    if threshold is None:
+        threshold = getattr(settings, "FUZZY_SEARCH_THRESHOLD", 0.3)
+    if limit is None:
+        limit = getattr(settings, "FUZZY_SEARCH_LIMIT", 20)
+    index = _indexes[queryset.model]
+
+    if connections[queryset.db].vendor == "postgresql":
+        matches = postgres_similar(queryset, index.fields, query).filter(
+            similarity__gte=threshold
+        )
+        top = matches.order_by("-similarity", "-pk").values("pk")[:limit]
+        return matches.filter(pk__in=top)
+
+    results = filter_matches(
+        queryset, index.search(query, threshold, None), limit
+    )
+    if not results:
+        return queryset.none().annotate(
+            similarity=Value(0.0, output_field=FloatField())
+        )
+    return queryset.filter(
+        pk__in=[pk for pk, _ in results]
+    ).annotate(similarity=Case(
+        *[When(pk=pk, then=Value(score)) for pk, score in results],
+        output_field=FloatField(),
+    ))
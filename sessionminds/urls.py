@@ -5,10 +5,12 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
     TokenBlacklistView
 )
-from .views import root_route
+from .views import metrics_route, root_route, search_route
 
 urlpatterns = [
     path("", root_route),
+    path("search/", search_route),
+    path("metrics/", metrics_route),
     path("admin/", admin.site.urls),
     path("summernote/", include("django_summernote.urls")),
     path("api-auth/", include("rest_framework.urls")),
@@ -1,5 +1,12 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from profiles.models import Profile
+from tools.models import Tool
+from topics.models import Topic
+from .metrics import get_metrics
+from .pool import get_pool_stats
+from .trigram import fuzzy_search
 
 
 @api_view()
@@ -9,3 +16,43 @@ def root_route(request):
         "the documentation at: "
         "https://github.com/DennisSchenkel/sessionminds-frontend"
     })
+
+
+# Typo tolerant search over tools, topics and profiles
+@api_view()
+def search_route(request):
+    """
+    Find tools, topics and profiles by a possibly misspelled query.
+
+    Query parameters:
+        q: The search query, e.g. "brainstroming".
+
+    Returns:
+        Response: The best matches of every kind, most similar first.
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"tools": [], "topics": [], "profiles": []})
+
+    def matches(queryset, *fields):
+        return list(
+            fuzzy_search(queryset, query)
+            .order_by("-similarity", "-pk")
+            .values("id", *fields, "similarity")
+        )
+
+    return Response({
+        "tools": matches(Tool.objects.all(), "title", "slug", "icon"),
+        "topics": matches(Topic.objects.all(), "title", "slug"),
+        "profiles": matches(
+            Profile.objects.all(), "first_name", "last_name", "slug"
+        ),
+    })
+
+
+# Counters of caches and other internals for staff
+@api_view()
+@permission_classes([IsAdminUser])
+def metrics_route(request):
+    # Pool statistics are per process, they describe the serving worker
+    return Response({**get_metrics(), **get_pool_stats()})
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ToolsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tools"
+
+    def ready(self):
+        import tools.signals
+        from sessionminds import cache, trigram
+        from .models import Tool
+
+        trigram.register(Tool, ["title"])
+        cache.register(Tool, "tools")
@@ -0,0 +1,153 @@
+import bisect
+import re
+import threading
+from django.core.cache import cache
+from django.db import DatabaseError
+from .models import Tool
+
+VERSION_KEY = "tools:autocomplete:version"
+
+
+# Get the version of the tool titles shared by all workers
+def get_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+# Mark the tool titles as changed for all workers
+def bump_version():
+    cache.add(VERSION_KEY, 0, None)
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # The key expired between add and incr
+        cache.set(VERSION_KEY, 1, None)
+        return 1
+
+
+# In-process sorted prefix index of tool titles and slugs
+class PrefixIndex:
+    """
+    Sorted list of lowercased title words and slugs for prefix lookups.
+
+    Every tool is indexed by its full title, every later word of the
+    title and its slug, so "star" finds "Retrospective Starfish". Lookups
+    are a binary search plus a scan over the matching range.
+
+    Every worker keeps its own copy. Changes are applied to the copy of
+    the worker that made them and bump a version in the cache, so the
+    other workers notice the change on their next lookup and rebuild.
+
+    Methods:
+        search(prefix, limit):
+            Returns the tools whose titles or slugs start with a prefix.
+        update(tool):
+            Adds or replaces a tool in the index.
+        remove(pk):
+            Removes a tool from the index.
+        warm_up():
+            Builds the index up front, e.g. when a worker starts.
+        clear():
+            Empties the index so it is rebuilt on the next lookup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.keys = []
+            self.entries = {}
+            self.version = None
+
+    # Get the lookup keys of a tool
+    def get_keys(self, pk, title, slug):
+        title = title.lower()
+        keys = {title, (slug or "").lower()}
+        for match in re.finditer(r"\w+", title):
+            if match.start() > 0:
+                keys.add(title[match.start():])
+        return [(key, pk) for key in keys if key]
+
+    def add(self, pk, title, slug, icon):
+        self.entries[pk] = (title, slug, icon)
+        for key in self.get_keys(pk, title, slug):
+            bisect.insort(self.keys, key)
+
+    def discard(self, pk):
+        entry = self.entries.pop(pk, None)
+        if entry is None:
+            return
+        for key in self.get_keys(pk, entry[0], entry[1]):
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def build(self):
+        # Read the version first so changes during the build are noticed
+        version = get_version()
+        rows = Tool.objects.values_list("pk", "title", "slug", "icon")
+        entries = {pk: (title, slug, icon) for pk, title, slug, icon in rows}
+        keys = sorted(
+            key
+            for pk, (title, slug, _) in entries.items()
+            for key in self.get_keys(pk, title, slug)
+        )
+        with self.lock:
+            self.entries = entries
+            self.keys = keys
+            self.version = version
+
+    def warm_up(self):
+        try:
+            self.build()
+        except DatabaseError:
+            # Build lazily on the first lookup instead
+            pass
+
+    # Apply a change and keep this worker current if it was before
+    def apply(self, change):
+        with self.lock:
+            if self.version is not None:
+                change()
+        version = bump_version()
+        with self.lock:
+            if self.version == version - 1:
+                self.version = version
+
+    def update(self, tool):
+        def change():
+            self.discard(tool.pk)
+            self.add(tool.pk, tool.title, tool.slug, tool.icon)
+        self.apply(change)
+
+    def remove(self, pk):
+        self.apply(lambda: self.discard(pk))
+
+    def search(self, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if self.version is None or self.version != get_version():
+            self.build()
+
+        results = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, pk = self.keys[position]
+                position += 1
+                if not key.startswith(prefix):
+                    break
+                if pk in seen:
+                    continue
+                seen.add(pk)
+                title, slug, icon = self.entries[pk]
+                results.append(
+                    {"id": pk, "title": title, "slug": slug, "icon": icon}
+                )
+        return results
+
+
+index = PrefixIndex()
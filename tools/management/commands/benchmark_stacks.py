@@ -0,0 +1,147 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from sessionminds.asyncviews import get_urlconf
+from tools.models import Tool
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the read endpoints under WSGI and ASGI.
+
+    The WSGI run serves the sync views, as deployed with the default
+    Procfile, and sends the requests from a pool of threads, one request
+    per thread at a time like sync workers. The ASGI run serves the
+    async views, as deployed with the uvicorn worker, and sends the
+    requests from one event loop, where every request gets its own
+    thread for the sync parts of the view like under an ASGI server.
+    Every query is delayed by "--latency-ms" to simulate the round trip
+    to a remote database, which is the time async views give back to
+    the loop.
+
+    The response cache is disabled so every request reaches the views.
+    """
+    help = "Benchmark the read endpoints with sync and async clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            default="1,8,32",
+            help="Comma separated list of concurrent request counts.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests per run.",
+        )
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=5.0,
+            help="Simulated database latency per query in milliseconds.",
+        )
+
+    # Get the read endpoints to request in turn
+    def get_paths(self):
+        paths = ["/tools/", "/topics/", "/profiles/"]
+        slug = Tool.objects.values_list("slug", flat=True).first()
+        if slug:
+            paths.append(f"/tools/tool/{slug}/")
+        return paths
+
+    # Send the requests to the sync views from a thread pool and return
+    # the elapsed time
+    def run_sync(self, paths, concurrency, requests):
+        def get(i):
+            response = Client().get(paths[i % len(paths)])
+            # The test client keeps connections open, close them like the
+            # end of a request does
+            connections.close_all()
+            return response.status_code
+
+        start = time.perf_counter()
+        with override_settings(ROOT_URLCONF=get_urlconf(paths, False)):
+            with ThreadPoolExecutor(concurrency) as executor:
+                statuses = list(executor.map(get, range(requests)))
+        return time.perf_counter() - start, statuses
+
+    # Send the requests to the async views from an event loop and return
+    # the elapsed time
+    async def run_async(self, paths, concurrency, requests):
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def get(i):
+            async with semaphore:
+                # Give every request its own thread like an ASGI server
+                async with ThreadSensitiveContext():
+                    response = await client.get(paths[i % len(paths)])
+                    await sync_to_async(connections.close_all)()
+            return response.status_code
+
+        start = time.perf_counter()
+        with override_settings(ROOT_URLCONF=get_urlconf(paths, True)):
+            statuses = await asyncio.gather(
+                *(get(i) for i in range(requests))
+            )
+        return time.perf_counter() - start, statuses
+
+    def handle(self, *args, **options):
+        latency = options["latency_ms"] / 1000
+        requests = options["requests"]
+        paths = self.get_paths()
+
+        # Delay every query on every connection the workers open
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            # Reconnecting wrappers keep their execute wrappers
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING(
+                "SQLite runs queries in-process, the simulated latency "
+                "is all the waiting there is."
+            ))
+        self.stdout.write(f"Requesting {', '.join(paths)}")
+        self.stdout.write(
+            f"{'concurrency':>12} {'wsgi req/s':>12} {'asgi req/s':>12}"
+        )
+
+        connection_created.connect(add_delay)
+        try:
+            with override_settings(
+                RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=["*"]
+            ):
+                for value in options["concurrency"].split(","):
+                    concurrency = int(value)
+                    sync_time, sync_statuses = self.run_sync(
+                        paths, concurrency, requests
+                    )
+                    async_time, async_statuses = asyncio.run(
+                        self.run_async(paths, concurrency, requests)
+                    )
+                    errors = sum(
+                        status != 200
+                        for status in sync_statuses + async_statuses
+                    )
+                    self.stdout.write(
+                        f"{concurrency:>12} {requests / sync_time:>12.1f} "
+                        f"{requests / async_time:>12.1f}"
+                    )
+                    if errors:
+                        self.stdout.write(self.style.WARNING(
+                            f"{errors} requests did not return 200."
+                        ))
+        finally:
+            connection_created.disconnect(add_delay)
@@ -0,0 +1,234 @@
+import random
+import re
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from comments.models import Comment
+from profiles.models import Profile
+from tools.models import Tool
+from topics.models import Topic
+from votes.models import Vote
+
+
+# Summarize how a plan reads its rows
+def describe_plan(plan):
+    text = plan.lower()
+    full_scan = any(
+        re.search(r"\bscan \S+$", line.strip()) for line in text.splitlines()
+    )
+    if "seq scan" in text or full_scan:
+        access = "sequential scan"
+    elif "index only scan" in text or "covering index" in text:
+        access = "index only scan"
+    else:
+        access = "index scan"
+    if "sort" in text or "temp b-tree" in text:
+        access += " + sort"
+    return access
+
+
+class Command(BaseCommand):
+    """
+    Show the query plans of the hot list queries with and without their
+    indexes.
+
+    Every query the list views issue is explained twice: once with the
+    indexes from the model Meta classes and once after dropping them.
+    All changes, including the seeded rows and the dropped indexes, are
+    rolled back at the end.
+    """
+    help = (
+        "Explain the hot list queries with and without their indexes "
+        "on an optionally seeded dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Number of tools to seed before explaining, rolled back.",
+        )
+
+    # Get the hot queries and the indexes that serve them
+    def get_queries(self):
+        tool = Tool.objects.order_by("pk").first()
+        if tool is None:
+            raise CommandError("No tools to explain, use --seed.")
+        tool_ids = list(
+            Tool.objects.order_by("pk").values_list("pk", flat=True)[:10]
+        )
+        return [
+            (
+                "Latest tools",
+                Tool.objects.order_by("-created", "-id")[:10],
+                "tool_created_idx",
+            ),
+            (
+                "Tools by votes",
+                Tool.objects.order_by("-vote_count", "-id")[:10],
+                "tool_vote_count_idx",
+            ),
+            (
+                "Tools by views",
+                Tool.objects.order_by("-view_count", "-id")[:10],
+                "tool_view_count_idx",
+            ),
+            (
+                "Trending tools",
+                Tool.objects.order_by("-trending_score", "-id")[:10],
+                "tool_trending_idx",
+            ),
+            (
+                "Latest tools of a topic",
+                Tool.objects.filter(topic_id=tool.topic_id)
+                .order_by("-created", "-id")[:10],
+                "tool_topic_created_idx",
+            ),
+            (
+                "Tools of a topic by votes",
+                Tool.objects.filter(topic_id=tool.topic_id)
+                .order_by("-vote_count", "-id")[:10],
+                "tool_topic_vote_count_idx",
+            ),
+            (
+                "Trending tools of a topic",
+                Tool.objects.filter(topic_id=tool.topic_id)
+                .order_by("-trending_score", "-id")[:10],
+                "tool_topic_trending_idx",
+            ),
+            (
+                "Tools of a user",
+                Tool.objects.filter(user_id=tool.user_id)
+                .order_by("-created", "-id")[:10],
+                "tool_user_created_idx",
+            ),
+            (
+                "Comments of a tool",
+                Comment.objects.filter(tool_id=tool.pk)
+                .order_by("-created_at", "-id")[:10],
+                "comment_tool_created_idx",
+            ),
+            (
+                "Latest votes",
+                Vote.objects.order_by("-created", "-id")[:10],
+                "vote_created_idx",
+            ),
+            (
+                "Votes of a tool",
+                Vote.objects.filter(tool_id=tool.pk)
+                .order_by("-created", "-id")[:10],
+                "vote_tool_created_idx",
+            ),
+            (
+                "Votes of a user for a page of tools",
+                Vote.objects.filter(user_id=tool.user_id, tool__in=tool_ids)
+                .order_by().values_list("tool_id", "id"),
+                "vote_user_tool_cover_idx",
+            ),
+            (
+                "Profiles by tools",
+                Profile.objects.order_by("-tool_count", "-id")[:10],
+                "profile_tool_count_idx",
+            ),
+            (
+                "Profiles by votes",
+                Profile.objects.order_by("-total_votes", "-id")[:10],
+                "profile_total_votes_idx",
+            ),
+        ]
+
+    # Explain a queryset, the label keeps cached statements apart
+    def explain(self, queryset, label):
+        sql, params = queryset.query.sql_with_params()
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql} /* {label} */", params)
+            return "\n".join(
+                " ".join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+
+    # Insert users, profiles, topics, tools, comments and votes
+    def seed(self, count):
+        users = User.objects.bulk_create([
+            User(username=f"explain-{i}@example.com")
+            for i in range(max(2, count // 50))
+        ])
+        Profile.objects.bulk_create([
+            Profile(
+                user=user,
+                slug=f"explain-{user.pk}",
+                tool_count=random.randint(0, 100),
+                total_votes=random.randint(0, 1000),
+            )
+            for user in users
+        ])
+        topics = Topic.objects.bulk_create([
+            Topic(title=f"Explain Topic {i}", slug=f"explain-topic-{i}")
+            for i in range(20)
+        ])
+        tools = Tool.objects.bulk_create([
+            Tool(
+                title=f"Explain Tool {i}",
+                slug=f"explain-tool-{i}",
+                short_description="Seeded tool",
+                full_description="Seeded tool",
+                instructions="Seeded tool",
+                topic=topics[i % len(topics)],
+                user=users[i % len(users)],
+                vote_count=random.randint(0, 500),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        Comment.objects.bulk_create([
+            Comment(text="Seeded comment", tool=tool, user=users[i % 2])
+            for i, tool in enumerate(tools)
+            for _ in range(2)
+        ], batch_size=1000)
+        Vote.objects.bulk_create([
+            Vote(tool=tool, user=users[(i + offset) % len(users)])
+            for i, tool in enumerate(tools)
+            for offset in range(2)
+        ], batch_size=1000)
+
+        # Give the planner statistics for the new rows
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            queries = self.get_queries()
+
+            plans = {}
+            for name, queryset, _ in queries:
+                plans[name] = [self.explain(queryset, "with index")]
+
+            # Explain again after dropping the indexes
+            with connection.cursor() as cursor:
+                for _, _, index in queries:
+                    cursor.execute(
+                        f"DROP INDEX {connection.ops.quote_name(index)}"
+                    )
+            for name, queryset, _ in queries:
+                plans[name].append(self.explain(queryset, "without index"))
+
+            transaction.set_rollback(True)
+
+        for name, _, index in queries:
+            with_index, without_index = plans[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({index})"))
+            self.stdout.write(
+                f"  without index: {describe_plan(without_index)}"
+            )
+            self.stdout.write(f"  with index:    {describe_plan(with_index)}")
+            if options["verbosity"] > 1:
+                self.stdout.write("  Plan without index:")
+                self.stdout.write(self.indent(without_index))
+                self.stdout.write("  Plan with index:")
+                self.stdout.write(self.indent(with_index))
+
+    def indent(self, plan):
+        return "\n".join(f"    {line}" for line in plan.splitlines())
@@ -0,0 +1,24 @@
+from comments.models import Comment
+from sessionminds.reconcile import ReconcileCountersCommand, count_per
+from tools.models import Tool
+from votes.counters import tool_votes
+from votes.models import Vote
+
+
+class Command(ReconcileCountersCommand):
+    """
+    Rebuild the vote and comment counters of all tools.
+
+    See ReconcileCountersCommand, drifted tools are fixed by one UPDATE.
+    """
+    help = "Rebuild the vote_count and comment_count columns of all tools."
+    model = Tool
+    label = "tools"
+    sharded_counter = tool_votes
+    namespace = "tools"
+
+    def get_counts(self):
+        return {
+            "vote_count": count_per(Vote.objects.all(), "tool"),
+            "comment_count": count_per(Comment.objects.all(), "tool"),
+        }
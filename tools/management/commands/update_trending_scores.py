@@ -0,0 +1,140 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, FloatField, Value, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from sessionminds.cache import bump_version
+from tools.models import Tool
+from votes.models import Vote
+
+# Fixed reference time of the scores, so they never have to be decayed
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+# Votes older than this many half-lives add less than 0.1% to a score
+HORIZON_HALF_LIVES = 10
+
+
+# Compute the trending score of a tool from its votes per hour
+def trending_score(buckets, now, half_life):
+    """
+    Compute the time-decayed vote score of a tool.
+
+    Every vote counts 2 ** (-age / half_life) at the time "now". The
+    score is the logarithm of that sum shifted by the time since EPOCH,
+    which is the same as decaying every tool by the same factor. The
+    order of two scores therefore never changes while no new votes come
+    in, and only tools with new votes have to be recomputed.
+
+    Args:
+        buckets (list): The (hour, number of votes) pairs of the tool.
+        now (datetime): The time the score is computed at.
+        half_life (float): The half-life of a vote in hours.
+
+    Returns:
+        float: The trending score, 0 for tools without votes.
+    """
+    # Votes are taken to be cast in the middle of their hour
+    total = sum(
+        count * 2 ** (
+            -max((now - hour).total_seconds() / 3600 - 0.5, 0) / half_life
+        )
+        for hour, count in buckets
+    )
+    if total <= 0:
+        return 0.0
+    elapsed = (now - EPOCH).total_seconds() / 3600 / half_life
+    return round(elapsed + math.log2(total), 6)
+
+
+class Command(BaseCommand):
+    """
+    Recompute the trending scores of tools with recent votes.
+
+    The votes of all affected tools are read in one aggregate query
+    grouped by tool and hour, and the scores are written back with one
+    UPDATE ... CASE statement per batch. Run it on a schedule, e.g.
+    every 10 minutes with the default window of an hour. With --all,
+    tools without votes in the horizon, e.g. after unvotes, are reset
+    to 0 in one more UPDATE.
+    """
+    help = "Recompute the trending_score column of tools with new votes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since-minutes",
+            type=int,
+            default=60,
+            help="Recompute tools with votes in this many minutes.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every tool with votes, e.g. after unvotes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of tools to write per UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        half_life = getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24)
+        votes = Vote.objects.filter(
+            created__gte=now - timedelta(
+                hours=half_life * HORIZON_HALF_LIVES
+            )
+        )
+        if not options["all"]:
+            recent = Vote.objects.filter(
+                created__gte=now - timedelta(minutes=options["since_minutes"])
+            ).values("tool_id")
+            votes = votes.filter(tool_id__in=recent)
+
+        # Count the votes of all affected tools per hour in one query
+        buckets = {}
+        rows = (
+            votes.annotate(hour=TruncHour("created"))
+            .order_by()
+            .values_list("tool_id", "hour")
+            .annotate(count=Count("pk"))
+        )
+        for tool_id, hour, count in rows:
+            buckets.setdefault(tool_id, []).append((hour, count))
+
+        scores = sorted(
+            (tool_id, trending_score(tool_buckets, now, half_life))
+            for tool_id, tool_buckets in buckets.items()
+        )
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            for i in range(0, len(scores), batch_size):
+                batch = scores[i:i + batch_size]
+                Tool.objects.filter(
+                    pk__in=[tool_id for tool_id, _ in batch]
+                ).update(trending_score=Case(
+                    *[
+                        When(pk=tool_id, then=Value(score))
+                        for tool_id, score in batch
+                    ],
+                    output_field=FloatField(),
+                ))
+
+            # Reset the scores of tools whose votes are gone or too old
+            reset = 0
+            if options["all"]:
+                reset = Tool.objects.exclude(
+                    pk__in=votes.values("tool_id")
+                ).exclude(trending_score=0).update(trending_score=0)
+
+        if scores or reset:
+            # The update sends no signals, invalidate cached lists here
+            bump_version("tools")
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the trending scores of {len(scores)} tools, "
+            f"reset {reset}."
+        ))
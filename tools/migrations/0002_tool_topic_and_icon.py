@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("topics", "0001_initial"),
+        ("tools", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="tool",
+            name="topics",
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="icon",
+            field=models.CharField(default="26aa", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="topic",
+            field=models.ForeignKey(
+                default=1,
+                on_delete=django.db.models.deletion.SET_DEFAULT,
+                related_name="tools",
+                to="topics.topic",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tool",
+            name="full_description",
+            field=models.TextField(max_length=500),
+        ),
+        migrations.AlterField(
+            model_name="tool",
+            name="instructions",
+            field=models.TextField(max_length=5000),
+        ),
+        migrations.AlterField(
+            model_name="tool",
+            name="short_description",
+            field=models.TextField(max_length=50),
+        ),
+    ]
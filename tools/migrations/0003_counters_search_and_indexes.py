@@ -0,0 +1,200 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:45
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Columns searched with their tsvector weights, see tools/search.py
+SEARCH_FIELDS = [
+    ("title", "A"),
+    ("short_description", "B"),
+    ("full_description", "C"),
+    ("instructions", "D"),
+]
+COLUMNS = ", ".join(field for field, _ in SEARCH_FIELDS)
+VECTOR = " || ".join(
+    f"setweight(to_tsvector('english', coalesce(NEW.{field}, '')), "
+    f"'{weight}')"
+    for field, weight in SEARCH_FIELDS
+)
+NEW_VALUES = ", ".join(f"new.{field}" for field, _ in SEARCH_FIELDS)
+OLD_VALUES = ", ".join(f"old.{field}" for field, _ in SEARCH_FIELDS)
+FTS_INSERT = (
+    f"INSERT INTO tools_tool_fts(rowid, {COLUMNS}) "
+    f"VALUES (new.id, {NEW_VALUES});"
+)
+FTS_DELETE = (
+    f"INSERT INTO tools_tool_fts(tools_tool_fts, rowid, {COLUMNS}) "
+    f"VALUES ('delete', old.id, {OLD_VALUES});"
+)
+
+
+# RunSQL that only runs on one database vendor
+class VendorRunSQL(migrations.RunSQL):
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def applies(self, connection):
+        if connection.vendor != self.vendor:
+            return False
+        if self.vendor != "sqlite":
+            return True
+        # FTS5 is optional in SQLite builds
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            return bool(cursor.fetchone()[0])
+
+    def database_forwards(self, app_label, schema_editor, *args):
+        if self.applies(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, *args)
+
+    def database_backwards(self, app_label, schema_editor, *args):
+        if self.applies(schema_editor.connection):
+            super().database_backwards(app_label, schema_editor, *args)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tools", "0002_tool_topic_and_icon"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tool",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="trending_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="view_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tool",
+            name="vote_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(fields=["-created", "-id"], name="tool_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["topic", "-created", "-id"], name="tool_topic_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["user", "-created", "-id"], name="tool_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["-vote_count", "-id"], name="tool_vote_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["topic", "-vote_count", "-id"], name="tool_topic_vote_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["-comment_count", "-id"], name="tool_comment_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["-view_count", "-id"], name="tool_view_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["-trending_score", "-id"], name="tool_trending_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tool",
+            index=models.Index(
+                fields=["topic", "-trending_score", "-id"],
+                name="tool_topic_trending_idx",
+            ),
+        ),
+        # Keep search_vector up to date with a trigger and index it
+        VendorRunSQL(
+            "postgresql",
+            sql=[
+                f"""
+                CREATE OR REPLACE FUNCTION tools_tool_search_vector_update()
+                RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector := {VECTOR};
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                "DROP TRIGGER IF EXISTS tools_tool_search_vector_trigger "
+                "ON tools_tool",
+                f"""
+                CREATE TRIGGER tools_tool_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF {COLUMNS} ON tools_tool
+                FOR EACH ROW
+                EXECUTE FUNCTION tools_tool_search_vector_update()
+                """,
+                "CREATE INDEX IF NOT EXISTS tools_tool_search_vector_gin "
+                "ON tools_tool USING gin (search_vector)",
+                # Fill the vector of existing tools by firing the trigger
+                "UPDATE tools_tool SET title = title "
+                "WHERE search_vector IS NULL",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS tools_tool_search_vector_gin",
+                "DROP TRIGGER IF EXISTS tools_tool_search_vector_trigger "
+                "ON tools_tool",
+                "DROP FUNCTION IF EXISTS tools_tool_search_vector_update()",
+            ],
+        ),
+        # External content FTS5 table kept up to date by triggers
+        VendorRunSQL(
+            "sqlite",
+            sql=[
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS tools_tool_fts "
+                f"USING fts5({COLUMNS}, content='tools_tool', "
+                f"content_rowid='id', tokenize='porter unicode61')",
+                f"CREATE TRIGGER IF NOT EXISTS tools_tool_fts_insert "
+                f"AFTER INSERT ON tools_tool BEGIN {FTS_INSERT} END",
+                f"CREATE TRIGGER IF NOT EXISTS tools_tool_fts_delete "
+                f"AFTER DELETE ON tools_tool BEGIN {FTS_DELETE} END",
+                f"CREATE TRIGGER IF NOT EXISTS tools_tool_fts_update "
+                f"AFTER UPDATE OF {COLUMNS} ON tools_tool "
+                f"BEGIN {FTS_DELETE} {FTS_INSERT} END",
+                "INSERT INTO tools_tool_fts(tools_tool_fts) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS tools_tool_fts_update",
+                "DROP TRIGGER IF EXISTS tools_tool_fts_delete",
+                "DROP TRIGGER IF EXISTS tools_tool_fts_insert",
+                "DROP TABLE IF EXISTS tools_tool_fts",
+            ],
+        ),
+    ]
@@ -1,9 +1,16 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
 from topics.models import Topic
 from django.utils.text import slugify
 
 
+# Manager that never loads the search vector of tools
+class ToolManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
+
 class Tool(models.Model):
     """
     Represents a tool.
@@ -17,6 +24,14 @@ class Tool(models.Model):
         icon (str): The icon code for the tool.
         slug (str): The slug field for the tool.
         user (ForeignKey): The author of the tool entry.
+        vote_count (int): The number of votes for the tool.
+        comment_count (int): The number of comments on the tool.
+        view_count (int): The number of times the tool was viewed,
+            written in batches by tools.viewcounts.
+        trending_score (float): The time-decayed vote score of the tool,
+            computed by the update_trending_scores command.
+        search_vector (tsvector): The full text search document of the
+            tool, maintained by the database on PostgreSQL.
         created (datetime): Date and time when the tool was created.
         updated (datetime): Date and time when the tool was last updated.
 
@@ -45,9 +60,57 @@ class Tool(models.Model):
         on_delete=models.SET_DEFAULT,
         default=1,
         )
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = ToolManager()
+
+    # Indexes for the orderings and filters of the tool lists
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created", "-id"],
+                name="tool_created_idx",
+            ),
+            models.Index(
+                fields=["topic", "-created", "-id"],
+                name="tool_topic_created_idx",
+            ),
+            models.Index(
+                fields=["user", "-created", "-id"],
+                name="tool_user_created_idx",
+            ),
+            models.Index(
+                fields=["-vote_count", "-id"],
+                name="tool_vote_count_idx",
+            ),
+            models.Index(
+                fields=["topic", "-vote_count", "-id"],
+                name="tool_topic_vote_count_idx",
+            ),
+            models.Index(
+                fields=["-comment_count", "-id"],
+                name="tool_comment_count_idx",
+            ),
+            models.Index(
+                fields=["-view_count", "-id"],
+                name="tool_view_count_idx",
+            ),
+            models.Index(
+                fields=["-trending_score", "-id"],
+                name="tool_trending_idx",
+            ),
+            models.Index(
+                fields=["topic", "-trending_score", "-id"],
+                name="tool_topic_trending_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
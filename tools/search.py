@@ -0,0 +1,204 @@
+import re
+from django.db import connections
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Ln
+from sessionminds.trigram import fuzzy_search
+from .models import Tool
+
+# Weight of the vote count in the blended ranking
+VOTE_WEIGHT = 0.25
+
+# Columns searched, with their weight for the ranking, the triggers of
+# tools/migrations/0003 index the same columns
+SEARCH_FIELDS = [
+    ("title", "A", 10.0),
+    ("short_description", "B", 5.0),
+    ("full_description", "C", 2.0),
+    ("instructions", "D", 1.0),
+]
+
+
+# Base class for search backends
+class SearchBackend:
+    """
+    Base class for the full text search backends of tools.
+
+    A backend filters a tool queryset by a search query and annotates
+    every result with "search_rank", the text relevance blended with the
+    vote count of the tool.
+
+    Args:
+        connection: The database connection the backend searches on.
+
+    Methods:
+        search(queryset, query):
+            Filters and ranks the tools of a queryset by a query.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    # Blend a relevance expression with the vote count of the tool
+    def blend(self, relevance):
+        votes = Cast(F("vote_count"), FloatField()) + Value(1.0)
+        return ExpressionWrapper(
+            relevance * (Value(1.0) + Value(VOTE_WEIGHT) * Ln(votes)),
+            output_field=FloatField(),
+        )
+
+
+# Search backend with a maintained tsvector column and a GIN index
+class PostgresSearchBackend(SearchBackend):
+    """
+    Full text search on PostgreSQL.
+
+    Tool.search_vector is kept up to date by a trigger whenever one of the
+    searched columns changes and is indexed with a GIN index, both created
+    by the tools migrations.
+    """
+    config = "english"
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(
+            query, config=self.config, search_type="websearch"
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=self.blend(
+                SearchRank(F("search_vector"), search_query)
+            )
+        )
+
+
+# Search backend with an FTS5 virtual table
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Full text search on SQLite with an external content FTS5 table.
+
+    The FTS5 table is kept up to date by triggers on the tools table,
+    both created by the tools migrations, and results are ranked with
+    bm25().
+    """
+
+    @property
+    def fts_table(self):
+        return f"{Tool._meta.db_table}_fts"
+
+    # Turn user input into an FTS5 query of quoted prefix terms
+    def match_expression(self, query):
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+
+        table = Tool._meta.db_table
+        fts = self.fts_table
+        weights = ", ".join(str(weight) for _, _, weight in SEARCH_FIELDS)
+        relevance = RawSQL(
+            f"(SELECT -bm25({fts}, {weights}) FROM {fts} "
+            f"WHERE {fts} MATCH %s AND rowid = {table}.id)",
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match]
+            )
+        ).annotate(search_rank=self.blend(relevance))
+
+
+# Search backend for databases without full text search
+class SimpleSearchBackend(SearchBackend):
+    """
+    Fallback search that matches every word anywhere in a tool.
+
+    Title matches rank above matches in the other columns.
+    """
+
+    def search(self, queryset, query):
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return queryset.none()
+
+        for term in terms:
+            matches = Q()
+            for field, _, _ in SEARCH_FIELDS:
+                matches |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(matches)
+
+        in_title = Q()
+        for term in terms:
+            in_title &= Q(title__icontains=term)
+        relevance = ExpressionWrapper(
+            Value(1.0) + Cast(
+                ExpressionWrapper(in_title, output_field=FloatField()),
+                FloatField(),
+            ),
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=self.blend(relevance))
+
+
+_backends = {}
+
+
+# Get the search backend for a database
+def get_search_backend(using="default"):
+    """
+    Get the search backend for a database alias.
+
+    Args:
+        using (str): The database alias.
+
+    Returns:
+        SearchBackend: The backend matching the database vendor.
+    """
+    if using not in _backends:
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            backend = PostgresSearchBackend(connection)
+        elif connection.vendor == "sqlite" and has_fts5(connection):
+            backend = SQLiteSearchBackend(connection)
+        else:
+            backend = SimpleSearchBackend(connection)
+        _backends[using] = backend
+    return _backends[using]
+
+
+# Check if SQLite was compiled with FTS5
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+# Search tools with the backend of the queryset's database
+def search_tools(queryset, query):
+    """
+    Filter tools by a search query and rank them by relevance.
+
+    If no tool matches the words of the query, tools with titles similar
+    to the query are returned instead so typos still find results.
+
+    Args:
+        queryset (QuerySet): The tools to search.
+        query (str): The search query entered by the user.
+
+    Returns:
+        QuerySet: The matching tools annotated with "search_rank".
+    """
+    backend = get_search_backend(queryset.db)
+    results = backend.search(queryset, query)
+    if not results.exists():
+        results = fuzzy_search(queryset, query).annotate(
+            search_rank=backend.blend(F("similarity"))
+        )
+    return results
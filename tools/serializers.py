@@ -1,22 +1,37 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from sessionminds.serializers import (
+    DynamicFieldsMixin,
+    FragmentCacheMixin,
+    FragmentListSerializer,
+)
 from .models import Tool
 from topics.models import Topic
+from comments.models import Comment
+from votes.counters import tool_votes
+from votes.models import Vote
 from topics.serializers import TopicSerializer
 from profiles.serializers import ProfileSerializer
 from comments.serializers import CommentSerializer
 
 
-class ToolSerializer(serializers.ModelSerializer):
+class ToolSerializer(
+    FragmentCacheMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for the Tool model.
 
     Args:
+        FragmentCacheMixin: Caches the serialized columns of every tool.
+        DynamicFieldsMixin: Selects the fields of the response per request.
         serializers.ModelSerializer: The base serializer class.
 
     Returns:
         ToolSerializer: The serialized Tool object.
     """
     is_owner = serializers.SerializerMethodField()
+    user_has_voted = serializers.SerializerMethodField()
+    vote_id = serializers.SerializerMethodField()
     user = serializers.ReadOnlyField(source="user.username")
     profile = ProfileSerializer(source="user.profile", read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
@@ -32,14 +47,68 @@ class ToolSerializer(serializers.ModelSerializer):
     # Read-only field to include full topic details in the response
     topic = TopicSerializer(read_only=True)
 
-    vote_count = serializers.SerializerMethodField()
+    # Load everything a list of tools needs in a fixed number of queries:
+    # author and profile are joined, topic (with icon and tool count) and
+    # comments (with their authors' profiles) are prefetched in one query
+    # each. Vote and comment counts are stored on the tool itself.
+    # Joins, prefetches and columns the response does not use are skipped.
+    def setup_eager_loading(self, queryset):
+        fields = self.fields
+
+        if "profile" in fields:
+            queryset = queryset.select_related("user__profile")
+            if isinstance(fields["profile"], ProfileSerializer):
+                queryset = queryset.defer(*[
+                    f"user__profile__{name}"
+                    for name in fields["profile"].get_deferred_fields()
+                ])
+        elif "user" in fields:
+            queryset = queryset.select_related("user")
+
+        if isinstance(fields.get("topic"), TopicSerializer):
+            queryset = queryset.prefetch_related(Prefetch(
+                "topic",
+                queryset=fields["topic"].setup_eager_loading(
+                    Topic.objects.all()
+                    ),
+            ))
+
+        if "comments" in fields:
+            comments = getattr(fields["comments"], "child", None)
+            if isinstance(comments, CommentSerializer):
+                comment_queryset = comments.setup_eager_loading(
+                    Comment.objects.all()
+                    )
+            else:
+                comment_queryset = Comment.objects.only("id", "tool")
+            queryset = queryset.prefetch_related(
+                Prefetch("comments", queryset=comment_queryset)
+            )
+
+        return queryset.defer(*self.get_deferred_fields())
+
+    # Look up the votes of the user and the pending votes for a page
+    def render_fragments(self, instances):
+        fields = self.fields
+        if "user_has_voted" in fields or "vote_id" in fields:
+            self.user_votes = Vote.objects.get_user_votes(
+                self.context["request"].user,
+                [instance.pk for instance in instances],
+            )
+        data = super().render_fragments(instances)
+        if "vote_count" in fields:
+            tool_votes.apply_pending(instances, data)
+        return data
 
     def get_is_owner(self, obj):
         request = self.context["request"]
-        return request.user == obj.user
+        return request.user.id == obj.user_id
+
+    def get_user_has_voted(self, obj):
+        return obj.pk in self.user_votes
 
-    def get_vote_count(self, obj):
-        return obj.votes.count()
+    def get_vote_id(self, obj):
+        return self.user_votes.get(obj.pk)
 
     # Override the create method to handle topic_id field
     def create(self, validated_data):
@@ -78,5 +147,22 @@ class ToolSerializer(serializers.ModelSerializer):
             "updated",
             "is_owner",
             "vote_count",
+            "comment_count",
+            "view_count",
+            "user_has_voted",
+            "vote_id",
             "comments",
         ]
+        list_serializer_class = FragmentListSerializer
+
+        # Counters are updated without a save and never cached
+        live_fields = ["vote_count", "comment_count", "view_count"]
+
+        # Collapsed fields used for nested fields that are not expanded
+        expandable_fields = {
+            "topic": serializers.PrimaryKeyRelatedField(read_only=True),
+            "profile": serializers.ReadOnlyField(source="user.profile.id"),
+            "comments": serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True
+                ),
+        }
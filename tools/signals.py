@@ -0,0 +1,115 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from comments.models import Comment
+from votes.counters import tool_votes
+from votes.models import Vote
+from . import autocomplete
+from .models import Tool
+
+
+# Add a delta to a counter column of a tool
+def adjust_tool_counter(tool_id, field, delta):
+    """
+    Add a delta to a counter column of a tool in a single UPDATE.
+
+    The counter is changed with an F() expression, so concurrent votes and
+    comments never overwrite each other. Counters never drop below zero.
+
+    Args:
+        tool_id (int): The primary key of the tool.
+        field (str): The name of the counter column.
+        delta (int): The value to add to the counter.
+    """
+    tools = Tool.objects.filter(pk=tool_id)
+    if delta < 0:
+        tools = tools.filter(**{f"{field}__gte": -delta})
+    tools.update(**{field: F(field) + delta})
+
+
+# Signal receiver to count a new vote for a tool
+@receiver(post_save, sender=Vote)
+def increment_vote_count(sender, instance, created, **kwargs):
+    """
+    Increment the vote count of the tool a new vote was given to.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        created: Whether the instance was just created.
+        kwargs: Additional keyword arguments.
+    """
+    if created:
+        tool_votes.add(instance.tool_id, 1)
+
+
+# Signal receiver to uncount a deleted vote for a tool
+@receiver(post_delete, sender=Vote)
+def decrement_vote_count(sender, instance, **kwargs):
+    """
+    Decrement the vote count of the tool a vote was removed from.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        kwargs: Additional keyword arguments.
+    """
+    tool_votes.add(instance.tool_id, -1)
+
+
+# Signal receiver to count a new comment on a tool
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """
+    Increment the comment count of the tool a comment was added to.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        created: Whether the instance was just created.
+        kwargs: Additional keyword arguments.
+    """
+    if created:
+        adjust_tool_counter(instance.tool_id, "comment_count", 1)
+
+
+# Signal receiver to uncount a deleted comment on a tool
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """
+    Decrement the comment count of the tool a comment was removed from.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        kwargs: Additional keyword arguments.
+    """
+    adjust_tool_counter(instance.tool_id, "comment_count", -1)
+
+
+# Signal receiver to index a new or changed tool for autocomplete
+@receiver(post_save, sender=Tool)
+def update_autocomplete_index(sender, instance, **kwargs):
+    """
+    Add or replace a tool in the autocomplete index.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        kwargs: Additional keyword arguments.
+    """
+    autocomplete.index.update(instance)
+
+
+# Signal receiver to remove a deleted tool from autocomplete
+@receiver(post_delete, sender=Tool)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    """
+    Remove a deleted tool from the autocomplete index.
+
+    Args:
+        sender: The sender of the signal.
+        instance: The instance of the sender.
+        kwargs: Additional keyword arguments.
+    """
+    autocomplete.index.remove(instance.pk)
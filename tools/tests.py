@@ -1,8 +1,42 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from importlib import import_module
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import async_to_sync
+from unittest import skipUnless
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from sessionminds import metrics, pool, trigram
+from sessionminds.asyncviews import get_urlconf
+from sessionminds.cache import (
+    MODIFIED_PREFIX, bump_version, cache_anonymous_response,
+)
+from sessionminds.middleware import ReplicaMiddleware
+from sessionminds.routers import ReplicaRouter
+from . import autocomplete, viewcounts
 from .models import Tool
+from .views import ToolList
 from topics.models import Topic
+from comments.models import Comment
+from votes.models import CounterShard, Vote
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework.views import APIView
 
 
 class ToolsTest1ListView(APITestCase):
@@ -214,3 +248,1344 @@ class ToolsTests2DetailView(APITestCase):
             )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         print("Test passed \n")
+
+
+class ToolsTest3ListQueries(APITestCase):
+    def setUp(self):
+        # Create topic
+        self.topic = Topic.objects.create(title="Test Topic")
+
+    # Create tools with their own author, a comment and a vote each
+    def create_tools(self, count):
+        for i in range(Tool.objects.count(), Tool.objects.count() + count):
+            user = User.objects.create_user(
+                username=f"listuser{i}@example.com",
+                password="TestUser1234!!"
+            )
+            tool = Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=user,
+                topic=self.topic
+            )
+            Comment.objects.create(tool=tool, user=user, text="Comment")
+            Vote.objects.create(tool=tool, user=user)
+
+    # Count the queries of a list endpoint
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    # Test that the number of queries does not grow with the page size
+    def test_10_list_queries_do_not_grow_with_page_size(self):
+        print("\nTools Test 10: List queries do not grow with page size")
+        urls = [
+            "/tools/",
+            "/tools/?ordering=votes",
+            f"/topics/list/{self.topic.slug}/",
+        ]
+        self.create_tools(2)
+        small = [self.count_queries(url)[0] for url in urls]
+        self.create_tools(8)
+        large = [self.count_queries(url)[0] for url in urls]
+        self.assertEqual(small, large)
+
+        query_count, response = self.count_queries("/tools/")
+        tool = response.data["results"][0]
+        self.assertEqual(tool["vote_count"], 1)
+        self.assertEqual(tool["comment_count"], 1)
+        self.assertEqual(tool["topic"]["tool_count"], 10)
+        self.assertEqual(len(tool["comments"]), 1)
+        print("Test passed \n")
+
+    # Test that the tools by user list uses the same query budget
+    def test_11_tools_by_user_queries(self):
+        print("\nTools Test 11: Tools by user list queries")
+        self.create_tools(1)
+        user = Tool.objects.get().user
+        for i in range(5):
+            Tool.objects.create(
+                title=f"User Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=user,
+                topic=self.topic
+            )
+        query_count, response = self.count_queries(f"/tools/user/{user.id}/")
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertLessEqual(query_count, 4)
+        print("Test passed \n")
+
+
+@override_settings(LIST_ETAG_TABLE_STATE=False)
+class ToolsTest4Fieldsets(APITestCase):
+    def setUp(self):
+        # Create user, topic, tool and comment
+        self.user = User.objects.create_user(
+            username="fielduser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+        self.comment = Comment.objects.create(
+            tool=self.tool, user=self.user, text="Comment"
+        )
+
+    # Test to select fields of the tools list
+    def test_12_sparse_fieldsets(self):
+        print("\nTools Test 12: Sparse fieldsets")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/tools/?fields=id,title,profile.slug", format="json"
+                )
+        tool = response.data["results"][0]
+        self.assertEqual(list(tool), ["id", "title", "profile"])
+        self.assertEqual(list(tool["profile"]), ["slug"])
+
+        # Unused columns are deferred and unused relations not loaded
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("instructions", sql)
+        self.assertNotIn("profile_description", sql)
+        self.assertNotIn("comments_comment", sql)
+
+        response = self.client.get(
+            "/tools/?omit=instructions,comments,profile.image", format="json"
+            )
+        tool = response.data["results"][0]
+        self.assertNotIn("instructions", tool)
+        self.assertNotIn("comments", tool)
+        self.assertNotIn("image", tool["profile"])
+        self.assertIn("full_description", tool)
+        print("Test passed \n")
+
+    # Test to collapse nested fields that are not expanded
+    def test_13_expand(self):
+        print("\nTools Test 13: Expand nested fields")
+        response = self.client.get("/tools/?expand=topic", format="json")
+        tool = response.data["results"][0]
+        self.assertEqual(tool["topic"]["title"], "Test Topic")
+        self.assertEqual(tool["profile"], self.user.profile.id)
+        self.assertEqual(tool["comments"], [self.comment.id])
+
+        response = self.client.get(f"/tools/{self.tool.id}/", format="json")
+        self.assertEqual(response.data["profile"]["id"], self.user.profile.id)
+        print("Test passed \n")
+
+
+class ToolsTest5ReconcileCounters(APITestCase):
+    def setUp(self):
+        # Create user, topic and tool with a vote and a comment
+        self.user = User.objects.create_user(
+            username="reconcileuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+        self.other = User.objects.create_user(
+            username="reconcileother@example.com",
+            password="TestUser1234!!"
+        )
+        Vote.objects.create(tool=self.tool, user=self.user)
+        Comment.objects.create(tool=self.tool, user=self.user, text="Hi")
+
+    # Test that the reconcile command fixes drifted counters
+    def test_14_reconcile_counters(self):
+        print("\nTools Test 14: Reconcile tool counters")
+        Tool.objects.update(vote_count=5, comment_count=0)
+
+        out = StringIO()
+        call_command("reconcile_tool_counters", "--dry-run", stdout=out)
+        self.assertIn("Found 1 drifted", out.getvalue())
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 5)
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("reconcile_tool_counters", "-v", "2", stdout=out)
+        self.assertIn("Fixed 1 drifted", out.getvalue())
+        self.assertIn("vote_count 5 -> 1", out.getvalue())
+        self.assertEqual(
+            sum(query["sql"].startswith("UPDATE") for query in queries), 1
+        )
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 1)
+        self.assertEqual(self.tool.comment_count, 1)
+
+        # Dry runs count pending shards and leave them unfolded
+        with override_settings(COUNTER_SHARDS=4):
+            Vote.objects.create(tool=self.tool, user=self.other)
+            out = StringIO()
+            call_command("reconcile_tool_counters", "--dry-run", stdout=out)
+            self.assertIn("Found 0 drifted", out.getvalue())
+            shards = CounterShard.objects.filter(
+                counter="tools.Tool.vote_count"
+            )
+            self.assertTrue(shards.exists())
+            call_command("reconcile_tool_counters", stdout=out)
+            self.assertFalse(shards.exists())
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 2)
+        print("Test passed \n")
+
+
+class ToolsTest6CursorPagination(APITestCase):
+    def setUp(self):
+        # Create user, topic and tools with different vote counts
+        self.user = User.objects.create_user(
+            username="cursoruser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        for i in range(5):
+            Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=self.user,
+                topic=self.topic
+            )
+        Tool.objects.filter(title="Test Tool 1").update(vote_count=3)
+        Tool.objects.filter(title="Test Tool 3").update(vote_count=3)
+
+    # Collect all pages by following the next links
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            pages.append([tool["id"] for tool in response.data["results"]])
+            url = response.data["next"]
+        return pages, response
+
+    # Test to page through tools with cursors
+    def test_15_cursor_pagination(self):
+        print("\nTools Test 15: Cursor pagination")
+        pages, response = self.walk("/tools/?pagination=cursor&page_size=2")
+        latest = list(
+            Tool.objects.order_by("-created", "-id").values_list(
+                "id", flat=True
+                )
+        )
+        self.assertEqual(sum(pages, []), latest)
+        self.assertEqual(len(pages), 3)
+
+        # The previous link of the last page leads back to the second page
+        response = self.client.get(response.data["previous"], format="json")
+        ids = [tool["id"] for tool in response.data["results"]]
+        self.assertEqual(ids, pages[1])
+        self.assertIsNotNone(response.data["previous"])
+
+        pages, response = self.walk(
+            "/tools/?ordering=votes&pagination=cursor&page_size=2"
+            )
+        top = list(
+            Tool.objects.order_by("-vote_count", "-id").values_list(
+                "id", flat=True
+                )
+        )
+        self.assertEqual(sum(pages, []), top)
+
+        response = self.client.get("/tools/?cursor=invalid", format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Page number pagination stays the default
+        response = self.client.get("/tools/?page=2&page_size=2")
+        self.assertEqual(response.data["count"], 5)
+        print("Test passed \n")
+
+
+class ToolsTest7CountStrategies(APITestCase):
+    def setUp(self):
+        # Create user, topic and tools
+        self.user = User.objects.create_user(
+            username="countuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        for i in range(5):
+            Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=self.user,
+                topic=self.topic
+            )
+
+    # Test the count types of paginated responses
+    def test_16_count_strategies(self):
+        print("\nTools Test 16: Count strategies")
+        response = self.client.get("/tools/?page_size=2", format="json")
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(response.data["count_type"], "exact")
+
+        # Results above the threshold get a cached count on SQLite
+        with self.settings(
+            PAGINATION_EXACT_COUNT_THRESHOLD=3, RESPONSE_CACHE_ENABLED=False
+        ):
+            response = self.client.get("/tools/?page_size=2", format="json")
+        self.assertEqual(response.data["count"], 5)
+        self.assertIn(response.data["count_type"], ["cached", "estimate"])
+
+        # Without a count the next link is still known
+        response = self.client.get(
+            "/tools/?page_size=2&page=2&count=none", format="json"
+            )
+        self.assertIsNone(response.data["count"])
+        self.assertEqual(response.data["count_type"], "none")
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+
+        response = self.client.get(
+            "/tools/?page_size=2&page=3&count=none", format="json"
+            )
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get(
+            "/tools/?page_size=2&page=4&count=none", format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        print("Test passed \n")
+
+
+# Create the search objects of the tools migrations, which do not run
+# when the test database is built from the models
+def install_search(connection):
+    migration = import_module(
+        "tools.migrations.0003_counters_search_and_indexes"
+    )
+    for operation in migration.Migration.operations:
+        if isinstance(operation, migration.VendorRunSQL) and (
+            operation.applies(connection)
+        ):
+            with connection.cursor() as cursor:
+                for statement in operation.sql:
+                    cursor.execute(statement)
+
+
+class ToolsTest8Search(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        install_search(connection)
+
+    def setUp(self):
+        # Start every test with an empty in-process trigram index
+        trigram.reset_indexes()
+
+        # Create users, topics and tools with searchable text
+        self.user = User.objects.create_user(
+            username="searchuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.other_user = User.objects.create_user(
+            username="othersearchuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Retros")
+        self.other_topic = Topic.objects.create(title="Warmups")
+        self.title_match = Tool.objects.create(
+            title="Retrospective Starfish",
+            short_description="Five areas",
+            full_description="Collect feedback in five areas",
+            instructions="Draw a starfish",
+            user=self.user,
+            topic=self.topic
+        )
+        self.text_match = Tool.objects.create(
+            title="Sailboat",
+            short_description="Wind and anchors",
+            full_description="A retrospective with a boat",
+            instructions="Draw a boat",
+            user=self.user,
+            topic=self.topic
+        )
+        self.voted_match = Tool.objects.create(
+            title="Speedboat",
+            short_description="Motors and anchors",
+            full_description="A retrospective with a speedboat",
+            instructions="Draw a speedboat",
+            user=self.other_user,
+            topic=self.other_topic,
+            vote_count=3
+        )
+        Tool.objects.create(
+            title="Check-in",
+            short_description="Start the session",
+            full_description="Ask everyone how they feel",
+            instructions="Go around the room",
+            user=self.user,
+            topic=self.other_topic
+        )
+
+    def search(self, query):
+        response = self.client.get(f"/tools/?{query}", format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [tool["id"] for tool in response.data["results"]]
+
+    # Test ranked full text search with filters
+    def test_17_search(self):
+        print("\nTools Test 17: Full text search")
+        # Title matches rank first, votes break even text relevance
+        self.assertEqual(self.search("search=retrospectives"), [
+            self.title_match.id, self.voted_match.id, self.text_match.id
+        ])
+
+        # Words match by prefix in any order and all must match
+        self.assertEqual(
+            self.search("search=anchor%20motor"), [self.voted_match.id]
+        )
+        self.assertEqual(self.search("search=xylophone"), [])
+
+        # Edits are searchable right away
+        self.text_match.instructions = "Draw a lighthouse"
+        self.text_match.save()
+        self.assertEqual(
+            self.search("search=lighthouse"), [self.text_match.id]
+        )
+
+        # Search results can be filtered by topic and author
+        self.assertEqual(
+            self.search(f"search=retrospective&topic={self.topic.slug}"),
+            [self.title_match.id, self.text_match.id]
+        )
+        self.assertEqual(
+            self.search(f"search=retrospective&author={self.other_user.id}"),
+            [self.voted_match.id]
+        )
+
+        # Ranked results page through with cursors
+        response = self.client.get(
+            "/tools/?search=retrospective&pagination=cursor&page_size=2",
+            format="json"
+            )
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(response.data["next"], format="json")
+        self.assertEqual(
+            [tool["id"] for tool in response.data["results"]],
+            [self.text_match.id]
+        )
+        print("Test passed \n")
+
+
+class ToolsTest9FuzzySearch(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        install_search(connection)
+
+    def setUp(self):
+        # Start every test with an empty in-process trigram index
+        trigram.reset_indexes()
+
+        # Create user, topic and tools
+        self.user = User.objects.create_user(
+            username="fuzzyuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.user.profile.first_name = "Brianna"
+        self.user.profile.last_name = "Storm"
+        self.user.profile.save()
+        self.topic = Topic.objects.create(title="Retrospectives")
+        self.brainstorming = Tool.objects.create(
+            title="Brainstorming Session",
+            short_description="Collect ideas",
+            full_description="Collect as many ideas as possible",
+            instructions="Write ideas on cards",
+            user=self.user,
+            topic=self.topic
+        )
+        Tool.objects.create(
+            title="Lean Coffee",
+            short_description="Agenda free meeting",
+            full_description="Participants build the agenda",
+            instructions="Vote on topics",
+            user=self.user,
+            topic=self.topic
+        )
+
+    # Test typo tolerant search for tools, topics and profiles
+    def test_18_fuzzy_search(self):
+        print("\nTools Test 18: Fuzzy search")
+        # Misspelled searches fall back to similar titles
+        response = self.client.get("/tools/?search=brainstroming")
+        self.assertEqual(
+            [tool["id"] for tool in response.data["results"]],
+            [self.brainstorming.id]
+        )
+
+        response = self.client.get("/search/?q=retrospektives")
+        self.assertEqual(
+            [topic["id"] for topic in response.data["topics"]],
+            [self.topic.id]
+        )
+        self.assertEqual(response.data["tools"], [])
+
+        response = self.client.get("/search/?q=briana")
+        self.assertEqual(
+            [profile["id"] for profile in response.data["profiles"]],
+            [self.user.profile.id]
+        )
+
+        # The index follows renames and deletes
+        self.brainstorming.title = "Brainwriting"
+        self.brainstorming.save()
+        response = self.client.get("/search/?q=brainwritting")
+        self.assertEqual(len(response.data["tools"]), 1)
+        self.brainstorming.delete()
+        response = self.client.get("/search/?q=brainwritting")
+        self.assertEqual(response.data["tools"], [])
+
+        # The number of matches is capped
+        with self.settings(FUZZY_SEARCH_LIMIT=1, FUZZY_SEARCH_THRESHOLD=0):
+            response = self.client.get("/search/?q=coffee%20session")
+        self.assertEqual(len(response.data["tools"]), 1)
+
+        # Filters apply before the cap, lower ranked matches fill it
+        Tool.objects.create(
+            title="Brainwriting",
+            short_description="Write ideas",
+            full_description="Write ideas and pass them on",
+            instructions="Pass the sheet",
+            user=self.user,
+            topic=self.topic
+        )
+        topic = Topic.objects.create(title="Warmups")
+        warmup = Tool.objects.create(
+            title="Brainwriting Warmup Games",
+            short_description="Warm up",
+            full_description="Warm up the team",
+            instructions="Play a game",
+            user=self.user,
+            topic=topic
+        )
+        with self.settings(FUZZY_SEARCH_LIMIT=1):
+            response = self.client.get(
+                f"/tools/?search=brianwriting&topic={topic.slug}"
+            )
+        self.assertEqual(
+            [tool["id"] for tool in response.data["results"]], [warmup.id]
+        )
+        print("Test passed \n")
+
+
+class ToolsTest10Autocomplete(APITestCase):
+    def setUp(self):
+        # Start every test with an empty in-process prefix index
+        autocomplete.index.clear()
+
+        # Create user, topic and tools
+        self.user = User.objects.create_user(
+            username="autocompleteuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.starfish = Tool.objects.create(
+            title="Retrospective Starfish",
+            short_description="Five areas",
+            full_description="Collect feedback in five areas",
+            instructions="Draw a starfish",
+            user=self.user,
+            topic=self.topic
+        )
+        self.retro = Tool.objects.create(
+            title="Retro Dartboard",
+            short_description="Aim at problems",
+            full_description="Throw darts at problems",
+            instructions="Draw a dartboard",
+            user=self.user,
+            topic=self.topic,
+            slug="dartboard"
+        )
+
+    def suggest(self, query):
+        response = self.client.get(f"/tools/autocomplete/?q={query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [tool["id"] for tool in response.data]
+
+    # Test prefix suggestions and index updates
+    def test_19_autocomplete(self):
+        print("\nTools Test 19: Autocomplete")
+        response = self.client.get("/tools/autocomplete/?q=star")
+        self.assertEqual(response.data, [{
+            "id": self.starfish.id,
+            "title": "Retrospective Starfish",
+            "slug": "retrospective-starfish",
+            "icon": "26aa",
+        }])
+        self.assertEqual(
+            self.suggest("RETRO"), [self.retro.id, self.starfish.id]
+        )
+        self.assertEqual(self.suggest("dart"), [self.retro.id])
+        self.assertEqual(self.suggest(""), [])
+
+        # Lookups do not touch the database once the index is built
+        with CaptureQueriesContext(connection) as queries:
+            self.suggest("retro")
+        self.assertEqual(len(queries), 0)
+
+        # Changes are visible right away
+        self.starfish.title = "Sailboat"
+        self.starfish.save()
+        self.assertEqual(self.suggest("sail"), [self.starfish.id])
+        self.assertEqual(self.suggest("retrospective"), [self.starfish.id])
+        self.assertEqual(self.suggest("retrospective%20s"), [])
+        self.starfish.delete()
+        self.assertEqual(self.suggest("sail"), [])
+
+        # Changes by other workers trigger a rebuild
+        Tool.objects.filter(pk=self.retro.pk).update(title="Mad Sad Glad")
+        self.assertEqual(self.suggest("mad"), [])
+        autocomplete.bump_version()
+        self.assertEqual(self.suggest("mad"), [self.retro.id])
+        print("Test passed \n")
+
+
+class ToolsTest11ExplainIndexes(APITestCase):
+    def explain(self):
+        out = StringIO()
+        call_command("explain_indexes", seed=50, stdout=out)
+        return [
+            line for line in out.getvalue().splitlines()
+            if line.strip().startswith("with index:")
+        ]
+
+    # Test that every hot list query is served by its index
+    def test_20_explain_indexes(self):
+        print("\nTools Test 20: Explain indexes")
+        # The indexes dropped by the first run are back for the second
+        for run in range(2):
+            with_index = self.explain()
+            self.assertEqual(len(with_index), 14)
+            for line in with_index:
+                self.assertNotIn("sequential", line)
+                self.assertNotIn("sort", line)
+
+        # The seeded rows are rolled back
+        self.assertEqual(Tool.objects.count(), 0)
+        print("Test passed \n")
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True, LIST_ETAG_TABLE_STATE=False)
+class ToolsTest12ResponseCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tool
+        self.user = User.objects.create_user(
+            username="cacheuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.staff = User.objects.create_user(
+            username="cachestaff@example.com",
+            password="TestUser1234!!",
+            is_staff=True
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+
+    # Test caching and invalidation of anonymous list responses
+    def test_21_anonymous_response_cache(self):
+        print("\nTools Test 21: Anonymous response cache")
+        response = self.client.get("/tools/?ordering=votes&page_size=5")
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        # The same query in another order is served without queries
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/tools/?page_size=5&ordering=votes")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data["results"][0]["vote_count"], 0)
+
+        # Writes are visible right away
+        Vote.objects.create(user=self.staff, tool=self.tool)
+        response = self.client.get("/tools/?ordering=votes&page_size=5")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["vote_count"], 1)
+
+        self.client.get("/topics/")
+        self.assertEqual(self.client.get("/topics/")["X-Cache"], "HIT")
+        Topic.objects.create(title="Other Topic")
+        response = self.client.get("/topics/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 2)
+
+        # Authenticated users always get a fresh response
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/tools/?ordering=votes&page_size=5")
+        self.assertNotIn("X-Cache", response)
+
+        # Hits and misses are counted for staff
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.data["response_cache.hits"], 2)
+        self.assertEqual(response.data["response_cache.misses"], 4)
+        print("Test passed \n")
+
+
+class ToolsTest13FragmentCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tools
+        self.user = User.objects.create_user(
+            username="fragmentuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.other_user = User.objects.create_user(
+            username="otherfragmentuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tools = [
+            Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=self.user,
+                topic=self.topic
+            )
+            for i in range(3)
+        ]
+        self.misses = metrics.counter("fragment_cache.misses")
+        self.hits = metrics.counter("fragment_cache.hits")
+
+    def get_tools(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get("/tools/", format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"]
+
+    # Test pages assembled from cached fragments with live overlays
+    def test_22_fragment_cache(self):
+        print("\nTools Test 22: Fragment cache")
+        # Tools and their shared author profile are serialized once
+        first = self.get_tools(self.user)
+        self.assertEqual(self.misses.get(), 4)
+        hits = self.hits.get()
+        self.assertEqual(self.get_tools(self.user), first)
+        self.assertEqual(self.misses.get(), 4)
+        self.assertEqual(self.hits.get() - hits, 6)
+
+        # Per-user fields are not shared through the fragments
+        others = self.get_tools(self.other_user)
+        self.assertEqual(self.misses.get(), 4)
+        self.assertTrue(all(tool["is_owner"] for tool in first))
+        self.assertFalse(any(tool["is_owner"] for tool in others))
+        self.assertFalse(any(
+            tool["profile"]["is_owner"] for tool in others
+        ))
+
+        # Counters are always current
+        Vote.objects.create(user=self.other_user, tool=self.tools[0])
+        tools = {tool["id"]: tool for tool in self.get_tools(self.user)}
+        self.assertEqual(tools[self.tools[0].id]["vote_count"], 1)
+        self.assertEqual(
+            tools[self.tools[0].id]["profile"]["total_votes"], 1
+        )
+        self.assertEqual(self.misses.get(), 4)
+
+        # A saved tool gets a new fragment
+        response = self.client.put(f"/tools/{self.tools[1].id}/", {
+            "title": "Renamed Tool",
+            "short_description": "This is a test tool",
+            "full_description": "This is a test tool",
+            "instructions": "This is a test tool",
+            "topic_id": self.topic.id
+        }, format="json")
+        self.assertEqual(response.data["title"], "Renamed Tool")
+        misses = self.misses.get()
+        tools = {tool["id"]: tool for tool in self.get_tools(self.user)}
+        self.assertEqual(tools[self.tools[1].id]["title"], "Renamed Tool")
+        self.assertEqual(self.misses.get(), misses)
+
+        # Cached and freshly serialized pages are the same
+        cache.clear()
+        self.assertEqual(self.get_tools(self.user), list(tools.values()))
+        print("Test passed \n")
+
+
+class ToolsTest14ConditionalRequests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tool
+        self.user = User.objects.create_user(
+            username="etaguser@example.com",
+            password="TestUser1234!!"
+        )
+        self.voter = User.objects.create_user(
+            username="etagvoter@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+
+    # Test ETag and Last-Modified headers and 304 responses
+    def test_23_conditional_requests(self):
+        print("\nTools Test 23: Conditional requests")
+        url = f"/tools/{self.tool.id}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # A matching ETag is answered without serializing the tool
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        response = self.client.get(
+            f"/tools/tool/{self.tool.slug}/",
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A vote changes the vote count and with it the ETag
+        Vote.objects.create(user=self.voter, tool=self.tool)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["vote_count"], 1)
+
+        # Missing tools still return 404
+        response = self.client.get("/tools/999999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # A new tool changes the ETag of the list
+        response = self.client.get("/tools/")
+        etag = response["ETag"]
+        response = self.client.get("/tools/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Tool.objects.create(
+            title="Other Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+        response = self.client.get("/tools/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+        # Changes the worker never saw a version bump for change the
+        # ETag of the list through the table state
+        with override_settings(LIST_ETAG_TABLE_STATE=True):
+            etag = self.client.get("/tools/")["ETag"]
+            Tool.objects.filter(pk=self.tool.pk).update(
+                title="Renamed Tool", updated=timezone.now()
+            )
+            response = self.client.get("/tools/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        print("Test passed \n")
+
+
+@override_settings(
+    VIEW_COUNT_FLUSH_INTERVAL=0,
+    VIEW_COUNT_FLUSH_EVENTS=3,
+    RESPONSE_CACHE_ENABLED=False,
+)
+class ToolsTest15ViewCounts(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        viewcounts.buffer.clear()
+
+        # Create user, topic and tools
+        self.user = User.objects.create_user(
+            username="viewuser@example.com",
+            password="TestUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tools = [
+            Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=self.user,
+                topic=self.topic
+            )
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        viewcounts.buffer.clear()
+
+    # Test views buffered in memory and written in one batch
+    def test_24_buffered_view_counts(self):
+        print("\nTools Test 24: Buffered view counts")
+        first, second = self.tools
+        self.client.get(f"/tools/tool/{second.slug}/")
+        self.client.get(f"/tools/{second.id}/")
+        second.refresh_from_db()
+        self.assertEqual(second.view_count, 0)
+
+        # The third view flushes both tools with one UPDATE
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f"/tools/{first.id}/")
+        updates = [
+            query["sql"] for query in queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("CASE", updates[0])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.view_count, second.view_count), (1, 2))
+        self.assertEqual(
+            metrics.gauge("view_counts.last_batch_size").get(), 2
+        )
+
+        # Tools can be ordered by views
+        response = self.client.get("/tools/?ordering=views")
+        self.assertEqual(
+            [tool["id"] for tool in response.data["results"]],
+            [second.id, first.id]
+        )
+        self.assertEqual(response.data["results"][0]["view_count"], 2)
+
+        # Conditional GETs count views, flushes only move the lists
+        # ordered by views
+        paths = (f"/tools/{first.id}/", "/tools/", "/tools/?ordering=views")
+        with override_settings(LIST_ETAG_TABLE_STATE=False):
+            etags = [self.client.get(path)["ETag"] for path in paths]
+            response = self.client.get(paths[0], HTTP_IF_NONE_MATCH=etags[0])
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+            viewcounts.buffer.flush()
+            self.assertEqual(
+                [
+                    self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                    .status_code
+                    for path, etag in zip(paths, etags)
+                ],
+                [
+                    status.HTTP_304_NOT_MODIFIED,
+                    status.HTTP_304_NOT_MODIFIED,
+                    status.HTTP_200_OK,
+                ],
+            )
+        first.refresh_from_db()
+        self.assertEqual(first.view_count, 3)
+
+        # A failed flush keeps the views and retries on the timer
+        def fail(execute, sql, params, many, context):
+            raise DatabaseError("Database unavailable")
+
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=60):
+            viewcounts.buffer.clear()
+            viewcounts.buffer.record(first.pk)
+            with connection.execute_wrapper(fail):
+                self.assertEqual(viewcounts.buffer.flush(), 0)
+        self.assertEqual(viewcounts.buffer.pending, {first.pk: 1})
+        self.assertIsNotNone(viewcounts.buffer.timer)
+        print("Test passed \n")
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ToolsTest16Trending(APITestCase):
+
+    def setUp(self):
+        # Create voters, topic and tools
+        self.voters = [
+            User.objects.create_user(
+                username=f"trendvoter{i}@example.com",
+                password="TestUser1234!!"
+            )
+            for i in range(5)
+        ]
+        self.topic = Topic.objects.create(title="Trend Topic")
+        self.old, self.new, self.stale = [
+            Tool.objects.create(
+                title=f"Trend Tool {i}",
+                short_description="This is a test tool",
+                full_description="This is a test tool",
+                instructions="This is a test tool",
+                user=self.voters[0],
+                topic=self.topic
+            )
+            for i in range(3)
+        ]
+
+        # Five votes three days ago, two votes today, one last month
+        for voter in self.voters:
+            Vote.objects.create(user=voter, tool=self.old)
+        Vote.objects.filter(tool=self.old).update(
+            created=timezone.now() - timedelta(days=3)
+        )
+        for voter in self.voters[:2]:
+            Vote.objects.create(user=voter, tool=self.new)
+        Vote.objects.create(user=self.voters[0], tool=self.stale)
+        Vote.objects.filter(tool=self.stale).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+
+    def get_ids(self, url):
+        response = self.client.get(url)
+        return [tool["id"] for tool in response.data["results"]]
+
+    # Test the trending ordering from precomputed decayed scores
+    def test_25_trending(self):
+        print("\nTools Test 25: Trending")
+        call_command(
+            "update_trending_scores", "--since-minutes=10", stdout=StringIO()
+        )
+        # Only the tool with new votes was recomputed
+        self.old.refresh_from_db()
+        self.new.refresh_from_db()
+        self.assertEqual(self.old.trending_score, 0)
+        self.assertGreater(self.new.trending_score, 0)
+
+        call_command(
+            "update_trending_scores", "--all", stdout=StringIO()
+        )
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.trending_score, 0)
+
+        # Tools that lost all their votes are reset by --all
+        Vote.objects.filter(tool=self.new).delete()
+        call_command(
+            "update_trending_scores", "--since-minutes=10", stdout=StringIO()
+        )
+        self.new.refresh_from_db()
+        self.assertGreater(self.new.trending_score, 0)
+        call_command(
+            "update_trending_scores", "--all", stdout=StringIO()
+        )
+        self.new.refresh_from_db()
+        self.assertEqual(self.new.trending_score, 0)
+        for voter in self.voters[:2]:
+            Vote.objects.create(user=voter, tool=self.new)
+        call_command(
+            "update_trending_scores", "--since-minutes=10", stdout=StringIO()
+        )
+
+        # Recent votes outrank more but older votes
+        expected = [self.new.id, self.old.id, self.stale.id]
+        self.assertEqual(self.get_ids("/tools/?ordering=trending"), expected)
+        self.assertEqual(
+            self.get_ids(f"/topics/list/{self.topic.slug}/?ordering=trending"),
+            expected
+        )
+        self.assertEqual(
+            self.get_ids("/tools/?ordering=votes")[0], self.old.id
+        )
+        print("Test passed \n")
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ToolsTest17AsyncViews(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="asyncuser")
+        self.topic = Topic.objects.create(title="Async Topic")
+        self.tool = Tool.objects.create(
+            title="Async Tool",
+            short_description="This is a test tool",
+            full_description="This is a test tool",
+            instructions="This is a test tool",
+            user=self.user,
+            topic=self.topic
+        )
+
+    def async_get(self, url, **extra):
+        async def get():
+            return await self.async_client.get(url, **extra)
+        return async_to_sync(get)()
+
+    # Test the read views in sync mode under the sync handler and in
+    # async mode under the async handler
+    def test_26_async_views(self):
+        print("\nTools Test 26: Async views")
+        self.assertFalse(asyncio.iscoroutinefunction(ToolList.as_view()))
+        self.assertTrue(asyncio.iscoroutinefunction(
+            ToolList.as_view(asynchronous=True)
+        ))
+        urls = [
+            "/tools/",
+            f"/tools/{self.tool.id}/",
+            f"/tools/tool/{self.tool.slug}/",
+            f"/topics/list/{self.topic.slug}/",
+            "/topics/",
+            "/profiles/",
+            f"/votes/tool/{self.tool.id}/",
+            f"/votes/tools/?ids={self.tool.id}",
+            f"/comments/tool/{self.tool.id}/",
+        ]
+        responses = [self.client.get(url) for url in urls]
+        detail = f"/tools/tool/{self.tool.slug}/"
+        with override_settings(ROOT_URLCONF=get_urlconf(urls, True)):
+            self.assertTrue(asyncio.iscoroutinefunction(
+                resolve("/tools/").func
+            ))
+            for url, response in zip(urls, responses):
+                async_response = self.async_get(url)
+                self.assertEqual(
+                    response.status_code, status.HTTP_200_OK, url
+                )
+                self.assertEqual(
+                    async_response.status_code, status.HTTP_200_OK, url
+                )
+                self.assertEqual(response.json(), async_response.json())
+
+            # Missing objects and conditional GETs work the same way
+            response = self.async_get("/tools/tool/none/")
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND
+            )
+            etag = self.async_get(detail)["ETag"]
+            response = self.async_get(
+                detail, headers={"If-None-Match": etag}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+        print("Test passed \n")
+
+
+class ToolsTest18ConnectionPool(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "pool.sqlite3")
+
+    def tearDown(self):
+        for key in [key for key in pool._pools if key[1] == "pooled"]:
+            pool._pools.pop(key).close_all()
+        self.directory.cleanup()
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    # Test checkouts, health checks and the pooled database backend
+    def test_27_connection_pool(self):
+        print("\nTools Test 27: Connection pool")
+        connection_pool = pool.ConnectionPool(
+            min_size=2, max_size=2, timeout=0.05
+        )
+        connection_pool.warm_up(self.connect)
+        stats = connection_pool.get_stats()
+        self.assertEqual((stats["size"], stats["idle"]), (2, 2))
+
+        # Idle connections are reused, a full pool times out
+        first = connection_pool.acquire(self.connect)
+        second = connection_pool.acquire(self.connect)
+        with self.assertRaises(pool.PoolTimeout):
+            connection_pool.acquire(self.connect)
+        self.assertEqual(connection_pool.get_stats()["created"], 2)
+
+        # Broken connections fail the check and are replaced
+        first.close()
+        connection_pool.release(first)
+        replacement = connection_pool.acquire(self.connect)
+        self.assertIsNot(replacement, first)
+        connection_pool.release(replacement)
+        connection_pool.release(second, broken=True)
+        stats = connection_pool.get_stats()
+        self.assertEqual(stats["failed_checks"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual((stats["size"], stats["in_use"]), (1, 0))
+
+        # The backend returns connections to the pool without transactions
+        handler = ConnectionHandler({
+            "default": {"ENGINE": "django.db.backends.sqlite3"},
+            "pooled": {
+                "ENGINE": "sessionminds.backends.sqlite3",
+                "NAME": self.path,
+                "POOL": {"MIN_SIZE": 1, "MAX_SIZE": 1},
+            },
+        })
+        database = handler["pooled"]
+        database.warm_up_pool()
+        database.ensure_connection()
+        raw = database.connection
+        with database.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER)")
+        database.set_autocommit(False)
+        with database.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES (1)")
+        database.close()
+
+        database.ensure_connection()
+        self.assertIs(database.connection, raw)
+        with database.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM item")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        database.close()
+        stats = pool.get_pool_stats()
+        self.assertEqual(stats["db_pool.pooled.created"], 1)
+        self.assertEqual(stats["db_pool.pooled.idle"], 1)
+        print("Test passed \n")
+
+
+@override_settings(REPLICA_DATABASES=["replica"], REPLICA_MAX_LAG=None)
+class ToolsTest19ReplicaRouting(APITransactionTestCase):
+    # The replica alias of the test databases, see TEST in settings.py
+    databases = {"default"} | ({"replica"} & set(settings.DATABASES))
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.routes = []
+
+    def view(self, request):
+        self.routes.append(self.router.db_for_read(Tool))
+        status_code = int(request.GET.get("status", 200))
+        return HttpResponse(status=status_code)
+
+    def route(self, method, path="/tools/", address="1.1.1.1", **extra):
+        request = getattr(self.factory, method)(
+            path, REMOTE_ADDR=address, **extra
+        )
+        ReplicaMiddleware(self.view)(request)
+        return self.routes[-1]
+
+    # Test that safe requests read from replicas unless they just wrote
+    def test_28_replica_routing(self):
+        print("\nTools Test 28: Replica routing")
+        self.assertEqual(self.route("get"), "replica")
+        self.assertEqual(self.route("head"), "replica")
+        self.assertEqual(self.route("post"), "default")
+        self.assertEqual(self.router.db_for_write(Tool), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "tools"))
+
+        # The writing client reads its own writes, others do not wait
+        self.assertEqual(self.route("get"), "default")
+        self.assertEqual(self.route("get", address="2.2.2.2"), "replica")
+        self.assertEqual(
+            self.route("get", HTTP_AUTHORIZATION="Bearer token"), "replica"
+        )
+        cache.clear()
+        self.assertEqual(self.route("get"), "replica")
+
+        # Failed writes do not stick and transactions stay on the primary
+        self.route("post", path="/tools/?status=400")
+        self.assertEqual(self.route("get"), "replica")
+        with transaction.atomic():
+            self.assertEqual(self.route("get"), "default")
+        self.assertEqual(self.router.db_for_read(Tool), "default")
+
+        # Async middleware chains set the same state
+        async def async_view(request):
+            return self.view(request)
+        middleware = ReplicaMiddleware(async_view)
+        async_to_sync(middleware)(self.factory.get("/tools/"))
+        self.assertEqual(self.routes[-1], "replica")
+
+        # Replicas whose lag cannot be checked fall back to the primary
+        def fail(alias):
+            raise DatabaseError("The replica is down.")
+        self.router.get_lag = fail
+        with override_settings(REPLICA_MAX_LAG=2.0):
+            self.assertEqual(self.route("get"), "default")
+        print("Test passed \n")
+
+    # Run the queries of a request and count them per database
+    def count_queries(self, method, address="3.3.3.3"):
+        def view(request):
+            if request.method == "POST":
+                Topic.objects.create(title="Replica Topic")
+            return HttpResponse(str(Topic.objects.count()))
+
+        request = getattr(self.factory, method)(
+            "/topics/", REMOTE_ADDR=address
+        )
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = ReplicaMiddleware(view)(request)
+        return int(response.content), len(primary), len(replica)
+
+    # Test that the queries of requests run on the routed databases
+    @skipUnless("replica" in settings.DATABASES, "No replica alias")
+    def test_29_replica_queries(self):
+        print("\nTools Test 29: Replica queries")
+        self.assertEqual(self.count_queries("get"), (0, 0, 1))
+
+        # Writes run on the primary, the next reads of the client too
+        self.assertEqual(self.count_queries("post")[1:], (2, 0))
+        self.assertEqual(self.count_queries("get"), (1, 1, 0))
+
+        # Other clients read the write from the replica
+        self.assertEqual(
+            self.count_queries("get", address="4.4.4.4"), (1, 0, 1)
+        )
+        cache.clear()
+        self.assertEqual(self.count_queries("get"), (1, 0, 1))
+        print("Test passed \n")
+
+    # Test that responses cached right after a change read the primary
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_30_cached_reads_after_change(self):
+        print("\nTools Test 30: Cached reads after a change")
+        routes = self.routes
+        router = self.router
+
+        class CachedView(APIView):
+            authentication_classes = []
+            permission_classes = [AllowAny]
+
+            @cache_anonymous_response("tools")
+            def get(self, request):
+                routes.append(router.db_for_read(Tool))
+                return Response({})
+
+        def get(path):
+            request = self.factory.get(path, REMOTE_ADDR="5.5.5.5")
+            return ReplicaMiddleware(CachedView.as_view())(request)
+
+        # Other clients fill the cache from the primary after a change
+        bump_version("tools")
+        self.assertEqual(get("/tools/")["X-Cache"], "MISS")
+        self.assertEqual(routes, ["default"])
+        self.assertEqual(get("/tools/")["X-Cache"], "HIT")
+        self.assertEqual(len(routes), 1)
+
+        # Once the replicas caught up they are read again
+        cache.set(MODIFIED_PREFIX + "tools", time.time() - 60, None)
+        get("/tools/?page=2")
+        self.assertEqual(routes[-1], "replica")
+        print("Test passed \n")
@@ -3,6 +3,7 @@ from tools import views
 
 urlpatterns = [
     path("tools/", views.ToolList.as_view()),
+    path("tools/autocomplete/", views.ToolAutocomplete.as_view()),
     path(
         "tools/user/<int:user_id>/",
         views.ToolListByUser.as_view(),
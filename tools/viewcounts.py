@@ -0,0 +1,161 @@
+import atexit
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, F, Value, When
+from sessionminds import metrics
+from sessionminds.cache import bump_version
+from .models import Tool
+
+BATCH_SIZE = 500
+
+# Bumped by every flush, only lists ordered by views depend on it
+VIEWS_NAMESPACE = "views"
+
+flushes = metrics.counter(
+    "view_counts.flushes", "Buffered tool views written to the database"
+)
+flushed_views = metrics.counter(
+    "view_counts.views", "Tool views written by all flushes"
+)
+flush_errors = metrics.counter(
+    "view_counts.errors", "Flushes that failed and were kept for a retry"
+)
+last_flush_ms = metrics.gauge(
+    "view_counts.last_flush_ms", "Duration of the last flush in ms"
+)
+last_batch_size = metrics.gauge(
+    "view_counts.last_batch_size", "Number of tools in the last flush"
+)
+
+
+# Per-worker buffer of tool views
+class ViewCountBuffer:
+    """
+    Buffer of tool views that is written to the database in batches.
+
+    Views are added up per tool in the memory of the worker. The buffer
+    is flushed after VIEW_COUNT_FLUSH_EVENTS views, by a timer
+    VIEW_COUNT_FLUSH_INTERVAL seconds after the first buffered view and
+    when the worker exits. A flush writes all buffered tools with one
+    UPDATE ... CASE statement per batch, so a crash loses at most the
+    views of one interval.
+
+    Methods:
+        record(tool_id): Counts a view of a tool.
+        flush(): Writes the buffered views to the database.
+        clear(): Drops the buffered views.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.events = 0
+        self.timer = None
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            self.events = 0
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+    # Start the flush timer unless it runs, call with the lock held
+    def schedule(self):
+        interval = getattr(settings, "VIEW_COUNT_FLUSH_INTERVAL", 5.0)
+        if self.timer is None and interval > 0:
+            self.timer = threading.Timer(interval, self.flush_on_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def record(self, tool_id):
+        with self.lock:
+            self.pending[tool_id] = self.pending.get(tool_id, 0) + 1
+            self.events += 1
+            full = self.events >= getattr(
+                settings, "VIEW_COUNT_FLUSH_EVENTS", 100
+            )
+            if not full:
+                self.schedule()
+        if full:
+            self.flush()
+
+    # Add views to the counters with one UPDATE ... CASE per batch
+    def write(self, items):
+        for i in range(0, len(items), BATCH_SIZE):
+            batch = items[i:i + BATCH_SIZE]
+            Tool.objects.filter(
+                pk__in=[tool_id for tool_id, _ in batch]
+            ).update(view_count=F("view_count") + Case(
+                *[
+                    When(pk=tool_id, then=Value(views))
+                    for tool_id, views in batch
+                ],
+                default=Value(0),
+            ))
+
+    # Flush from the timer thread, which has its own connection
+    def flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """
+        Write the buffered views to the database.
+
+        The buffer is swapped out first, so views recorded during the
+        flush go to the next one. Views of a failed flush are put back
+        and the timer is started again to retry them. A successful
+        flush bumps the "views" namespace of the lists ordered by views.
+        Other responses show view counts up to their cache timeout old,
+        so flushes do not invalidate them.
+
+        Returns:
+            int: The number of views written.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.events = 0
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        items = sorted(pending.items())
+        try:
+            with transaction.atomic():
+                self.write(items)
+        except DatabaseError:
+            flush_errors.increment()
+            with self.lock:
+                for tool_id, views in pending.items():
+                    self.pending[tool_id] = (
+                        self.pending.get(tool_id, 0) + views
+                    )
+                self.schedule()
+            return 0
+
+        bump_version(VIEWS_NAMESPACE)
+        views = sum(pending.values())
+        last_flush_ms.set(round((time.perf_counter() - start) * 1000, 3))
+        last_batch_size.set(len(items))
+        flushes.increment()
+        flushed_views.increment(views)
+        return views
+
+
+buffer = ViewCountBuffer()
+atexit.register(buffer.flush)
+
+
+# Get the namespaces of a tool list request beyond the tools
+def get_ordering_namespaces(request):
+    if request.query_params.get("ordering") == "views":
+        return (VIEWS_NAMESPACE,)
+    return ()
@@ -1,21 +1,55 @@
 from django.http import Http404
-from django.db.models import Count
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics
-from sessionminds.pagination import CustomPageNumberPagination
+from sessionminds.asyncviews import AsyncAPIView
+from sessionminds.cache import (
+    TOOL_NAMESPACES,
+    cache_anonymous_response,
+    conditional_response,
+)
+from sessionminds.pagination import (
+    CustomPageNumberPagination,
+    SelectablePaginationMixin,
+    get_paginator,
+)
+from . import autocomplete, viewcounts
 from .models import Tool
+from .search import search_tools
 from .serializers import ToolSerializer
 from sessionminds.permissions import IsOwnerOrReadOnly
+from votes.counters import tool_votes
+
+
+# Get the columns a tool response depends on for conditional GETs, view
+# counts are left out as every flush would change them
+def get_tool_state(**lookup):
+    state = Tool.objects.filter(**lookup).values_list(
+        "updated", "vote_count", "comment_count", "pk"
+        ).first()
+    if state is None:
+        return None
+    # Votes still held in counter shards do not change the columns
+    return state + (tool_votes.get_pending([state[-1]]).get(state[-1], 0),)
+
+
+# Get the state of a viewed tool and count the view
+def get_viewed_tool_state(**lookup):
+    state = get_tool_state(**lookup)
+    if state is not None:
+        # Counted here, as 304 responses never run the view method. A
+        # record can flush the buffer, which writes to the database
+        viewcounts.buffer.record(state[3])
+    return state
 
 
 # Get all tools
-class ToolList(APIView):
+class ToolList(AsyncAPIView):
     """
     A view for retrieving a list of tools.
 
-    Inherits from APIView class.
+    Inherits from AsyncAPIView class, the list is async under ASGI.
 
     Methods:
         get(request):
@@ -27,29 +61,57 @@ class ToolList(APIView):
     serializer_class = ToolSerializer
 
     # Get all tools
-    def get(self, request):
-        ordering = request.query_params.get("ordering", "latest")
+    @conditional_response(
+        *TOOL_NAMESPACES, namespaces_for=viewcounts.get_ordering_namespaces
+        )
+    @cache_anonymous_response(
+        *TOOL_NAMESPACES, namespaces_for=viewcounts.get_ordering_namespaces
+        )
+    async def get(self, request):
         search_query = request.query_params.get("search", "").strip()
+        ordering = request.query_params.get(
+            "ordering", "relevance" if search_query else "latest"
+            )
+        topic = request.query_params.get("topic")
+        author = request.query_params.get("author")
 
-        # Order tools by votes or latest
-        if ordering == "votes":
-            tools = Tool.objects.annotate(
-                vote_count=Count("votes")
-                ).order_by("-vote_count")
-        else:
-            tools = Tool.objects.all().order_by("-created")
+        tools = Tool.objects.all()
 
-        # Filter tools by search query
+        # Filter tools by topic slug and author user id or profile slug
+        if topic:
+            tools = tools.filter(topic__slug=topic)
+        if author:
+            if author.isdigit():
+                tools = tools.filter(user_id=author)
+            else:
+                tools = tools.filter(user__profile__slug=author)
+
+        # Rank tools matching the search query by relevance and votes
         if search_query:
-            tools = tools.filter(title__icontains=search_query)
+            tools = await self.run_sync(search_tools, tools, search_query)
 
-        paginator = CustomPageNumberPagination()
-        paginated_tools = paginator.paginate_queryset(tools, request)
+        # Load related objects and counts for the whole page up front
+        tools = ToolSerializer(
+            context={"request": request}
+            ).setup_eager_loading(tools)
 
-        serializer = ToolSerializer(
-            paginated_tools, many=True, context={"request": request}
+        # Order tools by relevance, votes, views, trending or latest
+        if ordering == "relevance" and search_query:
+            keyset = ("-search_rank", "-id")
+        elif ordering == "votes":
+            keyset = ("-vote_count", "-id")
+        elif ordering == "views":
+            keyset = ("-view_count", "-id")
+        elif ordering == "trending":
+            keyset = ("-trending_score", "-id")
+        else:
+            keyset = ("-created", "-id")
+        tools = tools.order_by(*keyset)
+
+        paginator = get_paginator(request, keyset)
+        return await self.paginate(
+            paginator, tools, ToolSerializer, context={"request": request}
             )
-        return paginator.get_paginated_response(serializer.data)
 
     # Create a new tool
     def post(self, request):
@@ -63,7 +125,34 @@ class ToolList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ToolListByUser(generics.ListAPIView):
+# Get tools whose title or slug starts with the typed text
+class ToolAutocomplete(APIView):
+    """
+    A view for suggesting tools while the user types a search.
+
+    Only returns the id, title, slug and icon of the tools from an
+    in-process prefix index, without touching the database.
+
+    Methods:
+        get(request):
+            Returns the tools matching the "q" query parameter.
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 10
+    max_limit = 20
+
+    # Get the suggestions for a prefix
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+        return Response(autocomplete.index.search(query, limit))
+
+
+class ToolListByUser(SelectablePaginationMixin, generics.ListAPIView):
     """
     A view for retrieving a list of tools by user.
 
@@ -78,14 +167,18 @@ class ToolListByUser(generics.ListAPIView):
     # Get tools by user id
     def get_queryset(self):
         user_id = self.kwargs.get("user_id")
-        return Tool.objects.filter(user__id=user_id)
+        return ToolSerializer(
+            context=self.get_serializer_context()
+            ).setup_eager_loading(
+                Tool.objects.filter(user__id=user_id)
+            ).order_by("-created", "-id")
 
 
-class ToolDetailById(APIView):
+class ToolDetailById(AsyncAPIView):
     """
     A view for retrieving a single tool.
 
-    Inherits from APIView class.
+    Inherits from AsyncAPIView class, under ASGI writes run in a thread.
 
     Methods:
         get(request, id):
@@ -108,14 +201,23 @@ class ToolDetailById(APIView):
         except Tool.DoesNotExist:
             raise Http404
 
+    # Get the state of the tool for conditional GETs
+    def get_tool_state(self, id):
+        return get_viewed_tool_state(id=id)
+
     # Get tool by id and return it
     # If tool does exist, return it so it can be used
-    def get(self, request, id):
-        tool = self.get_object(id)
+    @conditional_response(
+        "topics", "profiles", "comments",
+        state="get_tool_state",
+        modified_by=("votes",),
+        )
+    async def get(self, request, id):
+        tool = await self.run_sync(self.get_object, id)
         serializer = ToolSerializer(
             tool, context={"request": request}
             )
-        return Response(serializer.data)
+        return Response(await self.serialize(serializer))
 
     # Update tool by id
     def put(self, request, id):
@@ -138,11 +240,11 @@ class ToolDetailById(APIView):
 
 
 # Get a single tool
-class ToolDetailBySlug(APIView):
+class ToolDetailBySlug(AsyncAPIView):
     """
     A view for retrieving a single tool.
 
-    Inherits from APIView class.
+    Inherits from AsyncAPIView class, under ASGI writes run in a thread.
 
     Methods:
         get(request, slug):
@@ -166,14 +268,23 @@ class ToolDetailBySlug(APIView):
         except Tool.DoesNotExist:
             raise Http404
 
+    # Get the state of the tool for conditional GETs
+    def get_tool_state(self, slug):
+        return get_viewed_tool_state(slug=slug)
+
     # Get tool by slug and return it
     # If tool does exist, return it so it can be used
-    def get(self, request, slug):
-        tool = self.get_object(slug)
+    @conditional_response(
+        "topics", "profiles", "comments",
+        state="get_tool_state",
+        modified_by=("votes",),
+        )
+    async def get(self, request, slug):
+        tool = await self.run_sync(self.get_object, slug)
         serializer = ToolSerializer(
             tool, context={"request": request}
             )
-        return Response(serializer.data)
+        return Response(await self.serialize(serializer))
 
     # Update tool by slug
     def put(self, request, slug):
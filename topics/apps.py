@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TopicsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "topics"
+
+    def ready(self):
+        from sessionminds import cache, trigram
+        from .models import Topic
+
+        trigram.register(Topic, ["title"])
+        cache.register(Topic, "topics")
@@ -1,4 +1,6 @@
+from django.db.models import Count
 from rest_framework import serializers
+from sessionminds.serializers import DynamicFieldsMixin
 from .models import Topic, Icon
 
 
@@ -19,11 +21,12 @@ class IconSerializer(serializers.ModelSerializer):
             ]
 
 
-class TopicSerializer(serializers.ModelSerializer):
+class TopicSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Topic model.
 
     Args:
+        DynamicFieldsMixin: Selects the fields of the response per request.
         serializers.ModelSerializer: The base serializer class.
 
     Returns:
@@ -43,6 +46,25 @@ class TopicSerializer(serializers.ModelSerializer):
             "icon",
             ]
 
+        # Collapsed fields used for nested fields that are not expanded
+        expandable_fields = {
+            "icon": serializers.PrimaryKeyRelatedField(read_only=True),
+        }
+
+    # Join the icon and annotate the tool count if the response uses them
+    def setup_eager_loading(self, queryset):
+        if isinstance(self.fields.get("icon"), IconSerializer):
+            queryset = queryset.select_related("icon")
+        if (
+            "tool_count" in self.fields
+            and "annotated_tool_count" not in queryset.query.annotations
+        ):
+            queryset = queryset.annotate(annotated_tool_count=Count("tools"))
+        return queryset.defer(*self.get_deferred_fields())
+
     # Get the number of tools associated with the topic
+    # Use the annotated value from the queryset if available
     def get_tool_count(self, obj):
+        if hasattr(obj, "annotated_tool_count"):
+            return obj.annotated_tool_count
         return obj.tools.count()
@@ -2,28 +2,37 @@ from django.db.models import Count
 from django.http import Http404
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from sessionminds.pagination import CustomPageNumberPagination
+from sessionminds.asyncviews import AsyncAPIView
+from sessionminds.cache import (
+    TOOL_NAMESPACES,
+    cache_anonymous_response,
+    conditional_response,
+)
+from sessionminds.pagination import CustomPageNumberPagination, get_paginator
 from .serializers import TopicSerializer
 from tools.serializers import ToolSerializer
 from .models import Topic
 from tools.models import Tool
+from tools.viewcounts import get_ordering_namespaces
 from rest_framework.permissions import AllowAny
 from rest_framework import permissions
 
 
 # Get all categories
-class TopicsList(APIView):
+class TopicsList(AsyncAPIView):
     """
     A view for retrieving a list of categories.
 
-    Inherits from APIView class.
+    Inherits from AsyncAPIView class.
 
     Methods:
         get(request): Retrieves all categories and returns serialized data.
     """
     permission_classes = [AllowAny]
 
-    def get(self, request):
+    @conditional_response("topics", "tools")
+    @cache_anonymous_response("topics", "tools")
+    async def get(self, request):
         """
         Retrieve all categories and return serialized data.
 
@@ -37,20 +46,22 @@ class TopicsList(APIView):
 
         if ordering == "top":
             topics = Topic.objects.annotate(
-                tool_count=Count("tools")
-                ).order_by("-tool_count")
+                annotated_tool_count=Count("tools")
+                ).order_by("-annotated_tool_count")
         else:
             topics = Topic.objects.all().order_by("title")
 
-        paginator = CustomPageNumberPagination()
-        paginated_topics = paginator.paginate_queryset(topics, request)
+        context = {"request": request}
+        topics = TopicSerializer(context=context).setup_eager_loading(topics)
 
-        serializer = TopicSerializer(paginated_topics, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        paginator = CustomPageNumberPagination()
+        return await self.paginate(
+            paginator, topics, TopicSerializer, context=context
+            )
 
 
 # Get single category by slug
-class TopicDetailsBySlug(APIView):
+class TopicDetailsBySlug(AsyncAPIView):
     """
     A view to retrieve a specific category.
 
@@ -89,7 +100,7 @@ class TopicDetailsBySlug(APIView):
 
     # Get category by slug and return it
     # If category does exist, return it so it can be used
-    def get(self, request, slug):
+    async def get(self, request, slug):
         """
         Retrieve a specific category.
 
@@ -100,11 +111,11 @@ class TopicDetailsBySlug(APIView):
         Returns:
             Response: The serialized category data.
         """
-        topic = self.get_object(slug)
+        topic = await self.run_sync(self.get_object, slug)
         serializer = TopicSerializer(
             topic, context={"request": request}
             )
-        return Response(serializer.data)
+        return Response(await self.serialize(serializer))
 
 
 # Get single category by id
@@ -166,12 +177,12 @@ class TopicDetailsById(APIView):
 
 
 # Get all tools by category slug
-class ToolsOfTopicBySlug(APIView):
+class ToolsOfTopicBySlug(AsyncAPIView):
     """
     A view to retrieve a list of tools by category.
 
     Args:
-        APIView: The base APIView class.
+        AsyncAPIView: The base APIView class with async handlers.
 
     Returns:
         ToolsOfTopicBySlug: The view to retrieve a list of tools by category.
@@ -180,7 +191,13 @@ class ToolsOfTopicBySlug(APIView):
     serializer_class = ToolSerializer
 
     # Check if category exists and return it or return 404
-    def get(self, request, slug):
+    @conditional_response(
+        *TOOL_NAMESPACES, namespaces_for=get_ordering_namespaces
+        )
+    @cache_anonymous_response(
+        *TOOL_NAMESPACES, namespaces_for=get_ordering_namespaces
+        )
+    async def get(self, request, slug):
         """
         Retrieve a list of tools by category
 
@@ -192,17 +209,20 @@ class ToolsOfTopicBySlug(APIView):
             Response: The serialized tool data.
         """
         ordering = request.query_params.get("ordering", "latest")
+        tools = ToolSerializer(
+            context={"request": request}
+            ).setup_eager_loading(Tool.objects.filter(topic__slug=slug))
         if ordering == "votes":
-            tools = Tool.objects.filter(topic__slug=slug).annotate(
-                vote_count=Count("votes")
-                ).order_by("-vote_count")
+            keyset = ("-vote_count", "-id")
+        elif ordering == "views":
+            keyset = ("-view_count", "-id")
+        elif ordering == "trending":
+            keyset = ("-trending_score", "-id")
         else:
-            tools = Tool.objects.filter(topic__slug=slug).order_by("-created")
-
-        paginator = CustomPageNumberPagination()
-        paginated_tools = paginator.paginate_queryset(tools, request)
+            keyset = ("-created", "-id")
+        tools = tools.order_by(*keyset)
 
-        serializer = ToolSerializer(
-            paginated_tools, many=True, context={"request": request}
+        paginator = get_paginator(request, keyset)
+        return await self.paginate(
+            paginator, tools, ToolSerializer, context={"request": request}
             )
-        return paginator.get_paginated_response(serializer.data)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class VotesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "votes"
+
+    def ready(self):
+        from sessionminds import cache
+        from .models import Vote
+
+        cache.register(Vote, "votes", "created")
@@ -0,0 +1,161 @@
+import random
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from profiles.models import Profile
+from tools.models import Tool
+from .models import CounterShard
+
+_counters = {}
+
+
+# Counter column with optional sharded writes
+class ShardedCounter:
+    """
+    A counter column that can spread its writes over shard rows.
+
+    With COUNTER_SHARDS set to 0 every change is a single UPDATE of the
+    counter column. With N shards a change is added to one of N shard
+    rows picked at random, so a hot object takes N row locks in turn
+    instead of one. Reads add the pending shards to the column and
+    fold() moves them into the column, e.g. from the fold_counters
+    command.
+
+    Args:
+        model (Model): The model with the counter column.
+        field (str): The name of the counter column.
+        key (str): The column identifying the object, "pk" by default.
+
+    Methods:
+        add(key, delta): Adds a delta to the counter of an object.
+        get(key): Returns the current value of an object's counter.
+        get_pending_expression(): Sums the pending shards in a query.
+        apply_pending(instances, data): Adds pending shards to the
+            representations of objects.
+        fold(): Moves all shards into the counter column.
+    """
+
+    def __init__(self, model, field, key="pk"):
+        self.model = model
+        self.field = field
+        self.key = key
+        self.name = f"{model._meta.label}.{field}"
+        _counters[self.name] = self
+
+    @property
+    def shards(self):
+        return getattr(settings, "COUNTER_SHARDS", 0)
+
+    def get_objects(self, keys):
+        return self.model.objects.filter(**{f"{self.key}__in": keys})
+
+    def add(self, key, delta):
+        if self.shards <= 0:
+            objects = self.get_objects([key])
+            if delta < 0:
+                objects = objects.filter(**{f"{self.field}__gte": -delta})
+            objects.update(**{self.field: F(self.field) + delta})
+            return
+
+        # Create the shard on its first use instead of catching conflicts
+        fields = {
+            "counter": self.name,
+            "object_id": key,
+            "shard": random.randrange(self.shards),
+        }
+        shard = CounterShard.objects.filter(**fields)
+        if not shard.update(value=F("value") + delta):
+            CounterShard.objects.bulk_create(
+                [CounterShard(**fields)], ignore_conflicts=True
+            )
+            shard.update(value=F("value") + delta)
+
+    # Get the pending changes of some objects in one query
+    def get_pending(self, keys):
+        if self.shards <= 0 or not keys:
+            return {}
+        return dict(
+            CounterShard.objects.filter(counter=self.name, object_id__in=keys)
+            .order_by()
+            .values("object_id")
+            .annotate(total=Sum("value"))
+            .values_list("object_id", "total")
+        )
+
+    # Sum the pending shards of the outer object in a subquery
+    def get_pending_expression(self):
+        if self.shards <= 0:
+            return Value(0)
+        return Coalesce(
+            Subquery(
+                CounterShard.objects.filter(
+                    counter=self.name, object_id=OuterRef(self.key)
+                )
+                .order_by()
+                .values("object_id")
+                .annotate(total=Sum("value"))
+                .values("total")
+            ),
+            Value(0),
+        )
+
+    def get(self, key):
+        value = self.get_objects([key]).values_list(
+            self.field, flat=True
+            ).first()
+        if value is None:
+            return None
+        return max(value + self.get_pending([key]).get(key, 0), 0)
+
+    # Add the pending shards to serialized objects, the objects keep the
+    # stored column that cursors of lists ordered by it are built from
+    def apply_pending(self, instances, data):
+        pending = self.get_pending(
+            [getattr(instance, self.key) for instance in instances]
+        )
+        for instance, representation in zip(instances, data):
+            delta = pending.get(getattr(instance, self.key))
+            if delta and self.field in representation:
+                representation[self.field] = max(
+                    representation[self.field] + delta, 0
+                )
+        return data
+
+    def fold(self):
+        """
+        Move the pending shards into the counter column.
+
+        The shards are locked and deleted in the same transaction as the
+        counter update, so no change is lost or counted twice.
+
+        Returns:
+            int: The number of objects whose counters changed.
+        """
+        with transaction.atomic():
+            shards = list(
+                CounterShard.objects.select_for_update()
+                .filter(counter=self.name)
+                .values_list("pk", "object_id", "value")
+            )
+            totals = {}
+            for _, key, value in shards:
+                totals[key] = totals.get(key, 0) + value
+            for key, total in totals.items():
+                if total:
+                    self.get_objects([key]).update(**{
+                        self.field: Greatest(F(self.field) + total, Value(0))
+                    })
+            CounterShard.objects.filter(
+                pk__in=[pk for pk, _, _ in shards]
+            ).delete()
+        return sum(1 for total in totals.values() if total)
+
+
+# Get all counters that can be sharded
+def get_counters():
+    return list(_counters.values())
+
+
+tool_votes = ShardedCounter(Tool, "vote_count")
+profile_votes = ShardedCounter(Profile, "total_votes", key="user_id")
@@ -0,0 +1,138 @@
+import threading
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from profiles.models import Profile
+from tools.models import Tool
+from topics.models import Topic
+from votes.counters import get_counters
+from votes.models import CounterShard, Vote
+from votes.views import VoteToggle
+
+
+class Command(BaseCommand):
+    """
+    Measure the vote throughput on one hot tool by worker count.
+
+    Every run lets the given number of threads vote for the same tool
+    through the toggle endpoint logic, once with direct counter updates
+    and once with sharded counters. The seeded users, tool and votes are
+    deleted at the end.
+
+    SQLite allows only one writer at a time, so throughput only scales
+    on PostgreSQL.
+    """
+    help = (
+        "Benchmark concurrent votes on one tool with direct and sharded "
+        "counters."
+    )
+    attempts = 10
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            default="1,2,4,8",
+            help="Comma separated list of worker counts to run.",
+        )
+        parser.add_argument(
+            "--votes",
+            type=int,
+            default=200,
+            help="Number of votes per run.",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=8,
+            help="Number of shards per counter in the sharded runs.",
+        )
+
+    # Create the voters, the hot tool and its author
+    def seed(self, count):
+        author = User.objects.create_user(username="benchmark-author")
+        voters = User.objects.bulk_create([
+            User(username=f"benchmark-voter-{i}") for i in range(count)
+        ])
+        topic = Topic.objects.create(title="Benchmark Topic")
+        tool = Tool.objects.create(
+            title="Benchmark Tool",
+            short_description="Benchmark tool",
+            full_description="Benchmark tool",
+            instructions="Benchmark tool",
+            topic=topic,
+            user=author,
+        )
+        return author, voters, topic, tool
+
+    # Let some threads vote for a tool and return the votes per second
+    def run(self, tool, voters, workers):
+        errors = []
+
+        def vote(chunk):
+            toggle = VoteToggle()
+            try:
+                for user in chunk:
+                    # Retry lock timeouts, e.g. SQLite's "database is locked"
+                    for attempt in range(self.attempts):
+                        try:
+                            toggle.toggle(user, tool.pk)
+                            break
+                        except OperationalError as error:
+                            if attempt == self.attempts - 1:
+                                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=vote, args=(voters[i::workers],))
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return (len(voters) - len(errors)) / elapsed, len(errors)
+
+    # Remove the votes of a run and reset the counters
+    def reset(self, tool):
+        Vote.objects.filter(tool=tool).delete()
+        CounterShard.objects.all().delete()
+        Tool.objects.filter(pk=tool.pk).update(vote_count=0)
+        Profile.objects.filter(user_id=tool.user_id).update(total_votes=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializes all writes, expect no scaling."
+            ))
+        workers = [int(value) for value in options["workers"].split(",")]
+        runs = [
+            ("direct", 0),
+            (f"{options['shards']} shards", options["shards"]),
+        ]
+        author, voters, topic, tool = self.seed(options["votes"])
+        try:
+            for label, shards in runs:
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                with override_settings(COUNTER_SHARDS=shards):
+                    for count in workers:
+                        self.reset(tool)
+                        rate, errors = self.run(tool, voters, count)
+                        for counter in get_counters():
+                            counter.fold()
+                        tool.refresh_from_db(fields=["vote_count"])
+                        self.stdout.write(
+                            f"  {count} workers: {rate:.0f} votes/s, "
+                            f"{tool.vote_count} counted, {errors} errors"
+                        )
+        finally:
+            self.reset(tool)
+            tool.delete()
+            topic.delete()
+            User.objects.filter(pk__in=[author.pk] + [
+                user.pk for user in voters
+            ]).delete()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from sessionminds.cache import bump_version
+from votes.counters import get_counters
+
+
+class Command(BaseCommand):
+    """
+    Move the pending counter shards into their counter columns.
+
+    Run it periodically while COUNTER_SHARDS is set, so lists ordered by
+    a counter column stay current, and once after setting it back to 0.
+    """
+    help = "Fold the counter shards into the vote counter columns."
+
+    def handle(self, *args, **options):
+        for counter in get_counters():
+            folded = counter.fold()
+            if folded:
+                # Counters are changed without signals, invalidate here
+                bump_version(counter.model._meta.app_label)
+            self.stdout.write(self.style.SUCCESS(
+                f"{counter.name}: folded the shards of {folded} objects."
+            ))
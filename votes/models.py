@@ -3,6 +3,28 @@ from tools.models import Tool
 from django.contrib.auth.models import User
 
 
+# Manager to look up the votes of a user
+class VoteManager(models.Manager):
+    def get_user_votes(self, user, tool_ids):
+        """
+        Get the votes of a user for some tools in a single IN query.
+
+        Args:
+            user (User): The user, anonymous users have no votes.
+            tool_ids (iterable): The primary keys of the tools.
+
+        Returns:
+            dict: The vote ids of the voted tools by tool id.
+        """
+        tool_ids = set(tool_ids)
+        if not tool_ids or not user.is_authenticated:
+            return {}
+        return dict(
+            self.filter(user=user, tool__in=tool_ids)
+            .order_by().values_list("tool_id", "id")
+        )
+
+
 # Vote model
 class Vote(models.Model):
     """
@@ -20,10 +42,57 @@ class Vote(models.Model):
         )
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = VoteManager()
+
     # Ensure that a user can only vote once for a tool
     class Meta:
         ordering = ["-created"]
         unique_together = ["user", "tool"]
+        indexes = [
+            models.Index(
+                fields=["-created", "-id"],
+                name="vote_created_idx",
+            ),
+            models.Index(
+                fields=["tool", "-created", "-id"],
+                name="vote_tool_created_idx",
+            ),
+            # Covers the lookup of a user's votes for a page of tools
+            # with an index-only scan on PostgreSQL
+            models.Index(
+                fields=["user", "tool"],
+                include=["id"],
+                name="vote_user_tool_cover_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.tool} - {self.user} - {self.created}"
+
+
+# Shard of a counter column
+class CounterShard(models.Model):
+    """
+    Represents a part of the pending changes of a counter column.
+
+    Writes add to one of a few shards picked at random instead of the
+    counter row itself, so concurrent writes rarely wait for the same
+    row lock. Reads add the shards to the column and fold_counters
+    moves them into the column.
+
+    Attributes:
+        counter (str): The counter, e.g. "tools.Tool.vote_count".
+        object_id (int): The key of the counted object.
+        shard (int): The number of the shard.
+        value (int): The change not yet folded into the column.
+    """
+    counter = models.CharField(max_length=100)
+    object_id = models.PositiveIntegerField()
+    shard = models.PositiveSmallIntegerField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["counter", "object_id", "shard"]
+
+    def __str__(self):
+        return f"{self.counter} {self.object_id} #{self.shard}: {self.value}"
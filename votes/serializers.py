@@ -1,14 +1,16 @@
 from rest_framework import serializers
 from django.db import IntegrityError
+from sessionminds.serializers import DynamicFieldsMixin
 from .models import Vote
 
 
 # Vote serializer
-class VoteSerializer(serializers.ModelSerializer):
+class VoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Vote model.
 
     Args:
+        DynamicFieldsMixin: Selects the fields of the response per request.
         serializers.ModelSerializer: The base serializer class.
 
     Raises:
@@ -24,12 +26,18 @@ class VoteSerializer(serializers.ModelSerializer):
     # Check if the user is the owner of the vote
     def get_is_owner(self, obj):
         request = self.context["request"]
-        return request.user == obj.user
+        return request.user.id == obj.user_id
 
     class Meta:
         model = Vote
         fields = "__all__"
 
+    # Join the user if the response uses the username
+    def setup_eager_loading(self, queryset):
+        if "user" in self.fields:
+            queryset = queryset.select_related("user")
+        return queryset.defer(*self.get_deferred_fields())
+
     # Override the create method to handle IntegrityError
     def create(self, validated_data):
         try:
@@ -1,5 +1,10 @@
 from django.contrib.auth.models import User
-from .models import Vote
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from io import StringIO
+from .models import CounterShard, Vote
 from tools.models import Tool
 from topics.models import Topic
 from rest_framework import status
@@ -67,6 +72,18 @@ class VotesTest1ListView(APITestCase):
         count = Vote.objects.count()
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(count, 1)
+
+        # A second vote is rejected without an IntegrityError
+        response = self.client.post("/votes/", {
+            "tool": self.tool.id
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(
+            Tool.objects.filter(pk=self.tool.pk).values_list(
+                "vote_count", flat=True
+                ).get(), 1
+        )
         print("Test passed \n")
 
     # Test to create a vote when user is unauthenticated
@@ -225,3 +242,282 @@ class VotesTest3VotesByTool(APITestCase):
         self.assertFalse(response.data["user_has_voted"])
         self.assertIsNone(response.data["vote_id"])
         print("Test passed \n")
+
+
+class VotesTest4VoteCount(APITestCase):
+    def setUp(self):
+        # Create users, topic and tool
+        self.user = User.objects.create_user(
+            username="countuser@example.com", password="CountUser1234!!"
+        )
+        self.voter = User.objects.create_user(
+            username="voter@example.com", password="CountUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=self.user,
+            topic=self.topic
+        )
+
+    # Test that votes are counted on the tool
+    def test_9_vote_count_is_maintained(self):
+        print("\nVotes Test 9: Vote count is maintained")
+        vote = Vote.objects.create(user=self.user, tool=self.tool)
+        Vote.objects.create(user=self.voter, tool=self.tool)
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 2)
+
+        vote.delete()
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 1)
+
+        response = self.client.get("/tools/?ordering=votes", format="json")
+        self.assertEqual(response.data["results"][0]["vote_count"], 1)
+        print("Test passed \n")
+
+
+@override_settings(LIST_ETAG_TABLE_STATE=False)
+class VotesTest5VoteState(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tools
+        self.user = User.objects.create_user(
+            username="stateuser@example.com", password="StateUser1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tools = [
+            Tool.objects.create(
+                title=f"Test Tool {i}",
+                short_description="Short description",
+                full_description="Full description",
+                instructions="Instructions",
+                user=self.user,
+                topic=self.topic
+            )
+            for i in range(3)
+        ]
+        self.votes = [
+            Vote.objects.create(user=self.user, tool=tool)
+            for tool in self.tools[:2]
+        ]
+
+    # Test the vote state of the user in tool responses and in batches
+    def test_10_vote_state(self):
+        print("\nVotes Test 10: Vote state in tool responses")
+        expected = {
+            tool.id: vote.id for tool, vote in zip(self.tools, self.votes)
+        }
+
+        # Anonymous users have not voted
+        response = self.client.get("/tools/", format="json")
+        self.assertFalse(any(
+            tool["user_has_voted"] for tool in response.data["results"]
+        ))
+
+        # The votes of a page are looked up in one query
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/tools/", format="json")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/tools/", format="json")
+        vote_queries = [
+            query for query in queries
+            if '"votes_vote"' in query["sql"]
+        ]
+        self.assertEqual(len(vote_queries), 1)
+        for tool in response.data["results"]:
+            self.assertEqual(tool["vote_id"], expected.get(tool["id"]))
+            self.assertEqual(tool["user_has_voted"], tool["id"] in expected)
+
+        # Detail responses include the vote state too
+        response = self.client.get(f"/tools/{self.tools[0].id}/")
+        self.assertTrue(response.data["user_has_voted"])
+        self.assertEqual(response.data["vote_id"], self.votes[0].id)
+
+        # The batch endpoint answers many tools in one request
+        ids = ",".join(str(tool.id) for tool in self.tools)
+        response = self.client.get(f"/votes/tools/?ids={ids}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {
+                "tool": tool.id,
+                "user_has_voted": tool.id in expected,
+                "vote_id": expected.get(tool.id),
+            }
+            for tool in self.tools
+        ])
+        response = self.client.get("/votes/tools/?ids=1,abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test passed \n")
+
+
+class VotesTest6Toggle(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tool
+        self.author = User.objects.create_user(
+            username="toggleauthor@example.com", password="Toggle1234!!"
+        )
+        self.user = User.objects.create_user(
+            username="toggleuser@example.com", password="Toggle1234!!"
+        )
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=self.author,
+            topic=self.topic
+        )
+        self.url = f"/votes/tool/{self.tool.id}/toggle/"
+
+    # Test voting and unvoting a tool with one endpoint
+    def test_11_toggle_vote(self):
+        print("\nVotes Test 11: Toggle vote")
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Voting inserts the vote and updates the counters
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        vote = Vote.objects.get(user=self.user, tool=self.tool)
+        self.assertEqual(response.data, {
+            "tool": self.tool.id,
+            "user_has_voted": True,
+            "vote_id": vote.id,
+            "vote_count": 1,
+        })
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 1)
+        self.assertEqual(self.author.profile.total_votes, 0)
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.total_votes, 1)
+        self.assertLessEqual(len(queries), 9)
+
+        # Listed tools show the new count right away
+        response = self.client.get("/tools/")
+        self.assertEqual(response.data["results"][0]["vote_count"], 1)
+
+        # Voting again removes the vote
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url)
+        self.assertEqual(response.data["vote_count"], 0)
+        self.assertFalse(response.data["user_has_voted"])
+        self.assertIsNone(response.data["vote_id"])
+        self.assertFalse(Vote.objects.exists())
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.total_votes, 0)
+        self.assertLessEqual(len(queries), 9)
+
+        response = self.client.post("/votes/tool/999999/toggle/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        print("Test passed \n")
+
+
+@override_settings(COUNTER_SHARDS=4, RESPONSE_CACHE_ENABLED=False)
+class VotesTest7ShardedCounters(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create users, topic and tool
+        self.author = User.objects.create_user(
+            username="shardauthor@example.com", password="Shard1234!!"
+        )
+        self.voters = [
+            User.objects.create_user(
+                username=f"shardvoter{i}@example.com", password="Shard1234!!"
+            )
+            for i in range(6)
+        ]
+        self.topic = Topic.objects.create(title="Test Topic")
+        self.tool = Tool.objects.create(
+            title="Test Tool",
+            short_description="Short description",
+            full_description="Full description",
+            instructions="Instructions",
+            user=self.author,
+            topic=self.topic
+        )
+
+    # Test votes counted in shards and folded into the columns
+    def test_12_sharded_counters(self):
+        print("\nVotes Test 12: Sharded counters")
+        for voter in self.voters[:5]:
+            Vote.objects.create(user=voter, tool=self.tool)
+        self.client.force_authenticate(self.voters[5])
+        response = self.client.post(f"/votes/tool/{self.tool.id}/toggle/")
+        self.assertEqual(response.data["vote_count"], 6)
+        Vote.objects.filter(user=self.voters[0]).delete()
+
+        # The columns are untouched, the shards hold the changes
+        self.tool.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 0)
+        self.assertTrue(CounterShard.objects.exists())
+        self.assertLessEqual(CounterShard.objects.count(), 8)
+
+        # Responses include the pending changes
+        response = self.client.get(f"/tools/{self.tool.id}/")
+        self.assertEqual(response.data["vote_count"], 5)
+        self.assertEqual(response.data["profile"]["total_votes"], 5)
+        response = self.client.get(f"/profiles/{self.author.profile.slug}/")
+        self.assertEqual(response.data["total_votes"], 5)
+
+        # Pending votes change the ETag of the tool
+        etag = self.client.get(f"/tools/{self.tool.id}/")["ETag"]
+        Vote.objects.create(user=self.voters[0], tool=self.tool)
+        response = self.client.get(
+            f"/tools/{self.tool.id}/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.data["vote_count"], 6)
+        Vote.objects.filter(user=self.voters[0]).delete()
+
+        # Folding moves the shards into the columns
+        call_command("fold_counters", stdout=StringIO())
+        self.assertFalse(CounterShard.objects.exists())
+        self.tool.refresh_from_db()
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.tool.vote_count, 5)
+        self.assertEqual(self.author.profile.total_votes, 5)
+        response = self.client.get(f"/tools/{self.tool.id}/")
+        self.assertEqual(response.data["vote_count"], 5)
+        print("Test passed \n")
+
+    # Test that pending votes leave the cursors of vote ordered lists
+    def test_13_pending_votes_keep_cursors(self):
+        print("\nVotes Test 13: Pending votes keep cursors")
+        second, third = [
+            Tool.objects.create(
+                title=f"Cursor Tool {i}",
+                short_description="Short description",
+                full_description="Full description",
+                instructions="Instructions",
+                user=self.author,
+                topic=self.topic
+            )
+            for i in range(2)
+        ]
+        Tool.objects.filter(pk=second.pk).update(vote_count=3)
+        Tool.objects.filter(pk=self.tool.pk).update(vote_count=1)
+        for voter in self.voters[:5]:
+            Vote.objects.create(user=voter, tool=self.tool)
+
+        # Pages follow the stored column, responses add pending votes
+        pages, counts = [], {}
+        url = "/tools/?ordering=votes&pagination=cursor&page_size=1"
+        while url:
+            response = self.client.get(url)
+            for tool in response.data["results"]:
+                counts[tool["id"]] = tool["vote_count"]
+            pages.append([tool["id"] for tool in response.data["results"]])
+            url = response.data["next"]
+        self.assertEqual(pages, [[second.id], [self.tool.id], [third.id]])
+        self.assertEqual(counts[self.tool.id], 6)
+        print("Test passed \n")
@@ -6,4 +6,6 @@ urlpatterns = [
     path("votes/", views.VoteList.as_view()),
     path("votes/<int:pk>/", views.VoteDetails.as_view(), name="vote-details"),
     path("votes/tool/<int:id>/", views.VotesByTool.as_view()),
+    path("votes/tools/", views.VotesByTools.as_view()),
+    path("votes/tool/<int:id>/toggle/", views.VoteToggle.as_view()),
 ]
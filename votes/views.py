@@ -1,14 +1,25 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import Http404
 from rest_framework import permissions
 from rest_framework import generics
+from .counters import profile_votes, tool_votes
 from .models import Vote
+from profiles import leaderboard
+from profiles.models import Profile
+from tools.models import Tool
+from sessionminds.asyncviews import AsyncAPIView
+from sessionminds.cache import invalidate
+from sessionminds.pagination import SelectablePaginationMixin
 from sessionminds.permissions import IsOwnerOrReadOnly
 from .serializers import VoteSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 
 
 # Get all votes
-class VoteList(generics.ListCreateAPIView):
+class VoteList(SelectablePaginationMixin, generics.ListCreateAPIView):
     """
     A view for retrieving a list of votes.
 
@@ -19,9 +30,24 @@ class VoteList(generics.ListCreateAPIView):
     serializer_class = VoteSerializer
     queryset = Vote.objects.all()
 
-    # Create a new vote
+    # Skip joins and columns the response does not use
+    def get_queryset(self):
+        return VoteSerializer(
+            context=self.get_serializer_context()
+            ).setup_eager_loading(super().get_queryset())
+
+    # Create a new vote, one at a time per user like VoteToggle
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        user = self.request.user
+        with transaction.atomic():
+            User.objects.select_for_update().filter(pk=user.pk).exists()
+            if Vote.objects.filter(
+                user=user, tool=serializer.validated_data["tool"]
+            ).exists():
+                raise ValidationError({
+                    "detail": "It seems you have already voted for this tool."
+                })
+            serializer.save(user=user)
 
 
 # Get single vote by id
@@ -42,12 +68,12 @@ class VoteDetails(generics.RetrieveDestroyAPIView):
 
 
 # Get votes by tool
-class VotesByTool(APIView):
+class VotesByTool(AsyncAPIView):
     """
     A view to retrieve votes by tool.
 
     Args:
-        APIView: Inherits from APIView class.
+        AsyncAPIView: Inherits from AsyncAPIView class.
 
     Returns:
         VotesByTool: The votes by tool view.
@@ -55,14 +81,16 @@ class VotesByTool(APIView):
     permission_classes = [permissions.AllowAny]
 
     # Get votes by tool
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         tool_id = kwargs.get("id")
 
         user_has_voted = False
         vote_id = None
 
         if request.user.is_authenticated:
-            vote = Vote.objects.filter(tool=tool_id, user=request.user).first()
+            vote = await self.run_sync(Vote.objects.filter(
+                tool=tool_id, user=request.user
+                ).first)
             if vote:
                 user_has_voted = True
                 vote_id = vote.id
@@ -71,3 +99,117 @@ class VotesByTool(APIView):
             "user_has_voted": user_has_voted,
             "vote_id": vote_id
         })
+
+
+# Get the votes of the user for many tools at once
+class VotesByTools(AsyncAPIView):
+    """
+    A view to retrieve the vote state of many tools in one request.
+
+    Query parameters:
+        ids: Comma separated list of tool ids, at most 100.
+
+    Args:
+        AsyncAPIView: Inherits from AsyncAPIView class.
+
+    Returns:
+        VotesByTools: The votes by tools view.
+    """
+    permission_classes = [permissions.AllowAny]
+    max_ids = 100
+
+    # Get the vote state of every requested tool
+    async def get(self, request, *args, **kwargs):
+        try:
+            tool_ids = list(dict.fromkeys(
+                int(value)
+                for value in request.query_params.get("ids", "").split(",")
+                if value.strip()
+            ))
+        except ValueError:
+            raise ValidationError({"ids": "Tool ids must be integers."})
+        if len(tool_ids) > self.max_ids:
+            raise ValidationError({
+                "ids": f"At most {self.max_ids} tool ids are allowed."
+            })
+
+        votes = await self.run_sync(
+            Vote.objects.get_user_votes, request.user, tool_ids
+            )
+        return Response([
+            {
+                "tool": tool_id,
+                "user_has_voted": tool_id in votes,
+                "vote_id": votes.get(tool_id),
+            }
+            for tool_id in tool_ids
+        ])
+
+
+# Vote or unvote a tool in one request
+class VoteToggle(APIView):
+    """
+    A view to add the vote of the user for a tool or remove it.
+
+    The row of the user is locked, so concurrent clicks of the same user
+    are applied one after the other while other users vote in parallel.
+    The vote is deleted if it exists and inserted otherwise, and the
+    counters of the tool and its author are updated in the same
+    transaction. Every toggle costs the same handful of queries, without
+    relying on IntegrityError.
+
+    Args:
+        APIView: Inherits from APIView class.
+
+    Returns:
+        VoteToggle: The vote toggle view.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Delete the vote of a user for a tool without the delete signals,
+    # the counters are updated by toggle(). Returns whether it existed
+    def delete_vote(self, user, tool_id):
+        votes = Vote.objects.filter(user=user, tool_id=tool_id)
+        return votes._raw_delete(votes.db) > 0
+
+    # Toggle the vote and return the new vote state of the tool
+    def toggle(self, user, tool_id):
+        with transaction.atomic():
+            author_id = Tool.objects.filter(pk=tool_id).values_list(
+                "user_id", flat=True
+                ).first()
+            if author_id is None:
+                raise Http404
+
+            # Only clicks of the same user wait for each other
+            User.objects.select_for_update().filter(pk=user.pk).exists()
+
+            vote = None
+            if self.delete_vote(user, tool_id):
+                delta = -1
+            else:
+                # Inserted without the save signals, the counters are
+                # updated below
+                vote = Vote.objects.bulk_create(
+                    [Vote(user=user, tool_id=tool_id)]
+                    )[0]
+                delta = 1
+
+            tool_votes.add(tool_id, delta)
+            profile_votes.add(author_id, delta)
+            leaderboard.schedule_refresh(
+                "votes", Profile.objects.filter(user_id=author_id)
+            )
+            invalidate("votes")
+            vote_count = tool_votes.get(tool_id)
+
+        return {
+            "tool": tool_id,
+            "user_has_voted": vote is not None,
+            "vote_id": vote.pk if vote else None,
+            "vote_count": vote_count,
+        }
+
+    # Toggle the vote of the user for a tool
+    def post(self, request, *args, **kwargs):
+        return Response(self.toggle(request.user, kwargs.get("id")))